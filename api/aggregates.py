@@ -0,0 +1,58 @@
+"""
+Catalog aggregate lookups for the E-commerce Products API
+Reads the trigger-maintained summary tables built by database_setup/catalog_aggregates.py,
+falling back to scanning products on databases that do not have them yet.
+The statements are named queries in repository.py, so their runs are booked under those names.
+"""
+
+import repository
+
+
+def has_aggregates(conn):
+    """Whether the database has been given the catalog aggregate tables"""
+    return repository.value(conn, repository.AGGREGATE_TABLES) is not None
+
+
+def count_products(conn, department_id=None, department_name=None):
+    """Number of products, optionally limited to one department (by id or name)"""
+    summary = has_aggregates(conn)
+
+    if department_id is None and department_name is None:
+        query = repository.AGGREGATE_PRODUCT_COUNT if summary else repository.COUNT_PRODUCTS
+        return repository.value(conn, query)
+
+    where, params = ('d.id = ?', (department_id,)) if department_id is not None \
+        else ('d.name = ?', (department_name,))
+    query = repository.AGGREGATE_DEPARTMENT_PRODUCT_COUNT if summary else repository.DEPARTMENT_PRODUCT_COUNT
+    return repository.value(conn, query, params, where=where)
+
+
+def department_rows(conn, department_id=None):
+    """Departments {id, name, created_at, updated_at, product_count} ordered by id"""
+    where, params = ('WHERE d.id = ?', (department_id,)) if department_id is not None else ('', ())
+    query = repository.AGGREGATE_DEPARTMENTS if has_aggregates(conn) else repository.DEPARTMENTS_WITH_COUNTS
+    return repository.rows(conn, query, params, where=where)
+
+
+def catalog_totals(conn):
+    """Product, category and brand totals plus (avg, min, max) retail price"""
+    if has_aggregates(conn):
+        prices = repository.row(conn, repository.AGGREGATE_PRICE_TOTALS)
+        counts = repository.row(conn, repository.AGGREGATE_CATALOG_STATS)
+        total_products = prices['product_count']
+        total_brands, total_categories = counts['brand_count'], counts['category_count']
+        avg_price = prices['price_sum'] / total_products if total_products else None
+        min_price, max_price = prices['min_price'], prices['max_price']
+    else:
+        total_products = repository.value(conn, repository.COUNT_PRODUCTS)
+        total_categories = repository.value(conn, repository.COUNT_CATEGORIES)
+        total_brands = repository.value(conn, repository.COUNT_BRANDS)
+        prices = repository.row(conn, repository.PRICE_STATS)
+        avg_price, min_price, max_price = prices['avg_price'], prices['min_price'], prices['max_price']
+
+    return {
+        'total_products': total_products,
+        'total_categories': total_categories,
+        'total_brands': total_brands,
+        'price_stats': (avg_price, min_price, max_price)
+    }
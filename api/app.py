@@ -1,24 +1,23 @@
 from flask import Flask, jsonify, request
 from flask_cors import CORS
-import sqlite3
 import json
 from datetime import datetime
 
+import db_pool
+import repository
+import slow_queries
+
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend integration
 
 # Database configuration
 DATABASE = 'ecommerce_improved.db'
+db_pool.init_app(app, DATABASE)
+slow_queries.init_app(app)
 
 def get_db_connection():
-    """Create a database connection"""
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row  # This enables column access by name
-    return conn
-
-def dict_from_row(row):
-    """Convert sqlite3.Row object to dictionary"""
-    return dict(zip(row.keys(), row))
+    """Get a pooled database connection (conn.close() returns it to the pool)"""
+    return db_pool.get_connection()  # Rows are sqlite3.Row, so columns are accessible by name
 
 @app.route('/api/products', methods=['GET'])
 def get_products():
@@ -40,18 +39,10 @@ def get_products():
         conn = get_db_connection()
         
         # Get total count
-        total_count = conn.execute('SELECT COUNT(*) FROM products').fetchone()[0]
+        total_count = repository.value(conn, repository.COUNT_PRODUCTS)
         
         # Get products with pagination
-        products = conn.execute('''
-            SELECT id, name, brand, retail_price, cost, category, department, sku, distribution_center_id
-            FROM products 
-            ORDER BY id 
-            LIMIT ? OFFSET ?
-        ''', (per_page, offset)).fetchall()
-        
-        # Convert to list of dictionaries
-        products_list = [dict_from_row(product) for product in products]
+        products_list = repository.rows(conn, repository.ORIGINAL_PRODUCTS_PAGE, (per_page, offset))
         
         # Calculate pagination info
         total_pages = (total_count + per_page - 1) // per_page
@@ -79,18 +70,14 @@ def get_product(product_id):
     try:
         conn = get_db_connection()
         
-        product = conn.execute('''
-            SELECT id, name, brand, retail_price, cost, category, department, sku, distribution_center_id
-            FROM products 
-            WHERE id = ?
-        ''', (product_id,)).fetchone()
+        product = repository.row(conn, repository.ORIGINAL_PRODUCT_BY_ID, (product_id,))
         
         conn.close()
         
         if product is None:
             return jsonify({'error': 'Product not found'}), 404
         
-        return jsonify(dict_from_row(product)), 200
+        return jsonify(product), 200
         
     except Exception as e:
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
@@ -106,15 +93,8 @@ def search_products():
         conn = get_db_connection()
         
         # Search in name, brand, and category
-        products = conn.execute('''
-            SELECT id, name, brand, retail_price, cost, category, department, sku, distribution_center_id
-            FROM products 
-            WHERE name LIKE ? OR brand LIKE ? OR category LIKE ?
-            ORDER BY id 
-            LIMIT 20
-        ''', (f'%{query}%', f'%{query}%', f'%{query}%')).fetchall()
-        
-        products_list = [dict_from_row(product) for product in products]
+        products_list = repository.rows(conn, repository.ORIGINAL_PRODUCTS_LIKE,
+                                        (f'%{query}%', f'%{query}%', f'%{query}%'))
         
         conn.close()
         
@@ -133,15 +113,7 @@ def get_products_by_category(category):
     try:
         conn = get_db_connection()
         
-        products = conn.execute('''
-            SELECT id, name, brand, retail_price, cost, category, department, sku, distribution_center_id
-            FROM products 
-            WHERE category = ?
-            ORDER BY id 
-            LIMIT 50
-        ''', (category,)).fetchall()
-        
-        products_list = [dict_from_row(product) for product in products]
+        products_list = repository.rows(conn, repository.ORIGINAL_PRODUCTS_BY_CATEGORY, (category,))
         
         conn.close()
         
@@ -163,15 +135,7 @@ def get_products_by_department(department):
         
         conn = get_db_connection()
         
-        products = conn.execute('''
-            SELECT id, name, brand, retail_price, cost, category, department, sku, distribution_center_id
-            FROM products 
-            WHERE department = ?
-            ORDER BY id 
-            LIMIT 50
-        ''', (department,)).fetchall()
-        
-        products_list = [dict_from_row(product) for product in products]
+        products_list = repository.rows(conn, repository.ORIGINAL_PRODUCTS_BY_DEPARTMENT, (department,))
         
         conn.close()
         
@@ -191,25 +155,15 @@ def get_stats():
         conn = get_db_connection()
         
         # Get basic stats
-        total_products = conn.execute('SELECT COUNT(*) FROM products').fetchone()[0]
-        total_categories = conn.execute('SELECT COUNT(DISTINCT category) FROM products').fetchone()[0]
-        total_brands = conn.execute('SELECT COUNT(DISTINCT brand) FROM products').fetchone()[0]
+        total_products = repository.value(conn, repository.COUNT_PRODUCTS)
+        total_categories = repository.value(conn, repository.COUNT_CATEGORIES)
+        total_brands = repository.value(conn, repository.COUNT_BRANDS)
         
         # Get department stats
-        dept_stats = conn.execute('''
-            SELECT department, COUNT(*) as count
-            FROM products 
-            GROUP BY department
-        ''').fetchall()
+        dept_stats = repository.rows(conn, repository.ORIGINAL_DEPARTMENT_COUNTS)
         
         # Get price stats
-        price_stats = conn.execute('''
-            SELECT 
-                MIN(retail_price) as min_price,
-                MAX(retail_price) as max_price,
-                AVG(retail_price) as avg_price
-            FROM products
-        ''').fetchone()
+        price_stats = repository.row(conn, repository.ORIGINAL_PRICE_STATS)
         
         conn.close()
         
@@ -217,12 +171,8 @@ def get_stats():
             'total_products': total_products,
             'total_categories': total_categories,
             'total_brands': total_brands,
-            'departments': [dict_from_row(dept) for dept in dept_stats],
-            'price_stats': {
-                'min_price': price_stats[0],
-                'max_price': price_stats[1],
-                'avg_price': price_stats[2]
-            }
+            'departments': dept_stats,
+            'price_stats': price_stats
         }), 200
         
     except Exception as e:
@@ -233,7 +183,7 @@ def health_check():
     """Health check endpoint"""
     try:
         conn = get_db_connection()
-        product_count = conn.execute('SELECT COUNT(*) FROM products').fetchone()[0]
+        product_count = repository.value(conn, repository.COUNT_PRODUCTS)
         conn.close()
         
         return jsonify({
@@ -250,6 +200,17 @@ def health_check():
             'timestamp': datetime.now().isoformat()
         }), 500
 
+@app.route('/api/pool/stats', methods=['GET'])
+def pool_stats():
+    """Connection pool statistics for monitoring"""
+    return jsonify(db_pool.get_pool().stats()), 200
+
+@app.route('/api/admin/slow-queries', methods=['GET'])
+def slow_query_log():
+    """Recent statements slower than SLOW_QUERY_THRESHOLD_MS, newest first (?limit=50&route=search)"""
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+    return jsonify(slow_queries.report(limit=limit, route=request.args.get('route'))), 200
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Endpoint not found'}), 404
@@ -270,6 +231,8 @@ if __name__ == '__main__':
     print("   GET /api/products/department/{department} - Get products by department")
     print("   GET /api/stats - Get database statistics")
     print("   GET /api/health - Health check")
+    print("   GET /api/pool/stats - Connection pool statistics")
+    print("   GET /api/admin/slow-queries - Slow statements (SLOW_QUERY_LOG_ENABLED=1)")
     print("\n✅ API is ready! Press Ctrl+C to stop.")
     
     app.run(debug=True, host='0.0.0.0', port=5000) 
\ No newline at end of file
@@ -1,25 +1,28 @@
-import sqlite3
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 from datetime import datetime
 
+import db_pool
+import repository
+import slow_queries
+
 app = Flask(__name__)
 CORS(app)
 
+DATABASE = 'ecommerce_improved.db'
+db_pool.init_app(app, DATABASE)
+slow_queries.init_app(app)
+
 def get_db_connection():
-    """Get database connection"""
-    conn = sqlite3.connect('ecommerce_improved.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Get a pooled database connection (conn.close() returns it to the pool)"""
+    return db_pool.get_connection()
 
 @app.route('/api/health')
 def health_check():
     """Health check endpoint"""
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT COUNT(*) FROM products')
-        product_count = cursor.fetchone()[0]
+        product_count = repository.value(conn, repository.COUNT_PRODUCTS)
         conn.close()
         
         return jsonify({
@@ -40,39 +43,16 @@ def get_products():
     """Get all products with pagination and department info"""
     try:
         page = request.args.get('page', 1, type=int)
-        per_page = min(request.args.get('per_page', 10, type=int), 100)
+        per_page = max(min(request.args.get('per_page', 10, type=int), 100), 1)
         offset = (page - 1) * per_page
         
         conn = get_db_connection()
-        cursor = conn.cursor()
         
         # Get total count
-        cursor.execute('SELECT COUNT(*) FROM products')
-        total_products = cursor.fetchone()[0]
+        total_products = repository.value(conn, repository.COUNT_PRODUCTS)
         
         # Get products with department info
-        cursor.execute('''
-            SELECT p.id, p.cost, p.category, p.name, p.brand, p.retail_price, 
-                   p.sku, p.distribution_center_id, d.name as department
-            FROM products p
-            JOIN departments d ON p.department_id = d.id
-            ORDER BY p.id
-            LIMIT ? OFFSET ?
-        ''', (per_page, offset))
-        
-        products = []
-        for row in cursor.fetchall():
-            products.append({
-                'id': row['id'],
-                'cost': row['cost'],
-                'category': row['category'],
-                'name': row['name'],
-                'brand': row['brand'],
-                'retail_price': row['retail_price'],
-                'sku': row['sku'],
-                'distribution_center_id': row['distribution_center_id'],
-                'department': row['department']
-            })
+        products = repository.rows(conn, repository.PRODUCTS_PAGE, (per_page, offset))
         
         conn.close()
         
@@ -96,31 +76,10 @@ def get_product(product_id):
     """Get a specific product by ID with department info"""
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT p.id, p.cost, p.category, p.name, p.brand, p.retail_price, 
-                   p.sku, p.distribution_center_id, d.name as department
-            FROM products p
-            JOIN departments d ON p.department_id = d.id
-            WHERE p.id = ?
-        ''', (product_id,))
-        
-        row = cursor.fetchone()
+        product = repository.row(conn, repository.PRODUCT_BY_ID, (product_id,))
         conn.close()
         
-        if row:
-            product = {
-                'id': row['id'],
-                'cost': row['cost'],
-                'category': row['category'],
-                'name': row['name'],
-                'brand': row['brand'],
-                'retail_price': row['retail_price'],
-                'sku': row['sku'],
-                'distribution_center_id': row['distribution_center_id'],
-                'department': row['department']
-            }
+        if product:
             return jsonify(product), 200
         else:
             return jsonify({'error': 'Product not found'}), 404
@@ -137,31 +96,8 @@ def search_products():
             return jsonify({'error': 'Search query is required'}), 400
         
         conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT p.id, p.cost, p.category, p.name, p.brand, p.retail_price, 
-                   p.sku, p.distribution_center_id, d.name as department
-            FROM products p
-            JOIN departments d ON p.department_id = d.id
-            WHERE p.name LIKE ? OR p.brand LIKE ? OR p.category LIKE ?
-            ORDER BY p.name
-        ''', (f'%{query}%', f'%{query}%', f'%{query}%'))
-        
-        products = []
-        for row in cursor.fetchall():
-            products.append({
-                'id': row['id'],
-                'cost': row['cost'],
-                'category': row['category'],
-                'name': row['name'],
-                'brand': row['brand'],
-                'retail_price': row['retail_price'],
-                'sku': row['sku'],
-                'distribution_center_id': row['distribution_center_id'],
-                'department': row['department']
-            })
-        
+        products = repository.rows(conn, repository.PRODUCTS_LIKE,
+                                   (f'%{query}%', f'%{query}%', f'%{query}%'))
         conn.close()
         
         return jsonify({
@@ -178,31 +114,7 @@ def get_products_by_department(department_name):
     """Get products by department name"""
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT p.id, p.cost, p.category, p.name, p.brand, p.retail_price, 
-                   p.sku, p.distribution_center_id, d.name as department
-            FROM products p
-            JOIN departments d ON p.department_id = d.id
-            WHERE d.name = ?
-            ORDER BY p.name
-        ''', (department_name,))
-        
-        products = []
-        for row in cursor.fetchall():
-            products.append({
-                'id': row['id'],
-                'cost': row['cost'],
-                'category': row['category'],
-                'name': row['name'],
-                'brand': row['brand'],
-                'retail_price': row['retail_price'],
-                'sku': row['sku'],
-                'distribution_center_id': row['distribution_center_id'],
-                'department': row['department']
-            })
-        
+        products = repository.rows(conn, repository.DEPARTMENT_PRODUCTS, (department_name,))
         conn.close()
         
         return jsonify({
@@ -219,19 +131,7 @@ def get_departments():
     """Get all departments"""
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT id, name, created_at, updated_at FROM departments ORDER BY id')
-        
-        departments = []
-        for row in cursor.fetchall():
-            departments.append({
-                'id': row['id'],
-                'name': row['name'],
-                'created_at': row['created_at'],
-                'updated_at': row['updated_at']
-            })
-        
+        departments = repository.rows(conn, repository.DEPARTMENTS)
         conn.close()
         
         return jsonify({
@@ -247,49 +147,17 @@ def get_stats():
     """Get database statistics with department info"""
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Total products
-        cursor.execute('SELECT COUNT(*) FROM products')
-        total_products = cursor.fetchone()[0]
         
-        # Total categories
-        cursor.execute('SELECT COUNT(DISTINCT category) FROM products')
-        total_categories = cursor.fetchone()[0]
-        
-        # Total brands
-        cursor.execute('SELECT COUNT(DISTINCT brand) FROM products')
-        total_brands = cursor.fetchone()[0]
-        
-        # Total departments
-        cursor.execute('SELECT COUNT(*) FROM departments')
-        total_departments = cursor.fetchone()[0]
+        total_products = repository.value(conn, repository.COUNT_PRODUCTS)
+        total_categories = repository.value(conn, repository.COUNT_CATEGORIES)
+        total_brands = repository.value(conn, repository.COUNT_BRANDS)
+        total_departments = repository.value(conn, repository.COUNT_DEPARTMENTS)
         
         # Price statistics
-        cursor.execute('''
-            SELECT 
-                AVG(retail_price) as avg_price,
-                MIN(retail_price) as min_price,
-                MAX(retail_price) as max_price
-            FROM products
-        ''')
-        price_stats = cursor.fetchone()
+        price_stats = repository.row(conn, repository.PRICE_STATS)
         
         # Department breakdown
-        cursor.execute('''
-            SELECT d.name, COUNT(p.id) as product_count
-            FROM departments d
-            LEFT JOIN products p ON d.id = p.department_id
-            GROUP BY d.id, d.name
-            ORDER BY d.id
-        ''')
-        
-        department_breakdown = []
-        for row in cursor.fetchall():
-            department_breakdown.append({
-                'name': row[0],
-                'product_count': row[1]
-            })
+        department_breakdown = repository.rows(conn, repository.DEPARTMENT_BREAKDOWN)
         
         conn.close()
         
@@ -299,9 +167,9 @@ def get_stats():
             'total_brands': total_brands,
             'total_departments': total_departments,
             'price_stats': {
-                'avg_price': round(price_stats[0], 2) if price_stats[0] else 0,
-                'min_price': price_stats[1] if price_stats[1] else 0,
-                'max_price': price_stats[2] if price_stats[2] else 0
+                'avg_price': round(price_stats['avg_price'], 2) if price_stats['avg_price'] else 0,
+                'min_price': price_stats['min_price'] if price_stats['min_price'] else 0,
+                'max_price': price_stats['max_price'] if price_stats['max_price'] else 0
             },
             'department_breakdown': department_breakdown
         }), 200
@@ -309,6 +177,17 @@ def get_stats():
     except Exception as e:
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
 
+@app.route('/api/pool/stats')
+def pool_stats():
+    """Connection pool statistics for monitoring"""
+    return jsonify(db_pool.get_pool().stats()), 200
+
+@app.route('/api/admin/slow-queries')
+def slow_query_log():
+    """Recent statements slower than SLOW_QUERY_THRESHOLD_MS, newest first (?limit=50&route=search)"""
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+    return jsonify(slow_queries.report(limit=limit, route=request.args.get('route'))), 200
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Endpoint not found'}), 404
@@ -329,6 +208,8 @@ if __name__ == '__main__':
     print("   GET /api/departments - Get all departments")
     print("   GET /api/stats - Get database statistics")
     print("   GET /api/health - Health check")
+    print("   GET /api/pool/stats - Connection pool statistics")
+    print("   GET /api/admin/slow-queries - Slow statements (SLOW_QUERY_LOG_ENABLED=1)")
     print()
     print("✅ API is ready! Press Ctrl+C to stop.")
     
@@ -1,25 +1,49 @@
-import sqlite3
-from flask import Flask, jsonify, request
+import csv
+import io
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
 from datetime import datetime
 
+import aggregates
+import compression
+import db_pool
+import metrics
+import pagination
+import repository
+import response_cache
+import search
+import serialization
+import slow_queries
+
 app = Flask(__name__)
 CORS(app)
+metrics.init_app(app)
+serialization.init_app(app)
+
+DATABASE = 'ecommerce_improved.db'
+MAX_BATCH_IDS = 500
+SEARCH_COUNT_LIMIT = 1000
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_COLUMNS = serialization.PRODUCT_COLUMNS
+db_pool.init_app(app, DATABASE)
+slow_queries.init_app(app)
+response_cache.init_app(app)
+compression.init_app(app)
 
 def get_db_connection():
-    """Get database connection"""
-    conn = sqlite3.connect('ecommerce_improved.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Get a pooled database connection (conn.close() returns it to the pool)"""
+    return db_pool.get_connection()
+
+def product_sort_key(row):
+    """Keyset sort key of a product row in department listings"""
+    return (row['name'], row['id'])
 
 @app.route('/api/health')
 def health_check():
     """Health check endpoint"""
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT COUNT(*) FROM products')
-        product_count = cursor.fetchone()[0]
+        product_count = repository.value(conn, repository.COUNT_PRODUCTS)
         conn.close()
         
         return jsonify({
@@ -36,44 +60,51 @@ def health_check():
         }), 500
 
 @app.route('/api/products')
+@response_cache.cached
 def get_products():
     """Get all products with pagination and department info"""
     try:
         page = request.args.get('page', 1, type=int)
-        per_page = min(request.args.get('per_page', 10, type=int), 100)
+        per_page = max(min(request.args.get('per_page', 10, type=int), 100), 1)
         offset = (page - 1) * per_page
         
+        try:
+            fields = serialization.parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Cursor mode: seek past the last id of the previous page (no COUNT, no OFFSET)
+        if 'cursor' in request.args:
+            token = request.args.get('cursor')
+            try:
+                after = pagination.decode_cursor(token, 1)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            where, params = '', []
+            if after:
+                where, params = pagination.keyset_condition(('p.id',), after)
+                where = f'WHERE {where}'
+            
+            conn = get_db_connection()
+            rows = repository.rows(conn, repository.PRODUCTS_AFTER, (*params, per_page + 1),
+                                   fields=fields, required=('id',), where=where)
+            conn.close()
+            
+            return jsonify({
+                'products': serialization.only_fields(rows[:per_page], fields),
+                'pagination': pagination.cursor_pagination(
+                    per_page, rows, lambda row: (row['id'],), token)
+            }), 200
+        
         conn = get_db_connection()
-        cursor = conn.cursor()
         
-        # Get total count
-        cursor.execute('SELECT COUNT(*) FROM products')
-        total_products = cursor.fetchone()[0]
+        # Get total count (from the aggregate tables when available)
+        total_products = aggregates.count_products(conn)
         
         # Get products with department info
-        cursor.execute('''
-            SELECT p.id, p.cost, p.category, p.name, p.brand, p.retail_price, 
-                   p.sku, p.distribution_center_id, d.name as department
-            FROM products p
-            JOIN departments d ON p.department_id = d.id
-            ORDER BY p.id
-            LIMIT ? OFFSET ?
-        ''', (per_page, offset))
-        
-        products = []
-        for row in cursor.fetchall():
-            products.append({
-                'id': row['id'],
-                'cost': row['cost'],
-                'category': row['category'],
-                'name': row['name'],
-                'brand': row['brand'],
-                'retail_price': row['retail_price'],
-                'sku': row['sku'],
-                'distribution_center_id': row['distribution_center_id'],
-                'department': row['department']
-            })
-        
+        products = repository.rows(conn, repository.PRODUCTS_PAGE, (per_page, offset), fields=fields)
+                
         conn.close()
         
         total_pages = (total_products + per_page - 1) // per_page
@@ -92,35 +123,20 @@ def get_products():
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
 
 @app.route('/api/products/<int:product_id>')
+@response_cache.cached
 def get_product(product_id):
     """Get a specific product by ID with department info"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT p.id, p.cost, p.category, p.name, p.brand, p.retail_price, 
-                   p.sku, p.distribution_center_id, d.name as department
-            FROM products p
-            JOIN departments d ON p.department_id = d.id
-            WHERE p.id = ?
-        ''', (product_id,))
+        try:
+            fields = serialization.parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        row = cursor.fetchone()
+        conn = get_db_connection()
+        product = repository.row(conn, repository.PRODUCT_BY_ID, (product_id,), fields=fields)
         conn.close()
         
-        if row:
-            product = {
-                'id': row['id'],
-                'cost': row['cost'],
-                'category': row['category'],
-                'name': row['name'],
-                'brand': row['brand'],
-                'retail_price': row['retail_price'],
-                'sku': row['sku'],
-                'distribution_center_id': row['distribution_center_id'],
-                'department': row['department']
-            }
+        if product:
             return jsonify(product), 200
         else:
             return jsonify({'error': 'Product not found'}), 404
@@ -128,46 +144,218 @@ def get_product(product_id):
     except Exception as e:
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
 
+@app.route('/api/products/batch', methods=['GET', 'POST'])
+@response_cache.cached
+def get_products_batch():
+    """Get many products by ID in one query (GET ?ids=1,2,3 or POST {"ids": [1, 2, 3]})"""
+    try:
+        if request.method == 'POST':
+            payload = request.get_json(silent=True)
+            ids = payload.get('ids') if isinstance(payload, dict) else None
+            if not isinstance(ids, list) or not all(type(i) is int for i in ids):
+                return jsonify({'error': 'Request body must be {"ids": [<integer>, ...]}'}), 400
+        else:
+            parts = [part.strip() for value in request.args.getlist('ids') for part in value.split(',')]
+            try:
+                ids = [int(part) for part in parts if part]
+            except ValueError:
+                return jsonify({'error': 'ids must be a comma-separated list of integers'}), 400
+        
+        if not ids:
+            return jsonify({'error': 'At least one product id is required'}), 400
+        if len(ids) > MAX_BATCH_IDS:
+            return jsonify({'error': f'At most {MAX_BATCH_IDS} ids per request'}), 400
+        
+        try:
+            fields = serialization.parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        unique_ids = list(dict.fromkeys(ids))
+        placeholders, params = repository.in_list(unique_ids)
+        
+        conn = get_db_connection()
+        rows = repository.rows(conn, repository.PRODUCTS_BY_IDS, params,
+                               fields=fields, required=('id',), ids=placeholders)
+        conn.close()
+        
+        # Results follow the request order; ids that do not exist come back as null
+        found = {row['id']: product for row, product in zip(rows, serialization.only_fields(rows, fields))}
+        
+        return jsonify({
+            'products': [found.get(product_id) for product_id in ids],
+            'count': len(ids),
+            'found': sum(1 for product_id in ids if product_id in found),
+            'missing': [product_id for product_id in unique_ids if product_id not in found]
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Internal server error: {str(e)}'}), 500
+
+def export_rows(pool, department_id, output_format, fields=None):
+    """Yield the catalog (or just ``fields``) as NDJSON or CSV, one chunk per batch of rows.
+
+    Batches of EXPORT_CHUNK_SIZE rows are read in id order, each seeking past
+    the last id of the previous one on a pooled connection that goes back to
+    the pool before the batch is sent, so a slow client holds no connection
+    while it reads.
+    """
+    columns = fields or EXPORT_COLUMNS
+    # id is the batch keyset; product_select() puts it first, so drop it again when not requested
+    skip = 0 if columns[0] == 'id' else 1
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    if output_format == 'csv':
+        writer.writerow(columns)
+    
+    after = None
+    while True:
+        conditions, params = (['p.department_id = ?'], [department_id]) if department_id else ([], [])
+        if after is not None:
+            condition, keyset_params = pagination.keyset_condition(('p.id',), (after,))
+            conditions.append(condition)
+            params.extend(keyset_params)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        
+        conn = pool.acquire()
+        try:
+            rows = [row for batch in repository.chunks(conn, repository.PRODUCTS_EXPORT,
+                                                       (*params, EXPORT_CHUNK_SIZE), EXPORT_CHUNK_SIZE,
+                                                       fields=fields, required=('id',), where=where)
+                    for row in batch]
+        finally:
+            conn.close()
+        if not rows:
+            break
+        after = rows[-1][0]
+        
+        if output_format == 'csv':
+            writer.writerows(row[skip:] for row in rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        else:
+            yield b''.join(serialization.dumps_line(dict(zip(columns, row[skip:]))) for row in rows)
+        if len(rows) < EXPORT_CHUNK_SIZE:
+            break
+    
+    tail = buffer.getvalue()  # The CSV header of an empty export
+    if tail:
+        yield tail
+
+@app.route('/api/products/export')
+def export_products():
+    """Stream every product (optionally one department) as NDJSON or CSV"""
+    try:
+        output_format = request.args.get('format', 'ndjson').lower()
+        if output_format not in ('ndjson', 'csv'):
+            return jsonify({'error': 'format must be "ndjson" or "csv"'}), 400
+        
+        try:
+            fields = serialization.parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        department_id = None
+        department = request.args.get('department')
+        if department:
+            conn = get_db_connection()
+            if department.isdigit():
+                dept_row = repository.row(conn, repository.DEPARTMENT_BY_ID, (int(department),))
+            else:
+                dept_row = repository.row(conn, repository.DEPARTMENT_BY_NAME, (department,))
+            conn.close()
+            
+            if not dept_row:
+                return jsonify({'error': 'Department not found'}), 404
+            department_id = dept_row['id']
+        
+        if output_format == 'csv':
+            mimetype, filename = 'text/csv', 'products.csv'
+        else:
+            mimetype, filename = 'application/x-ndjson', 'products.ndjson'
+        
+        # Keep the request context while streaming so the slow-query log can name the route
+        return Response(
+            stream_with_context(export_rows(db_pool.get_pool(), department_id, output_format, fields)),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        ), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Internal server error: {str(e)}'}), 500
+
 @app.route('/api/products/search')
+@response_cache.cached
 def search_products():
-    """Search products with department info"""
+    """Search products with department info (page/per_page or cursor pagination)"""
     try:
         query = request.args.get('q', '')
         if not query:
             return jsonify({'error': 'Search query is required'}), 400
         
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = max(min(request.args.get('per_page', 10, type=int), 100), 1)
+        offset = (page - 1) * per_page
+        count_mode = request.args.get('count', 'estimate')
+        if count_mode not in ('estimate', 'exact'):
+            return jsonify({'error': 'count must be "estimate" or "exact"'}), 400
+        
+        try:
+            fields = serialization.parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        try:
+            after = pagination.decode_cursor(request.args.get('cursor'), 2)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT p.id, p.cost, p.category, p.name, p.brand, p.retail_price, 
-                   p.sku, p.distribution_center_id, d.name as department
-            FROM products p
-            JOIN departments d ON p.department_id = d.id
-            WHERE p.name LIKE ? OR p.brand LIKE ? OR p.category LIKE ?
-            ORDER BY p.name
-        ''', (f'%{query}%', f'%{query}%', f'%{query}%'))
-        
-        products = []
-        for row in cursor.fetchall():
-            products.append({
-                'id': row['id'],
-                'cost': row['cost'],
-                'category': row['category'],
-                'name': row['name'],
-                'brand': row['brand'],
-                'retail_price': row['retail_price'],
-                'sku': row['sku'],
-                'distribution_center_id': row['distribution_center_id'],
-                'department': row['department']
-            })
+        source, condition, params = search.match_filter(conn, query)
+        
+        # Cursor mode: seek past the last (name, id) of the previous page
+        if 'cursor' in request.args:
+            if after:
+                seek, seek_params = pagination.keyset_condition(('p.name', 'p.id'), after)
+                condition, params = f'{condition} AND {seek}', [*params, *seek_params]
+            offset = 0
+        
+        # One extra row tells whether another page exists without counting
+        rows = repository.rows(conn, repository.SEARCH_PAGE, (*params, per_page + 1, offset),
+                               fields=fields, required=('name', 'id'), source=source, condition=condition)
         
+        if 'cursor' in request.args:
+            conn.close()
+            return jsonify({
+                'products': serialization.only_fields(rows[:per_page], fields),
+                'count': len(rows[:per_page]),
+                'query': query,
+                'pagination': pagination.cursor_pagination(
+                    per_page, rows, product_sort_key, request.args.get('cursor'))
+            }), 200
+        
+        # Broad queries ("a") match most of the catalog: stop counting past a
+        # bound unless the caller asks for the exact total
+        total_results, exact = search.count_matches(
+            conn, source, condition, params,
+            None if count_mode == 'exact' else SEARCH_COUNT_LIMIT)
         conn.close()
         
+        products = serialization.only_fields(rows[:per_page], fields)
+        
         return jsonify({
             'products': products,
             'count': len(products),
-            'query': query
+            'query': query,
+            'pagination': {
+                'page': page,
+                'per_page': per_page,
+                'total_results': total_results,
+                'total_exact': exact,
+                'total_pages': (total_results + per_page - 1) // per_page,
+                'has_next': len(rows) > per_page
+            }
         }), 200
         
     except Exception as e:
@@ -178,24 +366,15 @@ def search_products():
 # ============================================================================
 
 @app.route('/api/departments')
+@response_cache.cached
 def get_departments():
     """Get all departments with product counts"""
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Get departments with product counts using LEFT JOIN
-        cursor.execute('''
-            SELECT d.id, d.name, d.created_at, d.updated_at, 
-                   COUNT(p.id) as product_count
-            FROM departments d
-            LEFT JOIN products p ON d.id = p.department_id
-            GROUP BY d.id, d.name, d.created_at, d.updated_at
-            ORDER BY d.id
-        ''')
         
+        # Get departments with product counts (from the aggregate tables when available)
         departments = []
-        for row in cursor.fetchall():
+        for row in aggregates.department_rows(conn):
             departments.append({
                 'id': row['id'],
                 'name': row['name'],
@@ -216,26 +395,18 @@ def get_departments():
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
 
 @app.route('/api/departments/<int:department_id>')
+@response_cache.cached
 def get_department(department_id):
     """Get specific department details with product count"""
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
         
         # Get department details with product count
-        cursor.execute('''
-            SELECT d.id, d.name, d.created_at, d.updated_at, 
-                   COUNT(p.id) as product_count
-            FROM departments d
-            LEFT JOIN products p ON d.id = p.department_id
-            WHERE d.id = ?
-            GROUP BY d.id, d.name, d.created_at, d.updated_at
-        ''', (department_id,))
-        
-        row = cursor.fetchone()
+        rows = aggregates.department_rows(conn, department_id)
         conn.close()
         
-        if row:
+        if rows:
+            row = rows[0]
             department = {
                 'id': row['id'],
                 'name': row['name'],
@@ -251,19 +422,23 @@ def get_department(department_id):
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
 
 @app.route('/api/departments/<int:department_id>/products')
+@response_cache.cached
 def get_department_products(department_id):
     """Get all products in a specific department"""
     try:
         page = request.args.get('page', 1, type=int)
-        per_page = min(request.args.get('per_page', 10, type=int), 100)
+        per_page = max(min(request.args.get('per_page', 10, type=int), 100), 1)
         offset = (page - 1) * per_page
         
+        try:
+            fields = serialization.parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         conn = get_db_connection()
-        cursor = conn.cursor()
         
         # First, verify the department exists
-        cursor.execute('SELECT id, name FROM departments WHERE id = ?', (department_id,))
-        dept_row = cursor.fetchone()
+        dept_row = repository.row(conn, repository.DEPARTMENT_BY_ID, (department_id,))
         
         if not dept_row:
             conn.close()
@@ -271,41 +446,41 @@ def get_department_products(department_id):
         
         department_name = dept_row['name']
         
-        # Get total count of products in this department
-        cursor.execute('''
-            SELECT COUNT(*) 
-            FROM products p
-            JOIN departments d ON p.department_id = d.id
-            WHERE d.id = ?
-        ''', (department_id,))
+        # Cursor mode: seek past the last (name, id) of the previous page
+        if 'cursor' in request.args:
+            token = request.args.get('cursor')
+            try:
+                after = pagination.decode_cursor(token, 2)
+            except ValueError as e:
+                conn.close()
+                return jsonify({'error': str(e)}), 400
+            
+            where, params = '', []
+            if after:
+                where, params = pagination.keyset_condition(('p.name', 'p.id'), after)
+                where = f'AND {where}'
+            
+            rows = repository.rows(conn, repository.DEPARTMENT_PRODUCTS_AFTER,
+                                   (department_id, *params, per_page + 1),
+                                   fields=fields, required=('name', 'id'), seek=where)
+            conn.close()
+            
+            return jsonify({
+                'department': {
+                    'id': department_id,
+                    'name': department_name
+                },
+                'products': serialization.only_fields(rows[:per_page], fields),
+                'pagination': pagination.cursor_pagination(per_page, rows, product_sort_key, token)
+            }), 200
         
-        total_products = cursor.fetchone()[0]
+        # Get total count of products in this department
+        total_products = aggregates.count_products(conn, department_id=department_id)
         
         # Get products in this department with pagination
-        cursor.execute('''
-            SELECT p.id, p.cost, p.category, p.name, p.brand, p.retail_price, 
-                   p.sku, p.distribution_center_id, d.name as department
-            FROM products p
-            JOIN departments d ON p.department_id = d.id
-            WHERE d.id = ?
-            ORDER BY p.name
-            LIMIT ? OFFSET ?
-        ''', (department_id, per_page, offset))
-        
-        products = []
-        for row in cursor.fetchall():
-            products.append({
-                'id': row['id'],
-                'cost': row['cost'],
-                'category': row['category'],
-                'name': row['name'],
-                'brand': row['brand'],
-                'retail_price': row['retail_price'],
-                'sku': row['sku'],
-                'distribution_center_id': row['distribution_center_id'],
-                'department': row['department']
-            })
-        
+        products = repository.rows(conn, repository.DEPARTMENT_PRODUCTS_PAGE,
+                                   (department_id, per_page, offset), fields=fields)
+                
         conn.close()
         
         total_pages = (total_products + per_page - 1) // per_page
@@ -328,51 +503,54 @@ def get_department_products(department_id):
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
 
 @app.route('/api/departments/<department_name>/products')
+@response_cache.cached
 def get_products_by_department_name(department_name):
     """Get products by department name (alternative endpoint)"""
     try:
         page = request.args.get('page', 1, type=int)
-        per_page = min(request.args.get('per_page', 10, type=int), 100)
+        per_page = max(min(request.args.get('per_page', 10, type=int), 100), 1)
         offset = (page - 1) * per_page
         
+        try:
+            fields = serialization.parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Cursor mode: seek past the last (name, id) of the previous page
+        if 'cursor' in request.args:
+            token = request.args.get('cursor')
+            try:
+                after = pagination.decode_cursor(token, 2)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            where, params = '', []
+            if after:
+                where, params = pagination.keyset_condition(('p.name', 'p.id'), after)
+                where = f'AND {where}'
+            
+            conn = get_db_connection()
+            rows = repository.rows(conn, repository.NAMED_DEPARTMENT_PRODUCTS_AFTER,
+                                   (department_name, *params, per_page + 1),
+                                   fields=fields, required=('name', 'id'), seek=where)
+            conn.close()
+            
+            return jsonify({
+                'department': department_name,
+                'products': serialization.only_fields(rows[:per_page], fields),
+                'count': len(rows[:per_page]),
+                'pagination': pagination.cursor_pagination(per_page, rows, product_sort_key, token)
+            }), 200
+        
         conn = get_db_connection()
-        cursor = conn.cursor()
         
         # Get total count of products in this department
-        cursor.execute('''
-            SELECT COUNT(*) 
-            FROM products p
-            JOIN departments d ON p.department_id = d.id
-            WHERE d.name = ?
-        ''', (department_name,))
-        
-        total_products = cursor.fetchone()[0]
+        total_products = aggregates.count_products(conn, department_name=department_name)
         
         # Get products in this department with pagination
-        cursor.execute('''
-            SELECT p.id, p.cost, p.category, p.name, p.brand, p.retail_price, 
-                   p.sku, p.distribution_center_id, d.name as department
-            FROM products p
-            JOIN departments d ON p.department_id = d.id
-            WHERE d.name = ?
-            ORDER BY p.name
-            LIMIT ? OFFSET ?
-        ''', (department_name, per_page, offset))
-        
-        products = []
-        for row in cursor.fetchall():
-            products.append({
-                'id': row['id'],
-                'cost': row['cost'],
-                'category': row['category'],
-                'name': row['name'],
-                'brand': row['brand'],
-                'retail_price': row['retail_price'],
-                'sku': row['sku'],
-                'distribution_center_id': row['distribution_center_id'],
-                'department': row['department']
-            })
-        
+        products = repository.rows(conn, repository.NAMED_DEPARTMENT_PRODUCTS_PAGE,
+                                   (department_name, per_page, offset), fields=fields)
+                
         conn.close()
         
         total_pages = (total_products + per_page - 1) // per_page
@@ -393,61 +571,32 @@ def get_products_by_department_name(department_name):
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
 
 @app.route('/api/stats')
+@response_cache.cached
 def get_stats():
     """Get database statistics with department info"""
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Total products
-        cursor.execute('SELECT COUNT(*) FROM products')
-        total_products = cursor.fetchone()[0]
-        
-        # Total categories
-        cursor.execute('SELECT COUNT(DISTINCT category) FROM products')
-        total_categories = cursor.fetchone()[0]
-        
-        # Total brands
-        cursor.execute('SELECT COUNT(DISTINCT brand) FROM products')
-        total_brands = cursor.fetchone()[0]
-        
-        # Total departments
-        cursor.execute('SELECT COUNT(*) FROM departments')
-        total_departments = cursor.fetchone()[0]
-        
-        # Price statistics
-        cursor.execute('''
-            SELECT 
-                AVG(retail_price) as avg_price,
-                MIN(retail_price) as min_price,
-                MAX(retail_price) as max_price
-            FROM products
-        ''')
-        price_stats = cursor.fetchone()
         
-        # Department breakdown with product counts
-        cursor.execute('''
-            SELECT d.name, COUNT(p.id) as product_count
-            FROM departments d
-            LEFT JOIN products p ON d.id = p.department_id
-            GROUP BY d.id, d.name
-            ORDER BY d.id
-        ''')
+        # Product, category and brand totals plus price statistics
+        # (read from the aggregate tables when available)
+        totals = aggregates.catalog_totals(conn)
+        price_stats = totals['price_stats']
         
+        # Department breakdown with product counts
         department_breakdown = []
-        for row in cursor.fetchall():
+        for row in aggregates.department_rows(conn):
             department_breakdown.append({
-                'name': row[0],
-                'product_count': row[1]
+                'name': row['name'],
+                'product_count': row['product_count']
             })
         
         conn.close()
         
         return jsonify({
-            'total_products': total_products,
-            'total_categories': total_categories,
-            'total_brands': total_brands,
-            'total_departments': total_departments,
+            'total_products': totals['total_products'],
+            'total_categories': totals['total_categories'],
+            'total_brands': totals['total_brands'],
+            'total_departments': len(department_breakdown),
             'price_stats': {
                 'avg_price': round(price_stats[0], 2) if price_stats[0] else 0,
                 'min_price': price_stats[1] if price_stats[1] else 0,
@@ -459,6 +608,34 @@ def get_stats():
     except Exception as e:
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
 
+@app.route('/api/pool/stats')
+def pool_stats():
+    """Connection pool statistics for monitoring"""
+    return jsonify(db_pool.get_pool().stats()), 200
+
+@app.route('/api/admin/slow-queries')
+def slow_query_log():
+    """Recent statements slower than SLOW_QUERY_THRESHOLD_MS, newest first (?limit=50&route=search)"""
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+    return jsonify(slow_queries.report(limit=limit, route=request.args.get('route'))), 200
+
+@app.route('/api/cache/stats')
+def cache_stats():
+    """Response cache statistics for monitoring"""
+    return jsonify(response_cache.get_cache().stats()), 200
+
+@app.route('/api/metrics')
+def prometheus_metrics():
+    """Request, connection pool and cache metrics in the Prometheus text format"""
+    body = (
+        metrics.get_metrics().render()
+        + metrics.render_stats('api_db_pool', db_pool.get_pool().stats(),
+                               metrics.POOL_COUNTERS, metrics.POOL_GAUGES)
+        + metrics.render_stats('api_response_cache', response_cache.get_cache().stats(),
+                               metrics.CACHE_COUNTERS, metrics.CACHE_GAUGES)
+    )
+    return Response(body, content_type=metrics.CONTENT_TYPE), 200
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Endpoint not found'}), 404
@@ -472,15 +649,21 @@ if __name__ == '__main__':
     print("📊 Database: ecommerce_improved.db")
     print("🌐 API will be available at: http://localhost:5000")
     print("📋 Available endpoints:")
-    print("   GET /api/products - List all products (with pagination)")
+    print("   GET /api/products - List all products (page/per_page or cursor pagination)")
     print("   GET /api/products/{id} - Get specific product")
-    print("   GET /api/products/search?q=query - Search products")
+    print("   GET/POST /api/products/batch?ids=1,2,3 - Get many products in one request")
+    print("   GET /api/products/search?q=query - Search products (paginated; count=exact for exact totals)")
+    print("   GET /api/products/export?format=ndjson|csv&department=Men - Stream the full catalog")
     print("   GET /api/departments - List all departments with product counts")
     print("   GET /api/departments/{id} - Get specific department details")
-    print("   GET /api/departments/{id}/products - Get products in department")
+    print("   GET /api/departments/{id}/products - Get products in department (page or cursor)")
     print("   GET /api/departments/{name}/products - Get products by department name")
     print("   GET /api/stats - Get database statistics")
     print("   GET /api/health - Health check")
+    print("   GET /api/pool/stats - Connection pool statistics")
+    print("   GET /api/admin/slow-queries - Slow statements (SLOW_QUERY_LOG_ENABLED=1)")
+    print("   GET /api/cache/stats - Response cache statistics")
+    print("   GET /api/metrics - Request metrics (Prometheus format)")
     print()
     print("✅ API is ready! Press Ctrl+C to stop.")
     
@@ -0,0 +1,190 @@
+"""
+Asyncio (ASGI) serving mode for the Milestone 5 E-commerce Products API
+Serves the very same Flask app as app_milestone5.py, so routes and JSON
+contracts are identical. Connections are accepted and multiplexed on the
+event loop; each request's view (and its SQLite work) runs on a bounded
+thread pool sized like the connection pool, so thousands of idle keep-alive
+clients cost a socket each instead of a thread each.
+
+Run with any ASGI server, e.g.:  uvicorn asgi_milestone5:app --port 8000
+or simply:                      python asgi_milestone5.py
+"""
+
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import app_milestone5
+import db_pool
+
+DEFAULT_WORKERS = int(os.environ.get('ASGI_WORKERS', app_milestone5.app.config['DB_POOL_SIZE']))
+DEFAULT_MAX_BODY = int(os.environ.get('ASGI_MAX_BODY', 1024 * 1024))
+
+_END = object()
+
+
+def build_environ(scope, body):
+    """WSGI environ (PEP 3333) for an ASGI HTTP scope and its request body"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': BytesIO(body),
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False
+    }
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin-1').lower()
+        value = value.decode('latin-1')
+        if name == 'content-type':
+            key = 'CONTENT_TYPE'
+        elif name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+class AsyncWSGIBridge:
+    """ASGI application that runs a WSGI app on a bounded thread pool"""
+
+    def __init__(self, wsgi_app, workers=DEFAULT_WORKERS, max_body=DEFAULT_MAX_BODY, on_shutdown=None):
+        self.wsgi_app = wsgi_app
+        self.workers = workers
+        self.max_body = max_body
+        self.on_shutdown = on_shutdown
+        self._executor = None
+        self._pid = None
+
+    @property
+    def executor(self):
+        # Created lazily (and again after a fork) so pre-forking servers get one per worker process
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='asgi-db')
+            self._pid = os.getpid()
+        return self._executor
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            await self.handle_http(scope, receive, send)
+        elif scope['type'] == 'lifespan':
+            await self.handle_lifespan(receive, send)
+
+    async def handle_lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self._executor is not None:
+                    self._executor.shutdown(wait=True)
+                    self._executor = None
+                if self.on_shutdown:
+                    self.on_shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        """Whole request body; None if the client went away, False if it is too large"""
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > self.max_body:
+                return False
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                return b''.join(chunks)
+
+    def start(self, environ):
+        """Run the WSGI app up to its second body chunk (called on a worker thread).
+
+        Reading one chunk ahead tells whether the body is complete, so ordinary
+        responses are sent in a single message without another trip to the pool.
+        """
+        started = []
+
+        def start_response(status, headers, exc_info=None):
+            started[:] = [status, headers]
+            return lambda data: None
+
+        iterable = self.wsgi_app(environ, start_response)
+        iterator = iter(iterable)
+        first = next(iterator, _END)
+        following = next(iterator, _END) if first is not _END else _END
+        return started, iterable, iterator, first, following
+
+    async def handle_http(self, scope, receive, send):
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        if body is False:
+            await send({'type': 'http.response.start', 'status': 413,
+                        'headers': [(b'content-type', b'application/json')]})
+            await send({'type': 'http.response.body', 'body': b'{"error":"Request body too large"}\n'})
+            return
+
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        started, iterable, iterator, chunk, following = await loop.run_in_executor(
+            executor, self.start, build_environ(scope, body))
+        try:
+            status, headers = started
+            await send({
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+            })
+            # Streamed responses (the catalog export) produce further chunks on the pool
+            while following is not _END:
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                chunk, following = following, await loop.run_in_executor(executor, next, iterator, _END)
+            await send({'type': 'http.response.body', 'body': b'' if chunk is _END else chunk})
+        finally:
+            if hasattr(iterable, 'close'):
+                await loop.run_in_executor(executor, iterable.close)
+
+
+app = AsyncWSGIBridge(
+    app_milestone5.app.wsgi_app,
+    on_shutdown=lambda: db_pool.get_pool(app_milestone5.app).close_all()
+)
+
+
+if __name__ == '__main__':
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit("❌ The ASGI mode needs an ASGI server: pip install uvicorn")
+
+    print("🚀 Starting E-commerce Products API (Milestone 5) in async ASGI mode...")
+    print(f"📊 Database: {app_milestone5.DATABASE}")
+    print(f"🧵 DB worker threads: {app.workers}")
+    print("🌐 API will be available at: http://localhost:8000")
+    print("📋 Same endpoints as app_milestone5.py")
+    uvicorn.run(app, host='0.0.0.0', port=8000, log_level='warning')
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the Flask (threaded WSGI) and async ASGI serving modes
+Starts both servers against the same database, then drives each with the same
+number of concurrent keep-alive clients and reports throughput and latency.
+
+Usage: python bench_asgi.py [--connections 200] [--requests 4000] [--path /api/products?per_page=20]
+Needs an ASGI server for the async mode (pip install uvicorn).
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+HOST = '127.0.0.1'
+
+SERVERS = {
+    'flask (threaded)': [sys.executable, '-c',
+                         'import app_milestone5; app_milestone5.app.run(host="127.0.0.1", port={port}, threaded=True)'],
+    'asgi (uvicorn)': [sys.executable, '-m', 'uvicorn', 'asgi_milestone5:app',
+                       '--host', '127.0.0.1', '--port', '{port}', '--log-level', 'warning']
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((HOST, port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+async def read_response(reader):
+    """Read one HTTP/1.x response; returns (status, keep_alive)"""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    version, status = lines[0].split(' ')[:2]
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    else:
+        await reader.read()
+        return int(status), False
+
+    connection = headers.get('connection', '').lower()
+    keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+    return int(status), keep_alive
+
+
+async def client(port, path, count, latencies, errors):
+    """One keep-alive client issuing ``count`` sequential requests (reconnecting if told to)"""
+    request = f'GET {path} HTTP/1.1\r\nHost: {HOST}:{port}\r\nConnection: keep-alive\r\n\r\n'.encode('latin-1')
+    reader = writer = None
+    for _ in range(count):
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(HOST, port)
+            writer.write(request)
+            status, keep_alive = await read_response(reader)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            errors.append(1)
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            continue
+        latencies.append(time.perf_counter() - start)
+        if status != 200:
+            errors.append(status)
+        if not keep_alive:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def run_load(port, path, connections, requests):
+    latencies, errors = [], []
+    per_client = max(requests // connections, 1)
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, path, per_client, latencies, errors) for _ in range(connections)))
+    elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+
+def start_server(command, port, cache=False):
+    """Start one of SERVERS on ``port``; returns the process once it accepts connections, else None"""
+    # Servers run in the current directory (where ecommerce_improved.db is) with this one importable
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, RESPONSE_CACHE_ENABLED='1' if cache else '0',
+               PYTHONPATH=os.pathsep.join(filter(None, [here, os.environ.get('PYTHONPATH')])))
+    process = subprocess.Popen([part.replace('{port}', str(port)) for part in command], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if wait_for_port(port):
+        return process
+    process.terminate()
+    process.wait()
+    return None
+
+
+def benchmark(name, command, args):
+    port = free_port()
+    process = start_server(command, port, args.cache)
+    if process is None:
+        print(f"❌ {name}: server did not start (is uvicorn installed?)")
+        return
+    try:
+        asyncio.run(run_load(port, args.path, min(args.connections, 20), 200))  # warm up
+        latencies, errors, elapsed = asyncio.run(run_load(port, args.path, args.connections, args.requests))
+    finally:
+        process.terminate()
+        process.wait()
+
+    latencies.sort()
+    print(f"{name:<18} {len(latencies) / elapsed:9.1f} req/s  "
+          f"p50 {percentile(latencies, 0.50) * 1000:7.1f} ms  "
+          f"p95 {percentile(latencies, 0.95) * 1000:7.1f} ms  "
+          f"p99 {percentile(latencies, 0.99) * 1000:7.1f} ms  "
+          f"mean {statistics.fmean(latencies) * 1000 if latencies else 0:7.1f} ms  "
+          f"errors {len(errors)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the Flask and ASGI serving modes')
+    parser.add_argument('--connections', type=int, default=200, help='concurrent keep-alive clients')
+    parser.add_argument('--requests', type=int, default=4000, help='total requests per server')
+    parser.add_argument('--path', default='/api/products?per_page=20', help='endpoint to request')
+    parser.add_argument('--cache', action='store_true', help='leave the response cache enabled')
+    args = parser.parse_args()
+
+    print(f"📊 {args.requests} x GET {args.path} over {args.connections} connections "
+          f"(response cache {'on' if args.cache else 'off'})")
+    print("=" * 100)
+    for name, command in SERVERS.items():
+        benchmark(name, command, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the connection tuning profiles (db_pool.PROFILES)
+Serves list, search and stats requests of the Milestone 5 API in-process
+from a copy of the database opened with each profile, response cache and
+compression off, and reports the time per request.
+
+Usage: python bench_db_profile.py [database] [requests per endpoint]
+"""
+
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+import db_pool
+
+ENDPOINTS = {
+    'list (page 500)': '/api/products?page=500&per_page=50',
+    'list (cursor)': '/api/products?cursor=WzEwMDAwXQ&per_page=50',
+    'department page': '/api/departments/1/products?page=100&per_page=50',
+    'search (fts)': '/api/products/search?q=jeans&per_page=20',
+    'search (substring)': '/api/products/search?q=ean&per_page=20',
+    'stats': '/api/stats'
+}
+
+
+def copy_database(source, directory, profile):
+    """A private copy of ``source`` in rollback-journal mode, so every profile starts alike"""
+    target = os.path.join(directory, f'{profile}.db')
+    with sqlite3.connect(source) as src, sqlite3.connect(target) as dst:
+        src.backup(dst)
+    conn = sqlite3.connect(target)
+    conn.execute('PRAGMA journal_mode = DELETE')
+    conn.close()
+    return target
+
+
+def time_requests(client, url, count):
+    """Per-request latencies in microseconds"""
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = client.get(url)
+        response.get_data()
+        timings.append((time.perf_counter() - start) * 1e6)
+        assert response.status_code == 200, f'{url}: {response.status_code}'
+    return timings
+
+
+def main(database='ecommerce_improved.db', count=300, rounds=10):
+    import app_milestone5
+    app = app_milestone5.app
+    app.config['RESPONSE_CACHE_ENABLED'] = False
+    app.config['COMPRESSION_ENABLED'] = False
+    client = app.test_client()
+
+    results = {profile: {name: [] for name in ENDPOINTS} for profile in db_pool.PROFILES}
+    with tempfile.TemporaryDirectory() as directory:
+        pools = {profile: db_pool.ConnectionPool(copy_database(database, directory, profile), profile=profile)
+                 for profile in db_pool.PROFILES}
+        # Profiles take turns in short rounds, so drift in machine load hits them all alike
+        for name, url in ENDPOINTS.items():
+            for round_number in range(rounds + 1):
+                for profile, pool in pools.items():
+                    app.extensions['db_pool'] = pool
+                    timings = time_requests(client, url, max(count // rounds, 1))
+                    if round_number:  # The first round only warms the caches
+                        results[profile][name] += timings
+        for pool in pools.values():
+            pool.close_all()
+
+    print(f"📊 Median / p95 µs per request over {count} requests, by connection profile")
+    print("=" * 78)
+    print(f"{'endpoint':<20}" + ''.join(f'{profile:>19}' for profile in results) + f"{'read vs default':>18}")
+    for name in ENDPOINTS:
+        line = f'{name:<20}'
+        for profile in results:
+            timings = sorted(results[profile][name])
+            line += f'{statistics.median(timings):>10.0f} / {timings[int(len(timings) * 0.95)]:>5.0f}'
+        ratio = statistics.median(results['default'][name]) / statistics.median(results['read'][name])
+        print(line + f'{ratio:>17.2f}x')
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    main(args[0] if args else 'ecommerce_improved.db',
+         int(args[1]) if len(args) > 1 else 300)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of the product row serialization paths
+Compares hand-copied dicts from sqlite3.Row + stdlib json against
+serialization.fetch_dicts + the app's JSON provider, on the same query.
+
+Usage: python bench_serialization.py [database] [rows] [repeat]
+"""
+
+import json
+import sqlite3
+import sys
+import time
+
+from flask import Flask
+
+import serialization
+
+QUERY = '''
+    SELECT p.id, p.cost, p.category, p.name, p.brand, p.retail_price,
+           p.sku, p.distribution_center_id, d.name as department
+    FROM products p
+    JOIN departments d ON p.department_id = d.id
+    ORDER BY p.id
+    LIMIT ?
+'''
+
+
+def row_dicts(conn, limit):
+    """The previous path: sqlite3.Row objects copied key by key"""
+    cursor = conn.cursor()
+    cursor.execute(QUERY, (limit,))
+    products = []
+    for row in cursor.fetchall():
+        products.append({
+            'id': row['id'],
+            'cost': row['cost'],
+            'category': row['category'],
+            'name': row['name'],
+            'brand': row['brand'],
+            'retail_price': row['retail_price'],
+            'sku': row['sku'],
+            'distribution_center_id': row['distribution_center_id'],
+            'department': row['department']
+        })
+    return products
+
+
+def best_of(repeat, func):
+    """Fastest of ``repeat`` runs, in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(database='ecommerce_improved.db', limit=1000, repeat=20):
+    conn = sqlite3.connect(database)
+    conn.row_factory = sqlite3.Row
+
+    provider = serialization.FastJSONProvider(Flask(__name__))
+
+    paths = {
+        'sqlite3.Row + json': lambda: json.dumps({'products': row_dicts(conn, limit)},
+                                                 separators=(',', ':'), sort_keys=True),
+        'fetch_dicts + json': lambda: json.dumps({'products': serialization.fetch_dicts(conn, QUERY, (limit,))},
+                                                 separators=(',', ':'), sort_keys=True),
+        'fetch_dicts + provider': lambda: provider.dumps({'products': serialization.fetch_dicts(conn, QUERY, (limit,))})
+    }
+
+    print(f"📊 Serializing {limit} products, best of {repeat} runs "
+          f"(orjson {'available' if serialization.orjson else 'not installed'})")
+    print("=" * 60)
+    baseline = None
+    for name, func in paths.items():
+        func()  # warm the page cache and statement cache
+        seconds = best_of(repeat, func)
+        baseline = baseline or seconds
+        print(f"{name:<24} {seconds * 1000:8.2f} ms  {seconds / limit * 1e6:6.2f} µs/row  "
+              f"x{baseline / seconds:.2f}")
+
+    conn.close()
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    main(args[0] if args else 'ecommerce_improved.db',
+         int(args[1]) if len(args) > 1 else 1000,
+         int(args[2]) if len(args) > 2 else 20)
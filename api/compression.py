@@ -0,0 +1,103 @@
+"""
+Response compression for the E-commerce Products API
+Negotiates gzip (or brotli, when the brotli package is installed) from the
+request's Accept-Encoding and compresses JSON/text responses above a size
+threshold. Cached responses keep their compressed bytes next to the plain
+body (see response_cache.py), so a hot page is compressed once, not on
+every request.
+"""
+
+import gzip
+import os
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip only without it
+    brotli = None
+
+DEFAULT_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+DEFAULT_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+DEFAULT_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 5))
+
+# In order of preference when the client accepts several equally
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/csv', 'text/plain', 'text/html'}
+
+
+def compress(data, encoding):
+    """``data`` compressed with ``encoding`` ('gzip' or 'br').
+
+    gzip output carries no timestamp, so equal bodies compress to equal
+    bytes in every worker process.
+    """
+    config = current_app.config
+    if encoding == 'br':
+        return brotli.compress(data, quality=config.get('COMPRESSION_BROTLI_QUALITY', DEFAULT_BROTLI_QUALITY))
+    return gzip.compress(data, compresslevel=config.get('COMPRESSION_GZIP_LEVEL', DEFAULT_GZIP_LEVEL), mtime=0)
+
+
+def variant_etag(etag, encoding):
+    """Strong ETag of the ``encoding``-compressed representation"""
+    return f'{etag}-{encoding}'
+
+
+def etag_variants(etag):
+    """The plain ETag followed by the ETag of every compressed representation"""
+    return [etag] + [variant_etag(etag, encoding) for encoding in ENCODINGS]
+
+
+def eligible(response):
+    """Whether compression applies to this response at all (whatever the client accepts)"""
+    config = current_app.config
+    return (
+        config.get('COMPRESSION_ENABLED', False)
+        and response.status_code == 200
+        and not response.is_streamed
+        and response.mimetype in COMPRESSIBLE_MIMETYPES
+        and 'Content-Encoding' not in response.headers
+        and not response.cache_control.no_transform
+        and (response.content_length or 0) >= config['COMPRESSION_MIN_SIZE']
+    )
+
+
+def negotiate(response, req=None):
+    """Encoding to send ``response`` with, or None to send it as is.
+
+    Adds ``Vary: Accept-Encoding`` to every response that could have been
+    compressed, so shared caches keep the variants apart.
+    """
+    if not eligible(response):
+        return None
+    response.vary.add('Accept-Encoding')
+    return (req or request).accept_encodings.best_match(ENCODINGS)
+
+
+def apply(response, encoding, data=None):
+    """Replace the body with its ``encoding``-compressed bytes (``data`` when already compressed)"""
+    if data is None:
+        data = compress(response.get_data(), encoding)
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(variant_etag(etag, encoding), weak=weak)
+    return response
+
+
+def compress_response(response):
+    """after_request hook: compress responses that were not compressed on the way out of the cache"""
+    encoding = negotiate(response)
+    if encoding:
+        apply(response, encoding)
+    return response
+
+
+def init_app(app):
+    """Compress a Flask app's responses when the client accepts it"""
+    app.config.setdefault('COMPRESSION_ENABLED', os.environ.get('COMPRESSION_ENABLED', '1') != '0')
+    app.config.setdefault('COMPRESSION_MIN_SIZE', DEFAULT_MIN_SIZE)
+    app.config.setdefault('COMPRESSION_GZIP_LEVEL', DEFAULT_GZIP_LEVEL)
+    app.config.setdefault('COMPRESSION_BROTLI_QUALITY', DEFAULT_BROTLI_QUALITY)
+    app.after_request(compress_response)
@@ -0,0 +1,51 @@
+"""
+Conditional GET support (ETag / Last-Modified) for the E-commerce Products API
+Validators are derived from the persistent catalog generation, so every worker
+process hands out the same ones and they only change when the catalog does.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+
+from flask import request
+from werkzeug.http import is_resource_modified
+
+
+def parse_timestamp(value):
+    """SQLite CURRENT_TIMESTAMP text (UTC) to an aware datetime, or None"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        return None
+
+
+def validators(generation, key, namespace=''):
+    """(etag, last_modified) of the representation at ``key``.
+
+    ``generation`` is the (generation, updated_at, instance) triple from
+    versioning.catalog_generation; the instance token keeps a rebuilt database
+    from reissuing the ETags of the one it replaced. Without it there is
+    nothing stable to derive validators from and (None, None) is returned.
+    """
+    if generation is None:
+        return None, None
+    number, updated_at, instance = generation
+    etag = hashlib.sha1(f'{namespace}|{instance}|{number}|{key}'.encode('utf-8')).hexdigest()
+    return etag, parse_timestamp(updated_at)
+
+
+def not_modified(etag, last_modified, req=None):
+    """Whether the client's If-None-Match / If-Modified-Since still match"""
+    req = req or request
+    if req.method not in ('GET', 'HEAD'):
+        return False
+    return not is_resource_modified(req.environ, etag=etag, last_modified=last_modified)
+
+
+def add_validators(response, etag, last_modified):
+    """Attach a strong ETag and Last-Modified, and ask clients to revalidate before reuse"""
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
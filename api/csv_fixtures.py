@@ -0,0 +1,32 @@
+"""
+Generated products.csv files for the ingest, validation, cache and sync tests
+product() builds one valid row, with any field overridden; write_csv() writes
+rows under the products.csv header.
+"""
+
+import csv
+
+HEADER = ['id', 'cost', 'category', 'name', 'brand', 'retail_price', 'department', 'sku', 'distribution_center_id']
+
+
+def product(i, **overrides):
+    """Row ``i`` of a valid catalog, in HEADER order, with ``overrides`` applied"""
+    row = dict(zip(HEADER, [i, 2.5, 'Jeans', f'Jeans {i}', 'MG', 9.99, 'Men' if i % 2 else 'Women',
+                            f'{i:032d}', i % 10 + 1]))
+    row.update(overrides)
+    return [row[column] for column in HEADER]
+
+
+def write_csv(path, rows):
+    """Write ``rows`` under HEADER to ``path``. Returns ``path``."""
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+    return path
+
+
+def append_unparseable_row(path, i):
+    """Append row ``i`` with one field too many, which the CSV parser refuses"""
+    with open(path, 'a', newline='') as f:
+        csv.writer(f).writerow(product(i, sku='SKU') + ['unexpected'])
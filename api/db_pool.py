@@ -0,0 +1,387 @@
+"""
+SQLite connection pool for the E-commerce Products API
+Keeps connections open between requests instead of reconnecting on every call,
+and tunes each connection for reads when it is opened (see PROFILES).
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from urllib.request import pathname2url
+
+from flask import current_app, g
+
+import metrics
+import slow_queries
+
+DEFAULT_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+DEFAULT_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 5.0))
+DEFAULT_HEALTH_CHECK_INTERVAL = float(os.environ.get('DB_POOL_HEALTH_CHECK_INTERVAL', 30.0))
+DEFAULT_PROFILE = os.environ.get('DB_PROFILE', 'read')
+DEFAULT_MMAP_SIZE = int(os.environ.get('DB_MMAP_SIZE', 256 * 1024 * 1024))
+DEFAULT_CACHE_SIZE_KIB = int(os.environ.get('DB_CACHE_SIZE_KIB', 32 * 1024))
+# Prepared statements kept per connection (sqlite3's default is 128); every
+# query shape in repository.py should fit so none is ever compiled twice
+DEFAULT_STATEMENT_CACHE_SIZE = int(os.environ.get('DB_STATEMENT_CACHE_SIZE', 256))
+
+# Connection tuning profiles: URI parameters to open with, and whether to
+# apply the read pragmas (WAL, mmap_size, cache_size, temp_store, query_only)
+#   default  SQLite's own settings
+#   read     read-optimized connections to a database that setup scripts still write
+#   replica  read-only, immutable snapshot: no locking and no change detection,
+#            for copies that are replaced rather than written in place
+PROFILES = {
+    'default': {'uri': None, 'tuned': False},
+    'read': {'uri': None, 'tuned': True},
+    'replica': {'uri': 'mode=ro&immutable=1', 'tuned': True}
+}
+
+
+def read_pragmas(profile, mmap_size=DEFAULT_MMAP_SIZE, cache_size_kib=DEFAULT_CACHE_SIZE_KIB):
+    """(pragma, value) pairs applied to each new connection of ``profile``"""
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown database profile {profile!r} (choose from {', '.join(PROFILES)})")
+    if not PROFILES[profile]['tuned']:
+        return []
+    pragmas = [] if PROFILES[profile]['uri'] else [('journal_mode', 'WAL')]
+    return pragmas + [
+        ('mmap_size', int(mmap_size)),
+        ('cache_size', -int(cache_size_kib)),  # Negative: size in KiB rather than pages
+        ('temp_store', 'MEMORY'),
+        ('query_only', 1)
+    ]
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes free within the pool timeout"""
+
+
+class _Waiter:
+    """A caller queued for a connection; release() hands one straight to it"""
+
+    __slots__ = ('ready', 'conn')
+
+    def __init__(self):
+        self.ready = threading.Event()
+        self.conn = None
+
+
+# Handed to a waiter instead of a connection when a discarded one frees a slot
+_OPEN_NEW = object()
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() hands it back to its pool.
+
+    Its cursors book their query time to the current request's metrics and,
+    when the pool has a slow-query log, report slow statements to it.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = None
+        self.slow_query_log = None
+        self.checked_out = False
+        self.lease = 0
+        self.last_used = time.monotonic()
+        self.data_version = None
+
+    def cursor(self, factory=None):
+        if factory is None:
+            factory = metrics.TimedCursor if self.slow_query_log is None else slow_queries.SlowQueryCursor
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def close(self):
+        """Return the connection to the pool (or really close it when unpooled)"""
+        if self.pool is None:
+            super().close()
+        else:
+            self.pool.release(self)
+
+    def dispose(self):
+        """Close the underlying SQLite handle"""
+        super().close()
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of SQLite connections for one database file.
+
+    Connections are opened lazily up to ``size``. When every connection is
+    checked out, callers wait up to ``timeout`` seconds for one to be returned
+    and are served first come, first served.
+    Idle connections are pinged before reuse once they have been idle for
+    longer than ``health_check_interval`` seconds. A pool that finds itself in
+    a forked child process drops the connections inherited from its parent
+    and starts over, so each worker process gets its own connections.
+    Connections opened after ``slow_query_log`` is set report to that log.
+    Each connection is opened and tuned according to ``profile`` (see PROFILES).
+    """
+
+    def __init__(self, database, size=DEFAULT_POOL_SIZE, timeout=DEFAULT_POOL_TIMEOUT,
+                 health_check_interval=DEFAULT_HEALTH_CHECK_INTERVAL, profile='default',
+                 mmap_size=DEFAULT_MMAP_SIZE, cache_size_kib=DEFAULT_CACHE_SIZE_KIB,
+                 statement_cache_size=DEFAULT_STATEMENT_CACHE_SIZE):
+        if size < 1:
+            raise ValueError('Pool size must be at least 1')
+        self.database = database
+        self.size = size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.profile = profile
+        self._pragmas = read_pragmas(profile, mmap_size, cache_size_kib)
+        self.statement_cache_size = statement_cache_size
+        self.slow_query_log = None
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = []
+        self._waiting = deque()
+        self._opened = 0
+        self._counters = {
+            'opens': 0,
+            'closes': 0,
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'health_check_failures': 0
+        }
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _check_pid(self):
+        # Connections must never be shared between a parent and a forked worker
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._reset()
+
+    def _connect(self):
+        uri = PROFILES[self.profile]['uri']
+        if uri is None:
+            return sqlite3.connect(self.database, factory=PooledConnection, check_same_thread=False,
+                                   cached_statements=self.statement_cache_size)
+        target = f'file:{pathname2url(os.path.abspath(self.database))}?{uri}'
+        return sqlite3.connect(target, uri=True, factory=PooledConnection, check_same_thread=False,
+                               cached_statements=self.statement_cache_size)
+
+    def _tune(self, conn):
+        # Plain cursor: opening a connection is not a query of the current request
+        cursor = conn.cursor(sqlite3.Cursor)
+        for name, value in self._pragmas:
+            try:
+                cursor.execute(f'PRAGMA {name} = {value}')
+            except sqlite3.OperationalError:
+                if name != 'journal_mode':
+                    raise
+                # Switching to WAL needs a moment of exclusive access (and a
+                # writable directory); keep the current journal until then
+        cursor.close()
+
+    def _open(self):
+        conn = self._connect()
+        try:
+            self._tune(conn)
+        except sqlite3.Error:
+            conn.dispose()
+            raise
+        conn.row_factory = sqlite3.Row
+        conn.pool = self
+        conn.slow_query_log = self.slow_query_log
+        self._count('opens')
+        return conn
+
+    def _discard(self, conn):
+        conn.pool = None
+        conn.checked_out = False
+        try:
+            conn.dispose()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._counters['closes'] += 1
+            if self._waiting:
+                # The slot passes to the longest waiter, which opens a fresh connection
+                waiter = self._waiting.popleft()
+                waiter.conn = _OPEN_NEW
+                waiter.ready.set()
+            else:
+                self._opened -= 1
+
+    def _is_healthy(self, conn):
+        if time.monotonic() - conn.last_used < self.health_check_interval:
+            return True
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            self._count('health_check_failures')
+            return False
+
+    def _open_reserved(self):
+        # Open a connection for a slot already counted in self._opened
+        try:
+            return self._open()
+        except Exception:
+            with self._lock:
+                self._opened -= 1
+            raise
+
+    def _take(self, deadline):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+            if self._opened < self.size:
+                self._opened += 1
+                waiter = None
+            else:
+                # Queue up; release() hands connections to waiters in arrival order,
+                # so callers arriving later cannot grab them first
+                waiter = _Waiter()
+                self._waiting.append(waiter)
+                self._counters['waits'] += 1
+
+        if waiter is None:
+            return self._open_reserved()
+
+        if not waiter.ready.wait(max(deadline - time.monotonic(), 0)):
+            with self._lock:
+                if waiter.conn is None:
+                    self._waiting.remove(waiter)
+                    self._counters['timeouts'] += 1
+                    raise PoolTimeoutError(
+                        f'No database connection available within {self.timeout}s (pool size {self.size})'
+                    )
+        if waiter.conn is _OPEN_NEW:
+            return self._open_reserved()
+        return waiter.conn
+
+    def acquire(self):
+        """Check a connection out of the pool"""
+        self._check_pid()
+        deadline = time.monotonic() + self.timeout
+        while True:
+            conn = self._take(deadline)
+            if self._is_healthy(conn):
+                break
+            self._discard(conn)
+
+        conn.checked_out = True
+        conn.lease += 1
+        self._count('checkouts')
+        return conn
+
+    def release(self, conn):
+        """Return a checked-out connection to the pool"""
+        if not conn.checked_out:
+            return
+        conn.checked_out = False
+
+        if conn.pool is not self or self._pid != os.getpid():
+            conn.pool = None
+            conn.dispose()
+            return
+
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+
+        conn.last_used = time.monotonic()
+        with self._lock:
+            if self._waiting:
+                waiter = self._waiting.popleft()
+                waiter.conn = conn
+                waiter.ready.set()
+            else:
+                self._idle.append(conn)
+
+    def close_all(self):
+        """Close every idle connection; checked-out ones close when released"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._discard(conn)
+
+    def stats(self):
+        """Snapshot of pool usage counters for monitoring"""
+        with self._lock:
+            idle = len(self._idle)
+            stats = dict(self._counters)
+            stats.update({
+                'database': self.database,
+                'size': self.size,
+                'profile': self.profile,
+                'open': self._opened,
+                'idle': idle,
+                'in_use': self._opened - idle,
+                'waiting': len(self._waiting),
+                'pid': self._pid
+            })
+        return stats
+
+
+def init_app(app, database):
+    """Attach a connection pool to a Flask app and release connections per request"""
+    app.config.setdefault('DATABASE', database)
+    app.config.setdefault('DB_POOL_SIZE', DEFAULT_POOL_SIZE)
+    app.config.setdefault('DB_POOL_TIMEOUT', DEFAULT_POOL_TIMEOUT)
+    app.config.setdefault('DB_POOL_HEALTH_CHECK_INTERVAL', DEFAULT_HEALTH_CHECK_INTERVAL)
+    app.config.setdefault('DB_PROFILE', DEFAULT_PROFILE)
+    app.config.setdefault('DB_MMAP_SIZE', DEFAULT_MMAP_SIZE)
+    app.config.setdefault('DB_CACHE_SIZE_KIB', DEFAULT_CACHE_SIZE_KIB)
+    app.config.setdefault('DB_STATEMENT_CACHE_SIZE', DEFAULT_STATEMENT_CACHE_SIZE)
+
+    app.extensions['db_pool'] = ConnectionPool(
+        app.config['DATABASE'],
+        size=app.config['DB_POOL_SIZE'],
+        timeout=app.config['DB_POOL_TIMEOUT'],
+        health_check_interval=app.config['DB_POOL_HEALTH_CHECK_INTERVAL'],
+        profile=app.config['DB_PROFILE'],
+        mmap_size=app.config['DB_MMAP_SIZE'],
+        cache_size_kib=app.config['DB_CACHE_SIZE_KIB'],
+        statement_cache_size=app.config['DB_STATEMENT_CACHE_SIZE']
+    )
+    app.teardown_appcontext(release_connection)
+    return app.extensions['db_pool']
+
+
+def get_pool(app=None):
+    """Get the connection pool attached to the (current) Flask app"""
+    return (app or current_app).extensions['db_pool']
+
+
+def _holds_lease(conn, lease):
+    # After a handler closes its connection another thread may check it out,
+    # so only the lease taken by this app context counts as ours
+    return conn is not None and conn.checked_out and conn.lease == lease
+
+
+def get_connection():
+    """Get this app context's pooled connection, checking one out if needed"""
+    conn = g.get('_db_conn')
+    if not _holds_lease(conn, g.get('_db_lease')):
+        start = time.perf_counter()
+        conn = get_pool().acquire()
+        metrics.add_time('conn', time.perf_counter() - start)
+        g._db_conn = conn
+        g._db_lease = conn.lease
+    return conn
+
+
+def release_connection(exception=None):
+    """Hand the app context's connection back to the pool"""
+    conn = g.pop('_db_conn', None)
+    lease = g.pop('_db_lease', None)
+    if _holds_lease(conn, lease):
+        conn.close()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Load-testing harness for the Milestone 5 E-commerce Products API
+Drives every read endpoint concurrently (a mixed workload) either in-process
+through the Flask test client or over HTTP against a running server, at a
+fixed request rate or as fast as the workers go, and reports p50/p95/p99
+latency and throughput per endpoint. Results can be written as JSON and
+compared with an earlier run.
+
+Usage:
+  python load_test.py                                 # in-process, 8 workers, 10 s
+  python load_test.py --rps 200 --duration 30 --output run.json
+  python load_test.py --serve asgi --concurrency 64   # start a local server first
+  python load_test.py --url http://localhost:5000 --compare run.json
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import os
+import platform
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from bench_asgi import SERVERS, free_port, percentile, start_server
+
+LOCAL_SERVERS = {'flask': SERVERS['flask (threaded)'], 'asgi': SERVERS['asgi (uvicorn)']}
+
+DEFAULT_ENDPOINTS = [
+    '/api/health',
+    '/api/products?page=1&per_page=20',
+    '/api/products?page=50&per_page=20',
+    '/api/products?cursor=&per_page=20',
+    '/api/products/1',
+    '/api/products/batch?ids=1,2,3,4,5,6,7,8,9,10',
+    '/api/products/search?q=jeans',
+    '/api/products/search?q=a&per_page=20',
+    '/api/departments',
+    '/api/departments/1',
+    '/api/departments/1/products?page=2',
+    '/api/departments/Women/products?cursor=',
+    '/api/stats'
+]
+
+
+class TestClientTarget:
+    """Sends requests through the Flask test client of app_milestone5 (no sockets)"""
+
+    name = 'flask test client'
+
+    def __init__(self, cache=True):
+        import app_milestone5
+        self.app = app_milestone5.app
+        self.app.config['RESPONSE_CACHE_ENABLED'] = cache
+        self._local = threading.local()
+
+    def get(self, path):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.get(path)
+        response.get_data()
+        return response.status_code
+
+
+class HTTPTarget:
+    """Sends requests over one keep-alive HTTP connection per worker thread"""
+
+    def __init__(self, url, timeout=30.0):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.name = f'http://{self.host}:{self.port}'
+        self._local = threading.local()
+
+    def get(self, path):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            if response.will_close:
+                conn.close()
+                self._local.conn = None
+            return response.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self._local.conn = None
+            raise
+
+
+def run_load(target, endpoints, concurrency=8, duration=10.0, rps=0.0, requests=0):
+    """Run the workload and return the raw samples: {endpoint: [(latency, status), ...]}.
+
+    With ``rps`` the requests follow a fixed schedule (open loop) and latency
+    is measured from the scheduled start, so a stalled server shows up in the
+    percentiles instead of silently lowering the request rate.
+    """
+    samples = {endpoint: [] for endpoint in endpoints}
+    counter = itertools.count()
+    lock = threading.Lock()
+    start = time.perf_counter() + 0.05
+    deadline = start + duration
+
+    def worker():
+        while True:
+            with lock:
+                index = next(counter)
+            if requests and index >= requests:
+                return
+            scheduled = start + index / rps if rps else time.perf_counter()
+            if scheduled >= deadline and not requests:
+                return
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+            endpoint = endpoints[index % len(endpoints)]
+            try:
+                status = target.get(endpoint)
+            except Exception:
+                status = 0
+            latency = time.perf_counter() - scheduled
+            with lock:
+                samples[endpoint].append((latency, status))
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - start
+
+
+def summarize(samples, elapsed):
+    """Per-endpoint and overall latency/throughput statistics (milliseconds, requests/second)"""
+    def stats(entries):
+        latencies = sorted(latency for latency, _ in entries)
+        errors = sum(1 for _, status in entries if not 200 <= status < 400)
+        return {
+            'requests': len(entries),
+            'errors': errors,
+            'throughput_rps': round(len(entries) / elapsed, 2) if elapsed else 0.0,
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+            'max_ms': round(latencies[-1] * 1000, 3) if latencies else 0.0
+        }
+
+    return {
+        'endpoints': {endpoint: stats(entries) for endpoint, entries in samples.items()},
+        'overall': stats([entry for entries in samples.values() for entry in entries])
+    }
+
+
+def print_report(report, baseline=None):
+    print(f"{'endpoint':<46} {'reqs':>6} {'err':>4} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}"
+          + ('  p95 vs baseline' if baseline else ''))
+    print("-" * (96 + (18 if baseline else 0)))
+    rows = list(report['endpoints'].items()) + [('ALL', report['overall'])]
+    for endpoint, stats in rows:
+        line = (f"{endpoint[:46]:<46} {stats['requests']:>6} {stats['errors']:>4} {stats['throughput_rps']:>8.1f} "
+                f"{stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f}")
+        if baseline:
+            before = baseline['overall'] if endpoint == 'ALL' else baseline['endpoints'].get(endpoint)
+            if before and before['p95_ms']:
+                line += f"  {(stats['p95_ms'] / before['p95_ms'] - 1) * 100:+7.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the Milestone 5 API')
+    parser.add_argument('--url', help='base URL of a running server (default: in-process test client)')
+    parser.add_argument('--serve', choices=sorted(LOCAL_SERVERS), help='start a local server of this kind and test it')
+    parser.add_argument('--concurrency', type=int, default=8, help='worker threads')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds to run')
+    parser.add_argument('--requests', type=int, default=0, help='stop after this many requests instead')
+    parser.add_argument('--rps', type=float, default=0.0, help='target request rate (0 = as fast as possible)')
+    parser.add_argument('--endpoint', action='append', dest='endpoints', help='endpoint to include (repeatable)')
+    parser.add_argument('--no-cache', action='store_true', help='disable the response cache')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare p95 latency with')
+    args = parser.parse_args()
+
+    endpoints = args.endpoints or DEFAULT_ENDPOINTS
+    server = None
+    if args.serve:
+        port = free_port()
+        server = start_server(LOCAL_SERVERS[args.serve], port, cache=not args.no_cache)
+        if server is None:
+            raise SystemExit(f"❌ Could not start the {args.serve} server")
+        target = HTTPTarget(f'http://127.0.0.1:{port}')
+    elif args.url:
+        target = HTTPTarget(args.url)
+    else:
+        target = TestClientTarget(cache=not args.no_cache)
+
+    try:
+        run(target, endpoints, args)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+def run(target, endpoints, args):
+    print(f"🚀 Load test against {target.name}: {len(endpoints)} endpoints, {args.concurrency} workers, "
+          + (f"{args.requests} requests" if args.requests else f"{args.duration:g} s")
+          + (f" at {args.rps:g} req/s" if args.rps else " flat out"))
+    samples, elapsed = run_load(target, endpoints, args.concurrency, args.duration, args.rps, args.requests)
+    report = summarize(samples, elapsed)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.output:
+        report['run'] = {
+            'timestamp': datetime.now().isoformat(),
+            'target': target.name,
+            'concurrency': args.concurrency,
+            'duration_s': round(elapsed, 3),
+            'rps_target': args.rps,
+            'response_cache': None if args.url else not args.no_cache,
+            'python': platform.python_version(),
+            'cpu_count': os.cpu_count()
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,262 @@
+"""
+Request metrics for the E-commerce Products API
+Splits each request's time into connection checkout, SQL execution, row fetch
+and JSON serialization, reports the split in a Server-Timing header and keeps
+per-route latency histograms, status-code counters and per-query totals (by
+repository query name) that /api/metrics exposes in the Prometheus text format.
+"""
+
+import bisect
+import contextvars
+import os
+import sqlite3
+import threading
+import time
+
+from flask import current_app, request
+
+PHASES = ('conn', 'sql', 'fetch', 'json')
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Fields of ConnectionPool.stats() and ResponseCache.stats() worth exporting
+POOL_COUNTERS = ('opens', 'closes', 'checkouts', 'waits', 'timeouts', 'health_check_failures')
+POOL_GAUGES = ('size', 'open', 'idle', 'in_use', 'waiting')
+CACHE_COUNTERS = ('hits', 'misses', 'stores', 'evictions', 'invalidations', 'oversized', 'encodings_stored')
+CACHE_GAUGES = ('entries', 'bytes', 'max_entries', 'max_bytes')
+
+# Seconds spent per phase by the request running in this context (None outside one)
+_phases = contextvars.ContextVar('request_phases', default=None)
+# Metrics registry of the app handling the request running in this context
+_registry = contextvars.ContextVar('request_metrics_registry', default=None)
+
+
+def add_time(phase, seconds):
+    """Book ``seconds`` to ``phase`` of the current request; a no-op outside requests"""
+    phases = _phases.get()
+    if phases is not None:
+        phases[phase] += seconds
+
+
+def add_query(name, seconds, rows):
+    """Book one run of the named repository query to the current app's metrics; a no-op outside requests"""
+    registry = _registry.get()
+    if registry is not None:
+        registry.observe_query(name, seconds, rows)
+
+
+class TimedCursor(sqlite3.Cursor):
+    """sqlite3 cursor that books execute() time as 'sql' and fetch*() time as 'fetch'.
+
+    SQLite steps to the first row inside execute(), so 'sql' covers planning
+    and finding the first row and 'fetch' the rest. Rows read by iterating
+    over the cursor are not timed.
+    """
+
+    def execute(self, sql, parameters=()):
+        phases = _phases.get()
+        if phases is None:
+            return super().execute(sql, parameters)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            phases['sql'] += time.perf_counter() - start
+
+    def executemany(self, sql, seq_of_parameters):
+        phases = _phases.get()
+        if phases is None:
+            return super().executemany(sql, seq_of_parameters)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            phases['sql'] += time.perf_counter() - start
+
+    def fetchone(self):
+        phases = _phases.get()
+        if phases is None:
+            return super().fetchone()
+        start = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            phases['fetch'] += time.perf_counter() - start
+
+    def fetchmany(self, size=None):
+        phases = _phases.get()
+        size = self.arraysize if size is None else size
+        if phases is None:
+            return super().fetchmany(size)
+        start = time.perf_counter()
+        try:
+            return super().fetchmany(size)
+        finally:
+            phases['fetch'] += time.perf_counter() - start
+
+    def fetchall(self):
+        phases = _phases.get()
+        if phases is None:
+            return super().fetchall()
+        start = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            phases['fetch'] += time.perf_counter() - start
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class RequestMetrics:
+    """Thread-safe per-route request counters, latency histograms and phase totals, plus per-query totals"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._requests = {}   # (route, method, status) -> count
+        self._latency = {}    # route -> [bucket counts (last one is +Inf), sum of seconds]
+        self._phase_seconds = {}  # (route, phase) -> seconds
+        self._queries = {}  # query name -> [runs, seconds, rows]
+
+    def observe(self, route, method, status, seconds, phases=None):
+        """Record one finished request"""
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            key = (route, method, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            histogram = self._latency.get(route)
+            if histogram is None:
+                histogram = self._latency[route] = [[0] * (len(self.buckets) + 1), 0.0]
+            histogram[0][index] += 1
+            histogram[1] += seconds
+            for phase, spent in (phases or {}).items():
+                if spent:
+                    self._phase_seconds[(route, phase)] = self._phase_seconds.get((route, phase), 0.0) + spent
+
+    def observe_query(self, name, seconds, rows):
+        """Record one run of a named query"""
+        with self._lock:
+            totals = self._queries.get(name)
+            if totals is None:
+                totals = self._queries[name] = [0, 0.0, 0]
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] += rows
+
+    def render(self):
+        """The metrics in the Prometheus text exposition format"""
+        with self._lock:
+            requests = sorted(self._requests.items())
+            latency = sorted((route, list(counts), total) for route, (counts, total) in self._latency.items())
+            phase_seconds = sorted(self._phase_seconds.items())
+            queries = sorted((name, list(totals)) for name, totals in self._queries.items())
+
+        lines = [
+            '# HELP api_requests_total Requests handled, by route, method and status code.',
+            '# TYPE api_requests_total counter'
+        ]
+        for (route, method, status), count in requests:
+            lines.append(f'api_requests_total{_labels(route=route, method=method, status=status)} {count}')
+
+        lines += [
+            '# HELP api_request_duration_seconds Time from routing to the response headers, by route.',
+            '# TYPE api_request_duration_seconds histogram'
+        ]
+        for route, counts, total in latency:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'api_request_duration_seconds_bucket{_labels(route=route, le=bound)} {cumulative}')
+            lines.append(f'api_request_duration_seconds_sum{_labels(route=route)} {_number(total)}')
+            lines.append(f'api_request_duration_seconds_count{_labels(route=route)} {cumulative}')
+
+        lines += [
+            '# HELP api_request_phase_seconds_total Time spent in connection checkout, SQL, row fetch '
+            'and JSON encoding, by route.',
+            '# TYPE api_request_phase_seconds_total counter'
+        ]
+        for (route, phase), seconds in phase_seconds:
+            lines.append(f'api_request_phase_seconds_total{_labels(route=route, phase=phase)} {_number(seconds)}')
+
+        for index, (metric, description) in enumerate((
+            ('api_query_runs_total', 'Runs of each named repository query.'),
+            ('api_query_seconds_total', 'Time spent executing and fetching each named repository query.'),
+            ('api_query_rows_total', 'Rows returned by each named repository query.')
+        )):
+            lines += [f'# HELP {metric} {description}', f'# TYPE {metric} counter']
+            for name, totals in queries:
+                lines.append(f'{metric}{_labels(query=name)} {_number(totals[index])}')
+        return '\n'.join(lines) + '\n'
+
+
+def render_stats(prefix, stats, counters=(), gauges=()):
+    """Prometheus text for selected fields of a stats() dict (counters get a _total suffix)"""
+    lines = []
+    for name in counters:
+        lines += [f'# TYPE {prefix}_{name}_total counter', f'{prefix}_{name}_total {_number(stats[name])}']
+    for name in gauges:
+        lines += [f'# TYPE {prefix}_{name} gauge', f'{prefix}_{name} {_number(stats[name])}']
+    return '\n'.join(lines) + '\n' if lines else ''
+
+
+def server_timing(phases, total):
+    """Server-Timing header value (durations in milliseconds)"""
+    parts = [f'{phase};dur={seconds * 1000:.3f}' for phase, seconds in phases.items()]
+    parts.append(f'total;dur={total * 1000:.3f}')
+    return ', '.join(parts)
+
+
+def init_app(app):
+    """Time every request of a Flask app and attach its metrics registry"""
+    app.config.setdefault('METRICS_ENABLED', os.environ.get('METRICS_ENABLED', '1') != '0')
+    app.config.setdefault('SERVER_TIMING_ENABLED', os.environ.get('SERVER_TIMING_ENABLED', '1') != '0')
+    registry = app.extensions['request_metrics'] = RequestMetrics()
+
+    # The hooks read app.config directly and keep the start time next to the
+    # phase totals, so timing a request costs no context-local lookups
+    @app.before_request
+    def start_request():
+        if app.config['METRICS_ENABLED']:
+            phases = dict.fromkeys(PHASES, 0.0)
+            phases['start'] = time.perf_counter()
+            _phases.set(phases)
+            _registry.set(registry)
+
+    @app.after_request
+    def finish_request(response):
+        phases = _phases.get()
+        if phases is None:
+            return response
+        _phases.set(None)
+        elapsed = time.perf_counter() - phases.pop('start')
+
+        rule = request.url_rule
+        registry.observe(rule.rule if rule is not None else 'unmatched', request.method,
+                         response.status_code, elapsed, phases)
+        if app.config['SERVER_TIMING_ENABLED']:
+            response.headers['Server-Timing'] = server_timing(phases, elapsed)
+        return response
+
+    @app.teardown_request
+    def end_request(exception=None):
+        # Stop booking time to this request even if after_request never ran
+        # (queries of a streamed response still count until the stream ends)
+        _phases.set(None)
+        _registry.set(None)
+
+    return registry
+
+
+def get_metrics(app=None):
+    """Get the metrics registry attached to the (current) Flask app"""
+    return (app or current_app).extensions['request_metrics']
@@ -0,0 +1,69 @@
+"""
+Keyset (cursor) pagination helpers for the E-commerce Products API
+A cursor is an opaque token holding the sort key of the last row on a page,
+so the next page starts with an index seek instead of an OFFSET scan.
+"""
+
+import base64
+import binascii
+import json
+
+
+def encode_cursor(values):
+    """Encode the sort key of the last row of a page as an opaque token"""
+    raw = json.dumps(list(values), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, size):
+    """Decode a cursor token into its sort key values.
+
+    An empty token means "start from the beginning" and returns None.
+    Raises ValueError for anything that was not produced by encode_cursor.
+    """
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw.decode('utf-8'))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError('Invalid cursor')
+
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError('Invalid cursor')
+    if not isinstance(values[-1], int) or isinstance(values[-1], bool):
+        raise ValueError('Invalid cursor')
+    if any(value is not None and not isinstance(value, str) for value in values[:-1]):
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def keyset_condition(columns, values):
+    """SQL condition (and parameters) selecting rows after ``values`` in ``columns`` order.
+
+    ``columns`` is e.g. ('p.id',) or ('p.name', 'p.id'); the last column must be
+    unique. SQLite sorts NULL first, so a NULL leading value means the page ended
+    inside the NULL group.
+    """
+    if len(columns) == 1:
+        return f'{columns[0]} > ?', [values[0]]
+
+    lead, tie = columns
+    if values[0] is None:
+        return f'(({lead} IS NULL AND {tie} > ?) OR {lead} IS NOT NULL)', [values[1]]
+    return f'({lead}, {tie}) > (?, ?)', list(values)
+
+
+def cursor_pagination(per_page, rows, key, cursor=None):
+    """Pagination block for a cursor-mode response.
+
+    ``rows`` holds up to per_page + 1 rows; the extra row only signals that
+    another page exists. ``key`` maps a row to its sort key values.
+    """
+    has_next = len(rows) > per_page
+    return {
+        'per_page': per_page,
+        'cursor': cursor or None,
+        'next_cursor': encode_cursor(key(rows[per_page - 1])) if has_next else None,
+        'has_next': has_next
+    }
@@ -0,0 +1,371 @@
+"""
+Shared data access for the E-commerce Products API
+Every statement the three API versions run against the catalog is a named
+Query here, and handlers run them with rows(), row(), value() or chunks().
+Those helpers map rows to dicts by column name and book each run's time and
+row count under the query's name. A query's SQL text is built once per shape
+(fieldset, keyset condition, ...) and reused verbatim afterwards, so sqlite3's
+per-connection statement cache compiles each shape once and later calls skip
+parsing and planning.
+"""
+
+import time
+
+import metrics
+import serialization
+
+# Product columns of the original schema (app.py), where department is a text column
+ORIGINAL_COLUMNS = 'id, name, brand, retail_price, cost, category, department, sku, distribution_center_id'
+
+# SQL text -> query name, for reports that only see the statement (e.g. the slow-query log)
+_names = {}
+
+
+class Query:
+    """A named SQL statement.
+
+    ``template`` may contain {select} and {join}, filled from the requested
+    product fields, and other {placeholders} filled from keyword parts. The
+    text of each distinct shape is built once and then reused as is.
+    """
+
+    __slots__ = ('name', 'template', '_shapes')
+
+    def __init__(self, name, template):
+        self.name = name
+        self.template = template
+        self._shapes = {}
+
+    def sql(self, fields=None, required=(), **parts):
+        """SQL text of this query for ``fields`` (None: every product field) and ``parts``"""
+        key = (fields, required, tuple(sorted(parts.items())))
+        sql = self._shapes.get(key)
+        if sql is None:
+            if '{select}' in self.template:
+                parts['select'], parts['join'] = serialization.product_select(fields, required)
+            sql = ' '.join(self.template.format(**parts).split())
+            self._shapes[key] = sql
+            _names[sql] = self.name
+        return sql
+
+    def __repr__(self):
+        return f'Query({self.name!r})'
+
+
+# ---------------------------------------------------------------------------
+# Original schema (app.py)
+# ---------------------------------------------------------------------------
+
+ORIGINAL_PRODUCTS_PAGE = Query('original.products.page', f'''
+    SELECT {ORIGINAL_COLUMNS}
+    FROM products
+    ORDER BY id
+    LIMIT ? OFFSET ?
+''')
+
+ORIGINAL_PRODUCT_BY_ID = Query('original.products.by_id', f'''
+    SELECT {ORIGINAL_COLUMNS}
+    FROM products
+    WHERE id = ?
+''')
+
+ORIGINAL_PRODUCTS_LIKE = Query('original.products.like', f'''
+    SELECT {ORIGINAL_COLUMNS}
+    FROM products
+    WHERE name LIKE ? OR brand LIKE ? OR category LIKE ?
+    ORDER BY id
+    LIMIT 20
+''')
+
+ORIGINAL_PRODUCTS_BY_CATEGORY = Query('original.products.by_category', f'''
+    SELECT {ORIGINAL_COLUMNS}
+    FROM products
+    WHERE category = ?
+    ORDER BY id
+    LIMIT 50
+''')
+
+ORIGINAL_PRODUCTS_BY_DEPARTMENT = Query('original.products.by_department', f'''
+    SELECT {ORIGINAL_COLUMNS}
+    FROM products
+    WHERE department = ?
+    ORDER BY id
+    LIMIT 50
+''')
+
+ORIGINAL_DEPARTMENT_COUNTS = Query('original.stats.departments', '''
+    SELECT department, COUNT(*) as count
+    FROM products
+    GROUP BY department
+''')
+
+ORIGINAL_PRICE_STATS = Query('original.stats.prices', '''
+    SELECT MIN(retail_price) as min_price, MAX(retail_price) as max_price, AVG(retail_price) as avg_price
+    FROM products
+''')
+
+# ---------------------------------------------------------------------------
+# Departments schema (Milestones 4 and 5)
+# ---------------------------------------------------------------------------
+
+PRODUCTS_PAGE = Query('products.page', '''
+    SELECT {select}
+    FROM products p
+    {join}
+    ORDER BY p.id
+    LIMIT ? OFFSET ?
+''')
+
+# {where}: '' for the first page, else 'WHERE <keyset condition on p.id>'
+PRODUCTS_AFTER = Query('products.after', '''
+    SELECT {select}
+    FROM products p
+    {join}
+    {where}
+    ORDER BY p.id
+    LIMIT ?
+''')
+
+PRODUCT_BY_ID = Query('products.by_id', '''
+    SELECT {select}
+    FROM products p
+    {join}
+    WHERE p.id = ?
+''')
+
+# {ids}: placeholders from in_list()
+PRODUCTS_BY_IDS = Query('products.by_ids', '''
+    SELECT {select}
+    FROM products p
+    {join}
+    WHERE p.id IN ({ids})
+''')
+
+PRODUCTS_LIKE = Query('products.like', '''
+    SELECT {select}
+    FROM products p
+    {join}
+    WHERE p.name LIKE ? OR p.brand LIKE ? OR p.category LIKE ?
+    ORDER BY p.name
+''')
+
+# {where}: '' for the first batch of the whole catalog, else 'WHERE' with
+# 'p.department_id = ?' and/or a keyset condition on p.id, in that order
+PRODUCTS_EXPORT = Query('products.export', '''
+    SELECT {select}
+    FROM products p
+    {join}
+    {where}
+    ORDER BY p.id
+    LIMIT ?
+''')
+
+# {source} and {condition}: from search.match_filter(), plus any keyset condition
+SEARCH_PAGE = Query('products.search', '''
+    SELECT {select}
+    FROM {source}
+    {join}
+    WHERE {condition}
+    ORDER BY p.name, p.id
+    LIMIT ? OFFSET ?
+''')
+
+SEARCH_COUNT = Query('products.search_count', '''
+    SELECT COUNT(*) FROM (SELECT 1 FROM {source} WHERE {condition} LIMIT ?)
+''')
+
+DEPARTMENT_PRODUCTS = Query('departments.products', '''
+    SELECT {select}
+    FROM products p
+    {join}
+    WHERE p.department_id = (SELECT id FROM departments WHERE name = ?)
+    ORDER BY p.name, p.id
+''')
+
+DEPARTMENT_PRODUCTS_PAGE = Query('departments.products.page', '''
+    SELECT {select}
+    FROM products p
+    {join}
+    WHERE p.department_id = ?
+    ORDER BY p.name, p.id
+    LIMIT ? OFFSET ?
+''')
+
+# {seek}: '' for the first page, else 'AND <keyset condition on (p.name, p.id)>'
+DEPARTMENT_PRODUCTS_AFTER = Query('departments.products.after', '''
+    SELECT {select}
+    FROM products p
+    {join}
+    WHERE p.department_id = ? {seek}
+    ORDER BY p.name, p.id
+    LIMIT ?
+''')
+
+NAMED_DEPARTMENT_PRODUCTS_PAGE = Query('departments.named_products.page', '''
+    SELECT {select}
+    FROM products p
+    {join}
+    WHERE p.department_id = (SELECT id FROM departments WHERE name = ?)
+    ORDER BY p.name, p.id
+    LIMIT ? OFFSET ?
+''')
+
+NAMED_DEPARTMENT_PRODUCTS_AFTER = Query('departments.named_products.after', '''
+    SELECT {select}
+    FROM products p
+    {join}
+    WHERE p.department_id = (SELECT id FROM departments WHERE name = ?) {seek}
+    ORDER BY p.name, p.id
+    LIMIT ?
+''')
+
+DEPARTMENTS = Query('departments.list', 'SELECT id, name, created_at, updated_at FROM departments ORDER BY id')
+
+DEPARTMENT_BY_ID = Query('departments.by_id', 'SELECT id, name FROM departments WHERE id = ?')
+
+DEPARTMENT_BY_NAME = Query('departments.by_name', 'SELECT id, name FROM departments WHERE name = ?')
+
+DEPARTMENT_BREAKDOWN = Query('stats.departments', '''
+    SELECT d.name, COUNT(p.id) as product_count
+    FROM departments d
+    LEFT JOIN products p ON d.id = p.department_id
+    GROUP BY d.id, d.name
+    ORDER BY d.id
+''')
+
+PRICE_STATS = Query('stats.prices', '''
+    SELECT AVG(retail_price) as avg_price, MIN(retail_price) as min_price, MAX(retail_price) as max_price
+    FROM products
+''')
+
+# ---------------------------------------------------------------------------
+# Catalog aggregates (database_setup/catalog_aggregates.py), see aggregates.py.
+# Each has a fallback scanning products for databases without the tables.
+# ---------------------------------------------------------------------------
+
+AGGREGATE_TABLES = Query('aggregates.available',
+                         "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'catalog_stats'")
+
+AGGREGATE_PRODUCT_COUNT = Query('aggregates.products', 'SELECT COALESCE(SUM(product_count), 0) FROM department_stats')
+
+# {where}: 'd.id = ?' or 'd.name = ?'
+AGGREGATE_DEPARTMENT_PRODUCT_COUNT = Query('aggregates.department_products', '''
+    SELECT COALESCE(SUM(s.product_count), 0)
+    FROM departments d
+    JOIN department_stats s ON s.department_id = d.id
+    WHERE {where}
+''')
+
+DEPARTMENT_PRODUCT_COUNT = Query('stats.department_products', '''
+    SELECT COUNT(*)
+    FROM products p
+    JOIN departments d ON p.department_id = d.id
+    WHERE {where}
+''')
+
+# {where}: '' for every department, else 'WHERE d.id = ?'
+AGGREGATE_DEPARTMENTS = Query('aggregates.departments', '''
+    SELECT d.id, d.name, d.created_at, d.updated_at,
+           COALESCE(s.product_count, 0) as product_count
+    FROM departments d
+    LEFT JOIN department_stats s ON s.department_id = d.id
+    {where}
+    ORDER BY d.id
+''')
+
+DEPARTMENTS_WITH_COUNTS = Query('departments.with_counts', '''
+    SELECT d.id, d.name, d.created_at, d.updated_at,
+           COUNT(p.id) as product_count
+    FROM departments d
+    LEFT JOIN products p ON d.id = p.department_id
+    {where}
+    GROUP BY d.id, d.name, d.created_at, d.updated_at
+    ORDER BY d.id
+''')
+
+AGGREGATE_PRICE_TOTALS = Query('aggregates.prices', '''
+    SELECT COALESCE(SUM(product_count), 0) as product_count, SUM(price_sum) as price_sum,
+           MIN(price_min) as min_price, MAX(price_max) as max_price
+    FROM department_stats
+''')
+
+AGGREGATE_CATALOG_STATS = Query('aggregates.catalog', '''
+    SELECT brand_count, category_count FROM catalog_stats WHERE id = 1
+''')
+
+# ---------------------------------------------------------------------------
+# Both schemas
+# ---------------------------------------------------------------------------
+
+COUNT_PRODUCTS = Query('stats.products', 'SELECT COUNT(*) FROM products')
+COUNT_CATEGORIES = Query('stats.categories', 'SELECT COUNT(DISTINCT category) FROM products')
+COUNT_BRANDS = Query('stats.brands', 'SELECT COUNT(DISTINCT brand) FROM products')
+COUNT_DEPARTMENTS = Query('stats.department_count', 'SELECT COUNT(*) FROM departments')
+
+
+def query_name(sql):
+    """Name of the query whose SQL text is ``sql``, or None for statements run outside this module"""
+    return _names.get(sql)
+
+
+def in_list(values):
+    """({ids} placeholders, parameters) for an IN list of ``values``.
+
+    The list is padded with NULLs (which equal nothing) to the next power of
+    two, so lists of similar length share one statement text and with it one
+    prepared statement.
+    """
+    size = 1 << (len(values) - 1).bit_length() if values else 1
+    return ', '.join('?' * size), [*values, *[None] * (size - len(values))]
+
+
+def rows(conn, query, params=(), **parts):
+    """Every row of ``query`` as a dict keyed by column name"""
+    start = time.perf_counter()
+    result = serialization.fetch_dicts(conn, query.sql(**parts), params)
+    metrics.add_query(query.name, time.perf_counter() - start, len(result))
+    return result
+
+
+def row(conn, query, params=(), **parts):
+    """The first row of ``query`` as a dict, or None when there is none"""
+    start = time.perf_counter()
+    result = serialization.fetch_dict(conn, query.sql(**parts), params)
+    metrics.add_query(query.name, time.perf_counter() - start, int(result is not None))
+    return result
+
+
+def value(conn, query, params=(), **parts):
+    """The first column of the first row of ``query`` (None when there is no row)"""
+    start = time.perf_counter()
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    found = cursor.execute(query.sql(**parts), params).fetchone()
+    cursor.close()
+    metrics.add_query(query.name, time.perf_counter() - start, int(found is not None))
+    return found[0] if found is not None else None
+
+
+def chunks(conn, query, params=(), size=1000, **parts):
+    """Yield the rows of ``query`` as lists of up to ``size`` tuples.
+
+    Only time spent in SQLite is booked to the query, not time the caller
+    spends between chunks.
+    """
+    start = time.perf_counter()
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    cursor.execute(query.sql(**parts), params)
+    elapsed, count = time.perf_counter() - start, 0
+    try:
+        while True:
+            start = time.perf_counter()
+            batch = cursor.fetchmany(size)
+            elapsed += time.perf_counter() - start
+            if not batch:
+                break
+            count += len(batch)
+            yield batch
+    finally:
+        cursor.close()
+        metrics.add_query(query.name, elapsed, count)
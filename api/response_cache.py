@@ -0,0 +1,229 @@
+"""
+In-process response cache for the read endpoints of the E-commerce Products API
+Entries are keyed by route + normalized query string, bounded by count and bytes
+(least recently used entries are evicted first) and dropped as soon as the
+catalog version changes. Compressed copies of an entry's body are kept with it.
+"""
+
+import functools
+import os
+import threading
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from flask import current_app, request
+
+import compression
+import conditional
+import db_pool
+import versioning
+
+DEFAULT_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 1024))
+DEFAULT_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+
+
+class CachedResponse:
+    """Serialized body of a response plus what is needed to replay it.
+
+    ``encoded`` maps content codings ('gzip', 'br') to compressed copies
+    of the body; ``size`` counts them too.
+    """
+
+    __slots__ = ('body', 'status', 'mimetype', 'size', 'encoded')
+
+    def __init__(self, body, status, mimetype):
+        self.body = body
+        self.status = status
+        self.mimetype = mimetype
+        self.size = len(body)
+        self.encoded = {}
+
+
+class ResponseCache:
+    """Thread-safe LRU cache of responses that is cleared when the version changes"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._version = None
+        self._counters = {
+            'hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'invalidations': 0,
+            'oversized': 0,
+            'encodings_stored': 0
+        }
+
+    def _sync_version(self, version):
+        # Called with the lock held; everything cached under an older version is stale
+        if version != self._version:
+            if self._entries:
+                self._counters['invalidations'] += 1
+            self._entries.clear()
+            self._bytes = 0
+            self._version = version
+
+    def get(self, key, version):
+        """Cached response for ``key`` at catalog ``version``, or None"""
+        with self._lock:
+            self._sync_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+            return entry
+
+    def put(self, key, version, entry):
+        """Store ``entry`` computed at catalog ``version``"""
+        size = entry.size + len(key)
+        with self._lock:
+            if self._version is None:
+                self._version = version
+            if version != self._version:
+                # The catalog moved on while this response was being built
+                return
+            if size > self.max_bytes:
+                self._counters['oversized'] += 1
+                return
+
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size + len(key)
+            self._entries[key] = entry
+            self._bytes += size
+            self._counters['stores'] += 1
+            self._evict()
+
+    def put_encoded(self, key, version, entry, encoding, data):
+        """Keep ``data``, the ``encoding``-compressed body of the cached ``entry``"""
+        with self._lock:
+            if version != self._version or self._entries.get(key) is not entry:
+                # Evicted or invalidated since it was looked up
+                return
+            if entry.size + len(key) + len(data) > self.max_bytes:
+                self._counters['oversized'] += 1
+                return
+            entry.encoded[encoding] = data
+            entry.size += len(data)
+            self._bytes += len(data)
+            self._counters['encodings_stored'] += 1
+            self._evict()
+
+    def _evict(self):
+        # Called with the lock held: drop least recently used entries until within bounds
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            old_key, old = self._entries.popitem(last=False)
+            self._bytes -= old.size + len(old_key)
+            self._counters['evictions'] += 1
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._version = None
+
+    def stats(self):
+        """Snapshot of cache counters for monitoring"""
+        with self._lock:
+            stats = dict(self._counters)
+            lookups = stats['hits'] + stats['misses']
+            stats.update({
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hit_ratio': round(stats['hits'] / lookups, 4) if lookups else 0.0
+            })
+        return stats
+
+
+def cache_key(req=None):
+    """Route plus query string with parameters sorted, so equivalent URLs share an entry"""
+    req = req or request
+    args = sorted(req.args.items(multi=True))
+    return f'{req.path}?{urlencode(args)}' if args else req.path
+
+
+def init_app(app):
+    """Attach a response cache to a Flask app"""
+    app.config.setdefault('RESPONSE_CACHE_ENABLED', os.environ.get('RESPONSE_CACHE_ENABLED', '1') != '0')
+    app.config.setdefault('RESPONSE_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+    app.config.setdefault('RESPONSE_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)
+
+    app.extensions['response_cache'] = ResponseCache(
+        max_entries=app.config['RESPONSE_CACHE_MAX_ENTRIES'],
+        max_bytes=app.config['RESPONSE_CACHE_MAX_BYTES']
+    )
+    return app.extensions['response_cache']
+
+
+def get_cache(app=None):
+    """Get the response cache attached to the (current) Flask app"""
+    return (app or current_app).extensions['response_cache']
+
+
+def cached(view):
+    """Serve a read-only JSON view from the response cache when the catalog is unchanged.
+
+    Also answers conditional GETs: responses carry a strong ETag and
+    Last-Modified derived from the catalog generation, and a matching
+    If-None-Match / If-Modified-Since gets a 304 before the view runs.
+
+    Responses the client accepts compressed are compressed once per
+    content coding and the compressed bytes kept with the cache entry.
+
+    Only 200 responses are stored. The catalog version is read before the
+    view runs, so a change racing with the view can only make an entry
+    expire early, never serve stale data.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            # The key only covers the query string, so request bodies must not be served from it
+            return view(*args, **kwargs)
+
+        version = versioning.catalog_version(db_pool.get_connection())
+        key = cache_key()
+
+        etag, last_modified = conditional.validators(version[0], key, current_app.name)
+        if etag:
+            # Compressed representations carry their own ETags; any of them still matches
+            for candidate in compression.etag_variants(etag):
+                if conditional.not_modified(candidate, last_modified):
+                    response = current_app.response_class(status=304)
+                    return conditional.add_validators(response, candidate, last_modified)
+
+        cache = get_cache() if current_app.config['RESPONSE_CACHE_ENABLED'] else None
+        entry = cache.get(key, version) if cache else None
+        if entry is None:
+            response = current_app.make_response(view(*args, **kwargs))
+            if cache and response.status_code == 200 and not response.is_streamed:
+                entry = CachedResponse(response.get_data(), response.status_code, response.mimetype)
+                cache.put(key, version, entry)
+        else:
+            response = current_app.response_class(entry.body, status=entry.status, mimetype=entry.mimetype)
+
+        if etag and response.status_code == 200:
+            conditional.add_validators(response, etag, last_modified)
+
+        # Compress here rather than in the after_request hook, so the
+        # compressed bytes are cached with the entry and reused
+        encoding = compression.negotiate(response)
+        if encoding:
+            data = entry.encoded.get(encoding) if entry is not None else None
+            if data is None:
+                data = compression.compress(response.get_data(), encoding)
+                if entry is not None:
+                    cache.put_encoded(key, version, entry, encoding, data)
+            compression.apply(response, encoding, data)
+        return response
+
+    return wrapper
@@ -0,0 +1,58 @@
+"""
+Full-text search helpers for the E-commerce Products API
+Queries go to the products_fts FTS5 index built by database_setup/search_index.py.
+"""
+
+import re
+
+import repository
+
+WORD_RE = re.compile(r'\w+')
+
+
+def build_match_query(text):
+    """Turn free text into an FTS5 query, or None when it has no searchable words.
+
+    Every word must match (in name, brand or category) and the last typed
+    characters of each word are treated as a prefix, so "lev jea" finds
+    "Levi's Jeans" while the user is still typing.
+    """
+    words = WORD_RE.findall(text)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def has_search_index(conn):
+    """Whether the database has been given the products_fts index"""
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'"
+    ).fetchone()
+    return row is not None
+
+
+def match_filter(conn, text):
+    """FROM source, WHERE condition and parameters selecting the products matching ``text``.
+
+    Word-prefix lookup in the FTS5 index when there is one and the text has
+    words; otherwise substring matching on name, brand and category.
+    """
+    match = build_match_query(text)
+    if match and has_search_index(conn):
+        return 'products_fts JOIN products p ON p.id = products_fts.rowid', 'products_fts MATCH ?', [match]
+    pattern = f'%{text}%'
+    return 'products p', '(p.name LIKE ? OR p.brand LIKE ? OR p.category LIKE ?)', [pattern] * 3
+
+
+def count_matches(conn, source, condition, params, limit=None):
+    """Number of products matching a filter, and whether that number is exact.
+
+    With a ``limit`` counting stops after limit + 1 matches, so a query that
+    matches most of the catalog costs no more than a bounded page; the count is
+    then reported as ``limit`` and not exact.
+    """
+    total = repository.value(conn, repository.SEARCH_COUNT, (*params, -1 if limit is None else limit + 1),
+                             source=source, condition=condition)
+    if limit is not None and total > limit:
+        return limit, False
+    return total, True
@@ -0,0 +1,156 @@
+"""
+Row serialization for the E-commerce Products API
+Maps cursor tuples to JSON-ready dicts through the cursor's column names (one
+C-level zip per row instead of hand-copying keys) and, when orjson is installed,
+encodes responses with it instead of the standard library json module.
+"""
+
+import json
+import time
+
+from flask.json.provider import DefaultJSONProvider
+
+import metrics
+
+try:
+    import orjson
+except ImportError:  # Optional: everything works (more slowly) without it
+    orjson = None
+
+PRODUCT_COLUMNS = ('id', 'cost', 'category', 'name', 'brand', 'retail_price',
+                   'sku', 'distribution_center_id', 'department')
+
+# SQL for each product field: p is products, d the joined departments row
+PRODUCT_FIELD_SQL = {column: f'p.{column}' for column in PRODUCT_COLUMNS}
+PRODUCT_FIELD_SQL['department'] = 'd.name as department'
+DEPARTMENT_JOIN = 'JOIN departments d ON p.department_id = d.id'
+
+
+def column_names(cursor):
+    """Column names of the cursor's last query, in select order"""
+    return tuple(column[0] for column in cursor.description)
+
+
+def fetch_dicts(conn, sql, params=()):
+    """Run a query and return its rows as dicts keyed by the selected column names.
+
+    Rows are fetched as plain tuples (no sqlite3.Row objects) and zipped with
+    a column-name table computed once per query.
+    """
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    cursor.execute(sql, params)
+    columns = column_names(cursor)
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def fetch_dict(conn, sql, params=()):
+    """Like fetch_dicts() for a query expected to return at most one row"""
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    cursor.execute(sql, params)
+    row = cursor.fetchone()
+    return dict(zip(column_names(cursor), row)) if row is not None else None
+
+
+def parse_fields(value):
+    """Product fields named in a ?fields=id,name,... value, in PRODUCT_COLUMNS order.
+
+    Returns None (every field) when ``value`` is empty. Names outside
+    PRODUCT_COLUMNS raise ValueError.
+    """
+    if not value:
+        return None
+    names = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = sorted(names - set(PRODUCT_COLUMNS))
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(PRODUCT_COLUMNS)}")
+    if not names:
+        return None
+    return tuple(column for column in PRODUCT_COLUMNS if column in names)
+
+
+def product_select(fields=None, required=()):
+    """(select list, departments join) for the requested product fields.
+
+    ``required`` names fields the handler needs itself (e.g. its sort key);
+    they are selected too and dropped again by only_fields(). The departments
+    table is only joined when the department name is selected, which lets
+    department listings be answered from their covering index alone.
+    """
+    if fields is None:
+        columns = PRODUCT_COLUMNS
+    else:
+        wanted = set(fields) | set(required)
+        columns = [column for column in PRODUCT_COLUMNS if column in wanted]
+    select = ', '.join(PRODUCT_FIELD_SQL[column] for column in columns)
+    return select, DEPARTMENT_JOIN if 'department' in columns else ''
+
+
+def only_fields(rows, fields):
+    """Drop the fields a handler selected for itself but the client did not ask for"""
+    if fields is None or not rows or len(rows[0]) == len(fields):
+        return rows
+    return [{column: row[column] for column in fields} for row in rows]
+
+
+def dumps_line(obj):
+    """One JSON document plus a newline, as bytes (for NDJSON streams)"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+        except TypeError:
+            pass
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8') + b'\n'
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes with orjson when it is available.
+
+    Output matches the default provider (sorted keys, compact or indented
+    depending on debug mode); anything orjson cannot encode natively goes
+    through the provider's default() hook or falls back to the stdlib encoder.
+    Time spent building responses is booked as the request's 'json' phase.
+    """
+
+    def _orjson_options(self, indent=False):
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or set(kwargs) - {'separators'}:
+            return super().dumps(obj, **kwargs)
+        try:
+            return orjson.dumps(obj, default=self.default, option=self._orjson_options()).decode('utf-8')
+        except TypeError:
+            return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._response(*args, **kwargs)
+        finally:
+            metrics.add_time('json', time.perf_counter() - start)
+
+    def _response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        try:
+            body = orjson.dumps(obj, default=self.default,
+                                option=self._orjson_options(indent) | orjson.OPT_APPEND_NEWLINE)
+        except TypeError:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_app(app):
+    """Switch a Flask app's jsonify() to the fast JSON provider"""
+    app.json = FastJSONProvider(app)
+    return app.json
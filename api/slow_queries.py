@@ -0,0 +1,260 @@
+"""
+Slow-query log for the E-commerce Products API
+Pooled connections hand out cursors that time each statement (execute plus
+every fetch of its rows) and record the ones slower than a threshold: SQL
+text, the repository query it belongs to, the shape of the bound parameters
+(types and lengths, never values), duration, rows returned and the route
+that ran it. Records are kept in an in-memory ring buffer, served by
+/api/admin/slow-queries, and optionally appended as JSON lines to a rotating
+log file.
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from flask import current_app, has_request_context, request
+
+import metrics
+import repository
+
+DEFAULT_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 100))
+DEFAULT_CAPACITY = int(os.environ.get('SLOW_QUERY_LOG_SIZE', 500))
+DEFAULT_MAX_BYTES = int(os.environ.get('SLOW_QUERY_LOG_MAX_BYTES', 10 * 1024 * 1024))
+DEFAULT_BACKUP_COUNT = int(os.environ.get('SLOW_QUERY_LOG_BACKUPS', 5))
+MAX_SQL_LENGTH = 2000
+
+
+def normalize_sql(sql):
+    """SQL text on one line, cut to MAX_SQL_LENGTH characters"""
+    sql = re.sub(r'\s+', ' ', sql).strip()
+    return sql if len(sql) <= MAX_SQL_LENGTH else sql[:MAX_SQL_LENGTH] + '...'
+
+
+def _value_shape(value):
+    name = type(value).__name__
+    if isinstance(value, (str, bytes)):
+        return f'{name}[{len(value)}]'
+    return name
+
+
+def parameter_shape(parameters):
+    """Types (and str/bytes lengths) of bound parameters, with repeats collapsed.
+
+    (1, 2, 3, 'Men') -> ['int x3', 'str[3]']; {'q': 'cap'} -> {'q': 'str[3]'}
+    """
+    if isinstance(parameters, dict):
+        return {name: _value_shape(value) for name, value in parameters.items()}
+    shape = []
+    previous, repeats = None, 0
+    for value in parameters:
+        current = _value_shape(value)
+        if current == previous:
+            repeats += 1
+            continue
+        if previous is not None:
+            shape.append(previous if repeats == 1 else f'{previous} x{repeats}')
+        previous, repeats = current, 1
+    if previous is not None:
+        shape.append(previous if repeats == 1 else f'{previous} x{repeats}')
+    return shape
+
+
+def current_route():
+    """'METHOD rule' of the request being handled, or None outside requests"""
+    if not has_request_context():
+        return None
+    rule = request.url_rule
+    return f"{request.method} {rule.rule if rule is not None else request.path}"
+
+
+class SlowQueryLog:
+    """Thread-safe ring buffer (plus optional rotating file) of slow statements"""
+
+    def __init__(self, threshold_ms=DEFAULT_THRESHOLD_MS, capacity=DEFAULT_CAPACITY, path=None,
+                 max_bytes=DEFAULT_MAX_BYTES, backup_count=DEFAULT_BACKUP_COUNT):
+        self.threshold = threshold_ms / 1000
+        self.capacity = capacity
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = deque(maxlen=capacity)
+        self._counters = {'statements': 0, 'slow': 0}
+        self._logger = None
+        if path:
+            handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self._logger = logging.getLogger(f'{__name__}.{id(self)}')
+            self._logger.propagate = False
+            self._logger.setLevel(logging.INFO)
+            self._logger.addHandler(handler)
+
+    def record(self, sql, parameters, seconds, rows, route=None):
+        """Count a finished statement and keep it if it was slow"""
+        if seconds < self.threshold:
+            with self._lock:
+                self._counters['statements'] += 1
+            return None
+
+        entry = {
+            'timestamp': datetime.now().isoformat(),
+            'duration_ms': round(seconds * 1000, 3),
+            'sql': normalize_sql(sql),
+            'query': repository.query_name(sql),
+            'parameters': parameter_shape(parameters),
+            'rows': rows,
+            'route': route,
+            'pid': os.getpid()
+        }
+        with self._lock:
+            self._counters['statements'] += 1
+            self._counters['slow'] += 1
+            self._entries.append(entry)
+        if self._logger is not None:
+            self._logger.info(json.dumps(entry))
+        return entry
+
+    def entries(self, limit=None, route=None):
+        """Recorded slow statements, newest first, optionally only those of one route"""
+        with self._lock:
+            entries = list(self._entries)
+        entries.reverse()
+        if route:
+            entries = [entry for entry in entries if entry['route'] and route in entry['route']]
+        return entries[:limit] if limit is not None else entries
+
+    def clear(self):
+        """Drop every buffered entry (the log file is left alone)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Counters and settings for monitoring"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats.update({
+                'threshold_ms': self.threshold * 1000,
+                'buffered': len(self._entries),
+                'capacity': self.capacity,
+                'file': self.path
+            })
+        return stats
+
+
+class SlowQueryCursor(metrics.TimedCursor):
+    """Cursor that reports each statement to its connection's slow-query log.
+
+    A statement's duration is the time spent inside execute() and the
+    fetch*() calls that read its rows, so time the caller spends between
+    fetches (e.g. a client reading a streamed export) is not counted. The
+    statement is reported once its rows are exhausted, the cursor runs the
+    next statement, or the cursor is closed or garbage collected.
+    """
+
+    _statement = None
+
+    def _finish(self):
+        statement, self._statement = self._statement, None
+        if statement is not None:
+            sql, parameters, route = statement
+            rows = self._rows if self.description is not None else max(self.rowcount, 0)
+            self.connection.slow_query_log.record(sql, parameters, self._elapsed, rows, route)
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        self._statement = (sql, parameters, current_route())
+        self._rows = 0
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._elapsed = time.perf_counter() - start
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        if self._statement is not None:
+            self._elapsed += time.perf_counter() - start
+            if row is None:
+                self._finish()
+            else:
+                self._rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        start = time.perf_counter()
+        rows = super().fetchmany(size)
+        if self._statement is not None:
+            self._elapsed += time.perf_counter() - start
+            self._rows += len(rows)
+            if len(rows) < size:
+                self._finish()
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        if self._statement is not None:
+            self._elapsed += time.perf_counter() - start
+            self._rows += len(rows)
+            self._finish()
+        return rows
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+def init_app(app):
+    """Attach a slow-query log to a Flask app's connection pool when SLOW_QUERY_LOG_ENABLED is set.
+
+    Call after db_pool.init_app(). Returns the log, or None when it is disabled.
+    """
+    app.config.setdefault('SLOW_QUERY_LOG_ENABLED', os.environ.get('SLOW_QUERY_LOG_ENABLED', '0') == '1')
+    app.config.setdefault('SLOW_QUERY_THRESHOLD_MS', DEFAULT_THRESHOLD_MS)
+    app.config.setdefault('SLOW_QUERY_LOG_SIZE', DEFAULT_CAPACITY)
+    app.config.setdefault('SLOW_QUERY_LOG_FILE', os.environ.get('SLOW_QUERY_LOG_FILE'))
+    app.config.setdefault('SLOW_QUERY_LOG_MAX_BYTES', DEFAULT_MAX_BYTES)
+    app.config.setdefault('SLOW_QUERY_LOG_BACKUPS', DEFAULT_BACKUP_COUNT)
+
+    log = None
+    if app.config['SLOW_QUERY_LOG_ENABLED']:
+        log = SlowQueryLog(
+            threshold_ms=app.config['SLOW_QUERY_THRESHOLD_MS'],
+            capacity=app.config['SLOW_QUERY_LOG_SIZE'],
+            path=app.config['SLOW_QUERY_LOG_FILE'],
+            max_bytes=app.config['SLOW_QUERY_LOG_MAX_BYTES'],
+            backup_count=app.config['SLOW_QUERY_LOG_BACKUPS']
+        )
+    app.extensions['slow_query_log'] = log
+    app.extensions['db_pool'].slow_query_log = log
+    return log
+
+
+def get_log(app=None):
+    """The slow-query log of the (current) Flask app, or None when it is disabled"""
+    return (app or current_app).extensions.get('slow_query_log')
+
+
+def report(limit=50, route=None):
+    """JSON-ready view of the current app's slow-query log for the admin endpoint"""
+    log = get_log()
+    if log is None:
+        return {'enabled': False, 'queries': []}
+    return {
+        'enabled': True,
+        'stats': log.stats(),
+        'queries': log.entries(limit=limit, route=route)
+    }
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Tests for the trigger-maintained catalog aggregates
+Checks that the summary tables give the same answers as scanning products,
+before and after the catalog changes: python -m pytest test_aggregates.py
+"""
+
+import os
+import sqlite3
+import sys
+
+import pytest
+
+import aggregates
+import metrics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'database_setup'))
+from catalog_aggregates import create_catalog_aggregates  # noqa: E402
+
+PRODUCTS = [
+    # id, category, brand, retail_price, department_id
+    (1, 'Jeans', "Levi's", 59.5, 1),
+    (2, 'Jeans', 'MG', 12.0, 1),
+    (3, 'Accessories', 'MG', 6.25, 2),
+    (4, 'Sweaters', None, 80.0, 2),
+    (5, 'Socks', 'Hanes', 4.5, 1),
+]
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    conn.execute('''
+        CREATE TABLE departments (
+            id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE products (
+            id INTEGER PRIMARY KEY, category TEXT NOT NULL, brand TEXT,
+            retail_price REAL NOT NULL, department_id INTEGER NOT NULL
+        )
+    ''')
+    conn.executemany('INSERT INTO departments (id, name) VALUES (?, ?)', [(1, 'Women'), (2, 'Men'), (3, 'Kids')])
+    conn.executemany('INSERT INTO products VALUES (?, ?, ?, ?, ?)', PRODUCTS)
+    conn.commit()
+    return conn
+
+
+def snapshot(conn):
+    return (
+        aggregates.count_products(conn),
+        aggregates.count_products(conn, department_id=1),
+        aggregates.count_products(conn, department_name='Men'),
+        aggregates.count_products(conn, department_name='Nobody'),
+        [tuple(row.values()) for row in aggregates.department_rows(conn)],
+        aggregates.catalog_totals(conn),
+    )
+
+
+def assert_same_as_scan(conn):
+    summary = snapshot(conn)
+    conn.execute('ALTER TABLE catalog_stats RENAME TO catalog_stats_hidden')
+    try:
+        assert not aggregates.has_aggregates(conn)
+        scanned = snapshot(conn)
+    finally:
+        conn.execute('ALTER TABLE catalog_stats_hidden RENAME TO catalog_stats')
+
+    assert summary[:5] == scanned[:5]
+    totals, expected = summary[5], scanned[5]
+    assert {k: totals[k] for k in ('total_products', 'total_categories', 'total_brands')} == \
+        {k: expected[k] for k in ('total_products', 'total_categories', 'total_brands')}
+    for got, want in zip(totals['price_stats'], expected['price_stats']):
+        assert got == pytest.approx(want)
+
+
+def test_rebuild_matches_scan(conn):
+    assert create_catalog_aggregates(conn) == (5, 3, 4)
+    assert aggregates.has_aggregates(conn)
+    assert_same_as_scan(conn)
+
+
+def test_triggers_track_catalog_changes(conn):
+    create_catalog_aggregates(conn)
+
+    conn.execute("INSERT INTO products VALUES (6, 'Swim', 'Speedo', 999.0, 3)")
+    conn.execute('DELETE FROM products WHERE id = 5')  # Women's cheapest product, last Hanes, last Socks
+    conn.execute("UPDATE products SET retail_price = 1.0, brand = 'MG', department_id = 2 WHERE id = 1")
+    conn.execute("UPDATE products SET category = 'Swim' WHERE id = 4")
+    conn.commit()
+
+    assert_same_as_scan(conn)
+    stats = conn.execute('SELECT brand_count, category_count FROM catalog_stats').fetchone()
+    assert tuple(stats) == (2, 3)
+
+
+def test_emptied_department_keeps_zero_count(conn):
+    create_catalog_aggregates(conn)
+    conn.execute('DELETE FROM products WHERE department_id = 2')
+    conn.commit()
+
+    assert aggregates.count_products(conn, department_id=2) == 0
+    assert_same_as_scan(conn)
+
+
+def test_every_statement_is_a_named_query(conn, monkeypatch):
+    names, statements = [], []
+    monkeypatch.setattr(metrics, 'add_query', lambda name, seconds, rows: names.append(name))
+    conn.set_trace_callback(statements.append)
+
+    snapshot(conn)
+    assert len(names) == len(statements)
+    assert set(names) == {'aggregates.available', 'stats.products', 'stats.department_products',
+                          'departments.with_counts', 'stats.categories', 'stats.brands', 'stats.prices'}
+
+    conn.set_trace_callback(None)
+    create_catalog_aggregates(conn)
+    conn.set_trace_callback(statements.append)
+    del names[:], statements[:]
+    snapshot(conn)
+    assert len(names) == len(statements)
+    assert set(names) == {'aggregates.available', 'aggregates.products', 'aggregates.department_products',
+                          'aggregates.departments', 'aggregates.prices', 'aggregates.catalog'}
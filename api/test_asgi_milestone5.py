@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Tests for the async ASGI serving mode
+Drives the ASGI callable directly, no server needed: python -m pytest test_asgi_milestone5.py
+"""
+
+import asyncio
+import json
+
+from flask import Flask, Response, jsonify, request
+
+from asgi_milestone5 import AsyncWSGIBridge
+
+
+def make_bridge(**kwargs):
+    flask_app = Flask(__name__)
+
+    @flask_app.route('/api/items/<int:item_id>')
+    def item(item_id):
+        return jsonify({'id': item_id, 'q': request.args.get('q')}), 200
+
+    @flask_app.route('/api/items', methods=['POST'])
+    def create_item():
+        return jsonify({'received': request.get_json()}), 201
+
+    @flask_app.route('/api/stream')
+    def stream():
+        return Response((f'{n}\n' for n in range(3)), mimetype='application/x-ndjson')
+
+    return AsyncWSGIBridge(flask_app.wsgi_app, workers=2, **kwargs)
+
+
+def call(bridge, method, path, query=b'', body=b'', headers=()):
+    """Run one request through the bridge; returns (status, headers, body, messages)"""
+    scope = {
+        'type': 'http', 'http_version': '1.1', 'method': method, 'scheme': 'http',
+        'path': path, 'root_path': '', 'query_string': query,
+        'headers': [(b'host', b'testserver'), *headers],
+        'server': ('testserver', 80), 'client': ('127.0.0.1', 50000)
+    }
+    incoming = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return incoming.pop(0) if incoming else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(bridge(scope, receive, send))
+    start, chunks = sent[0], sent[1:]
+    return start['status'], dict(start['headers']), b''.join(m['body'] for m in chunks), chunks
+
+
+def test_json_response_in_one_message():
+    status, headers, body, chunks = call(make_bridge(), 'GET', '/api/items/7', query=b'q=cap')
+
+    assert status == 200
+    assert headers[b'content-type'] == b'application/json'
+    assert json.loads(body) == {'id': 7, 'q': 'cap'}
+    assert len(chunks) == 1 and not chunks[0].get('more_body')
+
+
+def test_request_body_and_status_pass_through():
+    payload = json.dumps({'name': 'Cap'}).encode()
+    status, _, body, _ = call(make_bridge(), 'POST', '/api/items', body=payload,
+                              headers=[(b'content-type', b'application/json')])
+
+    assert status == 201
+    assert json.loads(body) == {'received': {'name': 'Cap'}}
+
+    status, _, _, _ = call(make_bridge(max_body=4), 'POST', '/api/items', body=payload,
+                           headers=[(b'content-type', b'application/json')])
+    assert status == 413
+
+
+def test_streamed_response_is_sent_in_chunks():
+    status, _, body, chunks = call(make_bridge(), 'GET', '/api/stream')
+
+    assert status == 200
+    assert body == b'0\n1\n2\n'
+    assert [m.get('more_body', False) for m in chunks] == [True] * (len(chunks) - 1) + [False]
+    assert len(chunks) > 1
+
+
+def test_unknown_route_is_flask_404():
+    status, _, _, _ = call(make_bridge(), 'GET', '/api/nope')
+    assert status == 404
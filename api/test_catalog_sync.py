@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Tests for the incremental catalog sync (row hashes, upserts, deletes)
+Syncs small generated CSVs into throwaway databases: python -m pytest test_catalog_sync.py
+"""
+
+import os
+import sqlite3
+import sys
+
+import pytest
+
+from csv_fixtures import append_unparseable_row, product, write_csv
+
+pd = pytest.importorskip('pandas')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'database_setup'))
+import catalog_sync  # noqa: E402
+import csv_ingest  # noqa: E402
+import improved_database_setup  # noqa: E402
+from milestone4_department_refactor import DepartmentRefactor  # noqa: E402
+
+
+def load(tmp_path, rows, migrate):
+    improved_database_setup.create_improved_database()
+    conn = sqlite3.connect(str(tmp_path / 'ecommerce_improved.db'))
+    csv_ingest.ingest_products_csv(conn, write_csv(tmp_path / 'initial.csv', rows))
+    if migrate:
+        DepartmentRefactor().run_migration()
+    return conn
+
+
+@pytest.fixture
+def catalog(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    conn = load(tmp_path, [product(i) for i in range(1, 11)], migrate=True)
+    yield conn
+    conn.close()
+
+
+def test_sync_writes_only_the_differences(catalog, tmp_path):
+    first = catalog_sync.sync_products_csv(catalog, tmp_path / 'initial.csv')
+    assert (first['rehashed'], first['unchanged'], first['inserted'] + first['updated'] + first['deleted']) == (10, 10, 0)
+
+    generation = catalog.execute('SELECT generation FROM catalog_version').fetchone()[0]
+    rows = [product(i) for i in range(1, 10)]  # 10 removed
+    rows[1] = product(2, retail_price=19.99)
+    rows[2] = product(3, name='Denim Jacket 3')
+    rows.append(product(11, department='Women', sku='NEW'))
+    stats = catalog_sync.sync_products_csv(catalog, write_csv(tmp_path / 'changed.csv', rows), chunk_size=4)
+
+    assert (stats['read'], stats['inserted'], stats['updated'], stats['deleted'], stats['unchanged']) == \
+        (10, 1, 2, 1, 7)
+    assert stats['rehashed'] == 0 and list(stats['timings']) == list(catalog_sync.SYNC_PHASES)
+    assert catalog.execute('''
+        SELECT p.retail_price, d.name, p.sku FROM products p JOIN departments d ON d.id = p.department_id
+        WHERE p.id IN (2, 11) ORDER BY p.id
+    ''').fetchall() == [(19.99, 'Women', f'{2:032d}'), (9.99, 'Women', 'NEW' + '0' * 29)]
+    assert catalog.execute('SELECT id FROM products WHERE id = 10').fetchone() is None
+    assert catalog.execute("SELECT rowid FROM products_fts WHERE products_fts MATCH 'denim'").fetchall() == [(3,)]
+    assert catalog.execute('SELECT SUM(product_count) FROM department_stats').fetchone()[0] == 10
+    assert catalog.execute('SELECT generation FROM catalog_version').fetchone()[0] == generation + 4
+    assert catalog.execute('SELECT COUNT(*) FROM product_row_hashes').fetchone()[0] == 10
+
+
+def test_rows_changed_outside_a_sync_are_rehashed(catalog, tmp_path):
+    catalog_sync.sync_products_csv(catalog, tmp_path / 'initial.csv')
+    catalog.execute("UPDATE products SET brand = 'Edited' WHERE id = 5")
+    catalog.commit()
+
+    stats = catalog_sync.sync_products_csv(catalog, tmp_path / 'initial.csv')
+
+    assert (stats['rehashed'], stats['updated'], stats['unchanged']) == (1, 1, 9)
+    assert catalog.execute('SELECT brand FROM products WHERE id = 5').fetchone()[0] == 'MG'
+
+
+def test_skus_of_removed_and_changed_products_can_be_reused(catalog, tmp_path):
+    rows = [product(i) for i in range(1, 11) if i != 3]  # 3 removed
+    rows[1] = product(2, sku=f'{3:032d}')  # Takes the SKU of removed product 3
+    rows.append(product(11, sku=f'{2:032d}'))  # Takes the SKU product 2 gives up
+
+    stats = catalog_sync.sync_products_csv(catalog, write_csv(tmp_path / 'reused.csv', rows), chunk_size=4)
+
+    assert (stats['inserted'], stats['updated'], stats['deleted']) == (1, 1, 1)
+    assert catalog.execute('SELECT id, sku FROM products WHERE id IN (2, 3, 11) ORDER BY id').fetchall() == [
+        (2, f'{3:032d}'), (11, f'{2:032d}')
+    ]
+    assert catalog.execute('SELECT COUNT(*) FROM product_row_hashes').fetchone()[0] == 10
+
+
+def test_original_schema_and_failed_sync(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    conn = load(tmp_path, [product(i) for i in range(1, 6)], migrate=False)
+    stats = catalog_sync.sync_products_csv(
+        conn, write_csv(tmp_path / 'next.csv', [product(i, department='Women') for i in range(2, 7)])
+    )
+    assert (stats['inserted'], stats['updated'], stats['deleted']) == (1, 2, 1)
+    assert conn.execute("SELECT COUNT(*) FROM products WHERE department = 'Women'").fetchone()[0] == 5
+
+    # Rows that conflict with each other: the second use of a SKU is rejected, not loaded
+    clash = write_csv(tmp_path / 'clash.csv', [product(i) for i in range(2, 7)] + [product(7, sku=f'{4:032d}')])
+    stats = catalog_sync.sync_products_csv(conn, clash, chunk_size=4)
+    assert (stats['read'], stats['valid'], stats['inserted']) == (6, 5, 0)
+
+    bad = write_csv(tmp_path / 'bad.csv', [product(i) for i in range(1, 7)])
+    append_unparseable_row(bad, 7)
+    with pytest.raises(pd.errors.ParserError):
+        catalog_sync.sync_products_csv(conn, bad, chunk_size=5, workers=1)
+
+    assert [row[0] for row in conn.execute('SELECT id FROM products ORDER BY id')] == [2, 3, 4, 5, 6]
+    assert not conn.in_transaction
+    assert conn.execute("SELECT COUNT(*) FROM temp.sqlite_master WHERE name LIKE 'sync_%'").fetchone()[0] == 0
+    conn.close()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests for negotiated response compression and precompressed cache entries
+Runs against a throwaway database, no live server needed: python -m pytest test_compression.py
+"""
+
+import gzip
+import sqlite3
+
+import pytest
+from flask import Flask, jsonify
+
+import compression
+import db_pool
+import response_cache
+
+
+@pytest.fixture
+def app(tmp_path):
+    database = str(tmp_path / 'compression_test.db')
+    conn = sqlite3.connect(database)
+    conn.executescript('''
+        CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT);
+        CREATE TABLE catalog_version (id INTEGER PRIMARY KEY, generation INTEGER, updated_at TIMESTAMP);
+        INSERT INTO catalog_version VALUES (1, 3, '2024-01-15 10:30:00');
+    ''')
+    conn.executemany('INSERT INTO products VALUES (?, ?)', [(i, f'Relaxed Fit Jeans {i}') for i in range(1, 201)])
+    conn.commit()
+    conn.close()
+
+    app = Flask(__name__)
+    db_pool.init_app(app, database)
+    response_cache.init_app(app)
+    compression.init_app(app)
+
+    def listing(limit):
+        conn = db_pool.get_connection()
+        rows = [dict(row) for row in conn.execute('SELECT id, name FROM products LIMIT ?', (limit,))]
+        conn.close()
+        return jsonify({'products': rows}), 200
+
+    @app.route('/products')
+    @response_cache.cached
+    def products():
+        return listing(200)
+
+    @app.route('/products/uncached')
+    def products_uncached():
+        return listing(200)
+
+    @app.route('/products/first')
+    @response_cache.cached
+    def first_product():
+        return listing(1)
+
+    return app
+
+
+def test_large_responses_are_gzipped(app):
+    client = app.test_client()
+    plain = client.get('/products/uncached')
+    compressed = client.get('/products/uncached', headers={'Accept-Encoding': 'gzip, deflate'})
+
+    assert 'Content-Encoding' not in plain.headers
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.headers['Vary'] == 'Accept-Encoding'
+    assert gzip.decompress(compressed.data) == plain.data
+    assert int(compressed.headers['Content-Length']) == len(compressed.data) < len(plain.data) / 3
+
+
+def test_small_and_refused_responses_stay_plain(app):
+    client = app.test_client()
+    small = client.get('/products/first', headers={'Accept-Encoding': 'gzip'})
+    refused = client.get('/products', headers={'Accept-Encoding': 'gzip;q=0, identity'})
+
+    assert 'Content-Encoding' not in small.headers and 'Vary' not in small.headers
+    assert 'Content-Encoding' not in refused.headers
+    assert refused.headers['Vary'] == 'Accept-Encoding'
+
+
+def test_cached_entries_are_compressed_once(app, monkeypatch):
+    calls = []
+    original = compression.compress
+
+    def counting_compress(data, encoding):
+        calls.append(encoding)
+        return original(data, encoding)
+
+    monkeypatch.setattr(compression, 'compress', counting_compress)
+    client = app.test_client()
+
+    bodies = [client.get('/products', headers={'Accept-Encoding': 'gzip'}).data for _ in range(3)]
+    plain = client.get('/products').data
+
+    assert calls == ['gzip']
+    assert bodies[0] == bodies[1] == bodies[2]
+    assert gzip.decompress(bodies[0]) == plain
+    stats = response_cache.get_cache(app).stats()
+    assert stats['encodings_stored'] == 1
+    assert stats['bytes'] == len(plain) + len(bodies[0]) + len('/products')
+
+
+def test_etag_varies_by_encoding(app):
+    client = app.test_client()
+    plain = client.get('/products')
+    compressed = client.get('/products', headers={'Accept-Encoding': 'gzip'})
+
+    assert compressed.headers['ETag'] == plain.headers['ETag'][:-1] + '-gzip"'
+
+    revalidated = client.get('/products', headers={'Accept-Encoding': 'gzip',
+                                                   'If-None-Match': compressed.headers['ETag']})
+    assert revalidated.status_code == 304
+    assert revalidated.headers['ETag'] == compressed.headers['ETag']
+    assert client.get('/products', headers={'If-None-Match': plain.headers['ETag']}).status_code == 304
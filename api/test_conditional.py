@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Tests for ETag / Last-Modified conditional GET handling
+Runs against a throwaway database, no live server needed: python -m pytest test_conditional.py
+"""
+
+import os
+import sqlite3
+import sys
+
+import pytest
+from flask import Flask, jsonify
+
+import conditional
+import db_pool
+import response_cache
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'database_setup'))
+from catalog_version import create_catalog_version  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path):
+    database = str(tmp_path / 'conditional_test.db')
+    conn = sqlite3.connect(database)
+    conn.executescript('''
+        CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT);
+        INSERT INTO products VALUES (1, 'Cap');
+        CREATE TABLE catalog_version (id INTEGER PRIMARY KEY, generation INTEGER, updated_at TIMESTAMP);
+        INSERT INTO catalog_version VALUES (1, 7, '2024-01-15 10:30:00');
+        CREATE TRIGGER products_version_au AFTER UPDATE ON products BEGIN
+            UPDATE catalog_version SET generation = generation + 1, updated_at = '2024-01-16 08:00:00';
+        END;
+    ''')
+    conn.close()
+
+    app = Flask(__name__)
+    app.config['RESPONSE_CACHE_ENABLED'] = False
+    db_pool.init_app(app, database)
+    response_cache.init_app(app)
+    app.calls = 0
+
+    @app.route('/products/<int:product_id>')
+    @response_cache.cached
+    def product(product_id):
+        app.calls += 1
+        conn = db_pool.get_connection()
+        row = conn.execute('SELECT id, name FROM products WHERE id = ?', (product_id,)).fetchone()
+        conn.close()
+        if row is None:
+            return jsonify({'error': 'Product not found'}), 404
+        return jsonify(dict(row)), 200
+
+    return app
+
+
+def test_validators_depend_on_generation_instance_and_key():
+    etag, last_modified = conditional.validators((7, '2024-01-15 10:30:00', 'a1'), '/api/stats')
+
+    assert etag == conditional.validators((7, '2024-01-15 10:30:00', 'a1'), '/api/stats')[0]
+    assert etag != conditional.validators((8, '2024-01-15 10:30:00', 'a1'), '/api/stats')[0]
+    assert etag != conditional.validators((7, '2024-01-15 10:30:00', 'b2'), '/api/stats')[0]
+    assert etag != conditional.validators((7, '2024-01-15 10:30:00', 'a1'), '/api/departments')[0]
+    assert last_modified.isoformat() == '2024-01-15T10:30:00+00:00'
+    assert conditional.validators(None, '/api/stats') == (None, None)
+
+
+def test_matching_etag_gets_304_without_running_the_view(app):
+    client = app.test_client()
+    first = client.get('/products/1')
+    assert first.status_code == 200
+    assert first.headers['Cache-Control'] == 'no-cache'
+    assert first.headers['Last-Modified'] == 'Mon, 15 Jan 2024 10:30:00 GMT'
+
+    again = client.get('/products/1', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert again.data == b''
+    assert again.headers['ETag'] == first.headers['ETag']
+
+    since = client.get('/products/1', headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert since.status_code == 304
+    assert app.calls == 1
+
+
+def test_catalog_change_produces_new_etag(app):
+    client = app.test_client()
+    etag = client.get('/products/1').headers['ETag']
+
+    writer = sqlite3.connect(app.config['DATABASE'])
+    writer.execute("UPDATE products SET name = 'Beanie' WHERE id = 1")
+    writer.commit()
+    writer.close()
+
+    changed = client.get('/products/1', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.get_json()['name'] == 'Beanie'
+    assert changed.headers['ETag'] != etag
+
+
+def test_errors_carry_no_validators(app):
+    response = app.test_client().get('/products/2')
+    assert response.status_code == 404
+    assert 'ETag' not in response.headers
+
+
+def build_catalog(database):
+    conn = sqlite3.connect(database)
+    conn.executescript("""
+        CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT);
+        CREATE TABLE departments (id INTEGER PRIMARY KEY, name TEXT);
+    """)
+    create_catalog_version(conn)
+    conn.execute("INSERT INTO products VALUES (1, 'Cap')")
+    conn.commit()
+    conn.close()
+
+
+def test_rebuilt_database_does_not_match_old_etags(app):
+    database = app.config['DATABASE']
+    os.remove(database)
+    build_catalog(database)
+    client = app.test_client()
+    etag = client.get('/products/1').headers['ETag']
+
+    db_pool.get_pool(app).close_all()
+    os.remove(database)
+    build_catalog(database)  # Same rows, same generation, new database
+
+    rebuilt = client.get('/products/1', headers={'If-None-Match': etag})
+    assert rebuilt.status_code == 200
+    assert rebuilt.headers['ETag'] != etag
+
+
+def test_existing_counter_gets_an_instance_token(app):
+    conn = sqlite3.connect(app.config['DATABASE'])
+    conn.execute('CREATE TABLE departments (id INTEGER PRIMARY KEY, name TEXT)')
+    assert create_catalog_version(conn) == 8
+
+    instance = conn.execute('SELECT instance FROM catalog_version').fetchone()[0]
+    assert len(instance) == 32
+    create_catalog_version(conn)
+    assert conn.execute('SELECT instance FROM catalog_version').fetchone()[0] == instance
+    conn.close()
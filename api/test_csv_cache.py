@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Tests for the columnar (Parquet) cache of products.csv
+Builds caches of small generated CSVs: python -m pytest test_csv_cache.py
+"""
+
+import os
+import sys
+
+import pytest
+
+from csv_fixtures import product, write_csv
+
+pd = pytest.importorskip('pandas')
+pq = pytest.importorskip('pyarrow.parquet')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'database_setup'))
+import csv_cache  # noqa: E402
+import csv_validation  # noqa: E402
+
+TEXT_DTYPES = {name: str for name, kind in csv_cache.COLUMN_TYPES.items() if kind == 'string'}
+
+
+def test_cache_is_built_once_and_follows_the_csv(tmp_path):
+    path = write_csv(tmp_path / 'products.csv', [product(i) for i in range(1, 6)])
+
+    df = csv_cache.read_products(path)
+    cache = tmp_path / 'products.parquet'
+    assert cache.exists() and len(df) == 5
+    pd.testing.assert_frame_equal(df, pd.read_csv(path, dtype=TEXT_DTYPES))
+    assert list(csv_cache.read_products(path, columns=['id', 'sku']).columns) == ['id', 'sku']
+
+    built = cache.stat().st_mtime_ns
+    os.utime(path, ns=(built + 10**9, built + 10**9))  # Touched, same content
+    assert csv_cache.is_fresh(path)
+    csv_cache.read_products(path)
+    assert cache.stat().st_mtime_ns == built
+
+    write_csv(path, [product(i) for i in range(1, 6)] + [product(6)])
+    assert not csv_cache.is_fresh(path)
+    assert len(csv_cache.read_products(path)) == 6
+    assert csv_cache.cache_metadata(cache)['sha256'] == csv_cache.file_sha256(path)
+
+
+def test_cache_is_typed_and_keeps_only_the_text_types_lose(tmp_path):
+    path = write_csv(tmp_path / 'products.csv', [product(i) for i in range(1, 5)] + [
+        product(5, id='5.0', cost='2.50', distribution_center_id='ten')
+    ])
+
+    table = pq.read_table(csv_cache.ensure_cache(path))
+
+    assert [str(table.schema.field(name).type) for name in csv_cache.COLUMN_TYPES] == [
+        'int64', 'double', 'string', 'string', 'string', 'double', 'string', 'string', 'int64'
+    ]
+    assert table['id'].to_pylist() == [1, 2, 3, 4, 5]
+    assert table['distribution_center_id'].to_pylist() == [2, 3, 4, 5, None]
+    assert {name: table[name + csv_cache.TEXT_SUFFIX].to_pylist()[-1]
+            for name in csv_cache.NUMERIC_COLUMNS} == {
+        'id': '5.0', 'cost': '2.50', 'retail_price': None, 'distribution_center_id': 'ten'
+    }
+    assert all(table[name + csv_cache.TEXT_SUFFIX].null_count == 4 for name in ['id', 'cost'])
+
+
+def test_cached_validation_matches_the_csv(tmp_path):
+    path = write_csv(tmp_path / 'products.csv', [product(i) for i in range(1, 10)] + [
+        product(10, cost='free'),
+        product(11, id='11.5', cost='2.50'),
+        product(12, name='', distribution_center_id='3.5'),
+        product(13, retail_price='-1.0', sku=f'{1:032d}'),
+        product(14, department='Kids', distribution_center_id='ten'),
+    ])
+
+    parsed = list(csv_validation.validated_chunks(path, chunk_size=5, workers=1, use_cache=False))
+    cached = list(csv_validation.validated_chunks(path, chunk_size=5, workers=1))
+
+    assert (tmp_path / 'products.parquet').exists()
+    assert len(parsed) == len(cached) == 3
+    for one, other in zip(parsed, cached):
+        pd.testing.assert_frame_equal(one.rows, other.rows)
+        pd.testing.assert_frame_equal(one.rejected, other.rejected)
+        assert (one.rejections, one.repairs) == (other.rejections, other.repairs)
+
+    quarantines = []
+    for use_cache in (False, True):
+        quarantines.append(tmp_path / f'rejected_{use_cache}.csv')
+        csv_validation.validate_csv(path, chunk_size=5, workers=1, quarantine_path=quarantines[-1],
+                                    use_cache=use_cache)
+    assert quarantines[0].read_text() == quarantines[1].read_text()
+    rejected = pd.read_csv(quarantines[1], dtype=str, keep_default_na=False)
+    assert rejected[['id', 'cost', 'distribution_center_id']].values.tolist() == [
+        ['10', 'free', '1'], ['11.5', '2.50', '2'], ['12', '2.5', '3.5'], ['13', '2.5', '4'], ['14', '2.5', 'ten']
+    ]
+
+
+def test_analysis_reads_the_csv_types(tmp_path):
+    path = write_csv(tmp_path / 'products.csv', [product(i, sku=f'SKU{i}') for i in range(1, 4)] + [
+        product(4, id='4a', cost='', sku='SKU4')
+    ])
+
+    df = csv_cache.read_products(path)
+
+    assert (tmp_path / 'products.parquet').exists()
+    pd.testing.assert_frame_equal(df, pd.read_csv(path))
+    assert df['id'].tolist() == ['1', '2', '3', '4a'] and df['cost'].isna().sum() == 1
+
+
+def test_csv_is_parsed_without_pyarrow(tmp_path, monkeypatch):
+    monkeypatch.setattr(csv_cache, 'pq', None)
+    path = write_csv(tmp_path / 'products.csv', [product(i) for i in range(1, 4)])
+
+    assert csv_cache.ensure_cache(path) is None
+    assert csv_cache.read_products(path, columns=['id'])['id'].tolist() == [1, 2, 3]
+    assert not (tmp_path / 'products.parquet').exists()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Tests for the chunked, transactional products.csv ingest
+Loads small generated CSVs into the improved schema: python -m pytest test_csv_ingest.py
+"""
+
+import os
+import sqlite3
+import sys
+
+import pytest
+
+from csv_fixtures import append_unparseable_row, product, write_csv
+
+pd = pytest.importorskip('pandas')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'database_setup'))
+import csv_ingest  # noqa: E402
+import improved_database_setup  # noqa: E402
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    improved_database_setup.create_improved_database()
+    conn = sqlite3.connect(str(tmp_path / 'ecommerce_improved.db'))
+    yield conn
+    conn.close()
+
+
+def test_chunks_are_cleaned_and_loaded(database, tmp_path):
+    path = tmp_path / 'products.csv'
+    write_csv(path, [product(i) for i in range(1, 11)] + [
+        product(11, name='', brand=''),
+        product(12, sku='ABC'),
+        product(13, cost=-1),
+        product(14, department='Kids'),
+        product(15, distribution_center_id=11),
+    ])
+    seen = []
+
+    stats = csv_ingest.ingest_products_csv(database, path, chunk_size=4, progress=lambda s: seen.append(s['read']),
+                                           quarantine_path=tmp_path / 'rejected.csv')
+
+    assert (stats['read'], stats['loaded'], stats['rejected'], stats['chunks']) == (15, 12, 3, 4)
+    assert stats['rejections']['department'] == 1 and stats['repairs']['sku'] == 1
+    assert len((tmp_path / 'rejected.csv').read_text().splitlines()) == 4
+    assert list(stats['timings']) == list(csv_ingest.PHASES)
+    assert seen == [4, 8, 12, 15]
+    assert database.execute('SELECT name, brand FROM products WHERE id = 11').fetchone() == \
+        ('Unknown Product', 'Unknown Brand')
+    assert database.execute('SELECT sku FROM products WHERE id = 12').fetchone()[0] == 'ABC' + '0' * 29
+    assert [row[0] for row in database.execute('SELECT id FROM products ORDER BY id')] == list(range(1, 13))
+
+
+def test_indexes_are_rebuilt_and_reload_replaces_rows(database, tmp_path):
+    indexes = sorted(csv_ingest.secondary_indexes(database))
+    first, second = tmp_path / 'first.csv', tmp_path / 'second.csv'
+    write_csv(first, [product(i) for i in range(1, 6)])
+    write_csv(second, [product(i) for i in range(3, 5)])
+
+    csv_ingest.ingest_products_csv(database, first)
+    csv_ingest.ingest_products_csv(database, second)
+
+    assert [row[0] for row in database.execute('SELECT id FROM products ORDER BY id')] == [3, 4]
+    assert sorted(csv_ingest.secondary_indexes(database)) == indexes and len(indexes) == 4
+    assert database.execute('PRAGMA integrity_check').fetchone()[0] == 'ok'
+
+
+def test_failed_load_keeps_the_previous_catalog(database, tmp_path):
+    good, bad = tmp_path / 'good.csv', tmp_path / 'bad.csv'
+    write_csv(good, [product(i) for i in range(1, 4)])
+    write_csv(bad, [product(i) for i in range(1, 7)])
+    append_unparseable_row(bad, 7)  # In the second chunk
+
+    csv_ingest.ingest_products_csv(database, good)
+    with pytest.raises(pd.errors.ParserError):
+        csv_ingest.ingest_products_csv(database, bad, chunk_size=5, workers=1)
+
+    assert database.execute('SELECT COUNT(*) FROM products').fetchone()[0] == 3
+    assert len(csv_ingest.secondary_indexes(database)) == 4
+    assert not database.in_transaction
+
+
+def test_bulk_mode_restores_settings_and_analyzes(database, tmp_path):
+    path = tmp_path / 'products.csv'
+    write_csv(path, [product(i) for i in range(1, 21)])
+    before = [database.execute(f'PRAGMA {name}').fetchone()[0] for name in ('journal_mode', 'synchronous', 'cache_size')]
+
+    stats = csv_ingest.ingest_products_csv(database, path, bulk=True)
+
+    assert stats['loaded'] == 20 and stats['timings']['insert'] > 0
+    after = [database.execute(f'PRAGMA {name}').fetchone()[0] for name in ('journal_mode', 'synchronous', 'cache_size')]
+    assert after == before
+    analyzed = {row[0] for row in database.execute("SELECT idx FROM sqlite_stat1 WHERE tbl = 'products'")}
+    assert {name for name, _ in csv_ingest.secondary_indexes(database)} <= analyzed
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Tests for the products.csv validation stage (rules, repairs, quarantine, process pool)
+Validates small generated CSVs: python -m pytest test_csv_validation.py
+"""
+
+import os
+import sys
+
+import pytest
+
+from csv_fixtures import HEADER, product, write_csv
+
+pd = pytest.importorskip('pandas')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'database_setup'))
+import csv_validation  # noqa: E402
+
+ROWS = [product(i) for i in range(1, 9)] + [
+    product(9, name='', brand=''),
+    product(10, sku='ABC'),
+    product(11, cost=-1),
+    product(12, cost='free', department='Kids'),
+    product(13, retail_price=''),
+    product(14, distribution_center_id=11),
+    product(15, id=''),
+    product(16, name='Jacket, "Denim"\nLong'),
+]
+
+
+def test_rules_repairs_and_quarantine(tmp_path):
+    path = write_csv(tmp_path / 'products.csv', ROWS)
+    quarantine = tmp_path / 'rejected.csv'
+
+    report = csv_validation.validate_csv(path, chunk_size=5, workers=1, quarantine_path=quarantine,
+                                         use_cache=False)
+
+    assert (report.read, report.valid, report.rejected) == (16, 11, 5)
+    assert report.rejections == dict(dict.fromkeys(csv_validation.REJECTION_RULES, 0), id=1, cost=2,
+                                     retail_price=1, department=1, distribution_center_id=1)
+    assert report.repairs == {'name': 1, 'brand': 1, 'sku': 1}
+    assert len(report.lines()) == len(csv_validation.REJECTION_RULES) + len(csv_validation.REPAIRS)
+
+    rejected = pd.read_csv(quarantine, dtype=str, keep_default_na=False)
+    assert rejected['rejected_by'].tolist() == ['cost', 'cost;department', 'retail_price',
+                                                'distribution_center_id', 'id']
+    assert rejected.loc[1, 'cost'] == 'free'
+
+
+def test_schema_constraint_rules(tmp_path):
+    rows = [
+        product(1),
+        product(2, category=''),
+        product(3, category='C' * 51),
+        product(4, name='N' * 501),
+        product(5, brand='B' * 101),
+        product(6, sku=''),
+        product(7, distribution_center_id=3.5),
+        product(8),
+        product(1, sku='Y' * 32),  # id of a row in an earlier chunk
+        product(9, sku=f'{1:032d}EXTRA'),  # Same SKU as id 1 once cut to 32 characters
+        product(10),
+        product(10, sku='Z' * 32),  # id of a row in the same chunk
+    ]
+    quarantine = tmp_path / 'rejected.csv'
+
+    report = csv_validation.validate_csv(write_csv(tmp_path / 'products.csv', rows), chunk_size=3, workers=1,
+                                         quarantine_path=quarantine, use_cache=False)
+
+    assert (report.valid, report.rejected) == (3, 9)
+    assert {rule: count for rule, count in report.rejections.items() if count} == {
+        'duplicate_id': 2, 'category': 2, 'name': 1, 'brand': 1, 'sku': 1, 'duplicate_sku': 1,
+        'distribution_center_id': 1
+    }
+    rejected = pd.read_csv(quarantine, dtype=str, keep_default_na=False)
+    assert rejected['rejected_by'].tolist() == ['category', 'category', 'name', 'brand', 'sku',
+                                                'distribution_center_id', 'duplicate_id', 'duplicate_sku',
+                                                'duplicate_id']
+    assert rejected['id'].tolist() == ['2', '3', '4', '5', '6', '7', '1', '9', '10']
+
+
+def test_accepted_rows_are_repaired_and_typed():
+    df = pd.DataFrame([product(1, name=None, sku='X' * 40), product(2, distribution_center_id=None)],
+                      columns=HEADER)
+
+    result = csv_validation.validate_chunk(df)
+
+    assert result.rows.to_numpy(dtype=object).tolist() == [
+        [1, 2.5, 'Jeans', 'Unknown Product', 'MG', 9.99, 'Men', 'X' * 32, 2]
+    ]
+    assert result.rows['id'].dtype == 'int64' and result.rows['distribution_center_id'].dtype == 'int64'
+
+
+def test_blocks_end_on_record_boundaries(tmp_path):
+    path = write_csv(tmp_path / 'products.csv', ROWS)
+
+    blocks = list(csv_validation.read_blocks(path, chunk_size=2))
+
+    assert all(block.count(b'"') % 2 == 0 for _, block in blocks)
+    assert sum(len(csv_validation.parse_block(header, block)) for header, block in blocks) == len(ROWS)
+
+
+def test_process_pool_matches_a_single_process(tmp_path):
+    path = write_csv(tmp_path / 'products.csv', ROWS * 3)
+
+    single = list(csv_validation.validated_chunks(path, chunk_size=4, workers=1))
+    pooled = list(csv_validation.validated_chunks(path, chunk_size=4, workers=2))
+
+    assert len(single) == len(pooled) == 12
+    for one, other in zip(single, pooled):
+        pd.testing.assert_frame_equal(one.rows, other.rows)
+        assert one.rejections == other.rejections
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQLite connection pool used by the API
+Runs against a throwaway database, no live server needed: python -m pytest test_db_pool.py
+"""
+
+import sqlite3
+import threading
+import time
+
+import pytest
+from flask import Flask, jsonify
+
+import db_pool
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / 'pool_test.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT)')
+    conn.executemany('INSERT INTO products (id, name) VALUES (?, ?)', [(1, 'Cap'), (2, 'Jeans')])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_connections_are_reused(database):
+    pool = db_pool.ConnectionPool(database, size=2)
+
+    first = pool.acquire()
+    first.close()
+    second = pool.acquire()
+    second.close()
+
+    assert first is second
+    stats = pool.stats()
+    assert stats['opens'] == 1
+    assert stats['checkouts'] == 2
+    assert stats['idle'] == 1 and stats['in_use'] == 0
+
+
+def test_rows_are_accessible_by_name(database):
+    pool = db_pool.ConnectionPool(database)
+    conn = pool.acquire()
+    row = conn.execute('SELECT id, name FROM products WHERE id = ?', (1,)).fetchone()
+    conn.close()
+
+    assert row['name'] == 'Cap'
+
+
+def test_exhausted_pool_waits_then_times_out(database):
+    pool = db_pool.ConnectionPool(database, size=1, timeout=0.05)
+    held = pool.acquire()
+
+    with pytest.raises(db_pool.PoolTimeoutError):
+        pool.acquire()
+
+    released = threading.Timer(0.01, held.close)
+    pool.timeout = 2
+    released.start()
+    assert pool.acquire() is held
+    released.join()
+
+    stats = pool.stats()
+    assert stats['waits'] == 2
+    assert stats['timeouts'] == 1
+    assert stats['opens'] == 1
+
+
+def test_waiters_are_served_in_arrival_order(database):
+    pool = db_pool.ConnectionPool(database, size=1, timeout=2)
+    held = pool.acquire()
+    served = []
+
+    def waiter(name):
+        conn = pool.acquire()
+        served.append(name)
+        conn.close()
+
+    threads = []
+    for name in ('first', 'second'):
+        thread = threading.Thread(target=waiter, args=(name,))
+        thread.start()
+        threads.append(thread)
+        while pool.stats()['waiting'] < len(threads):
+            time.sleep(0.001)
+
+    # A caller that arrives after the waiters must not jump the queue
+    held.close()
+    late = pool.acquire()
+    late.close()
+    for thread in threads:
+        thread.join()
+
+    assert served == ['first', 'second']
+    assert pool.stats()['waits'] == 3
+
+
+def test_discarded_connection_frees_slot_for_waiter(database):
+    pool = db_pool.ConnectionPool(database, size=1, timeout=2)
+    held = pool.acquire()
+    result = []
+    thread = threading.Thread(target=lambda: result.append(pool.acquire()))
+    thread.start()
+    while pool.stats()['waiting'] < 1:
+        time.sleep(0.001)
+
+    pool._discard(held)
+    thread.join()
+
+    assert result and result[0] is not held
+    assert pool.stats()['opens'] == 2 and pool.stats()['open'] == 1
+
+
+def test_unhealthy_connection_is_replaced(database):
+    pool = db_pool.ConnectionPool(database, size=1, health_check_interval=0)
+    conn = pool.acquire()
+    conn.close()
+    conn.dispose()  # Simulate a connection that died while idle
+
+    replacement = pool.acquire()
+    assert replacement is not conn
+    assert replacement.execute('SELECT COUNT(*) FROM products').fetchone()[0] == 2
+    assert pool.stats()['health_check_failures'] == 1
+
+
+def test_release_rolls_back_open_transaction(database):
+    pool = db_pool.ConnectionPool(database, size=1)
+    conn = pool.acquire()
+    conn.execute("INSERT INTO products (id, name) VALUES (3, 'Socks')")
+    conn.close()
+
+    conn = pool.acquire()
+    assert conn.execute('SELECT COUNT(*) FROM products').fetchone()[0] == 2
+    conn.close()
+
+
+def test_read_profile_tunes_each_connection(database):
+    pool = db_pool.ConnectionPool(database, profile='read', mmap_size=1 << 20, cache_size_kib=4096)
+    conn = pool.acquire()
+
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    assert conn.execute('PRAGMA mmap_size').fetchone()[0] == 1 << 20
+    assert conn.execute('PRAGMA cache_size').fetchone()[0] == -4096
+    assert conn.execute('PRAGMA temp_store').fetchone()[0] == 2  # MEMORY
+    with pytest.raises(sqlite3.OperationalError, match='readonly'):
+        conn.execute("INSERT INTO products (id, name) VALUES (3, 'Socks')")
+    conn.close()
+    assert pool.stats()['profile'] == 'read'
+
+
+def test_replica_profile_opens_immutable_read_only(database):
+    pool = db_pool.ConnectionPool(database, profile='replica')
+    conn = pool.acquire()
+
+    assert conn.execute('SELECT COUNT(*) FROM products').fetchone()[0] == 2
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'delete'
+    with pytest.raises(sqlite3.OperationalError, match='readonly'):
+        conn.execute("DELETE FROM products")
+    conn.close()
+
+    with pytest.raises(ValueError, match='Unknown database profile'):
+        db_pool.ConnectionPool(database, profile='fast')
+
+
+def test_flask_app_context_reuses_one_connection(database):
+    app = Flask(__name__)
+    db_pool.init_app(app, database)
+
+    @app.route('/count')
+    def count():
+        conn = db_pool.get_connection()
+        same = db_pool.get_connection() is conn
+        total = conn.execute('SELECT COUNT(*) FROM products').fetchone()[0]
+        conn.close()
+        return jsonify({'total': total, 'same': same})
+
+    @app.route('/leak')
+    def leak():
+        db_pool.get_connection().execute('SELECT 1')
+        return jsonify({})
+
+    client = app.test_client()
+    for _ in range(3):
+        assert client.get('/count').get_json() == {'total': 2, 'same': True}
+    client.get('/leak')
+
+    stats = db_pool.get_pool(app).stats()
+    assert stats['opens'] == 1
+    assert stats['checkouts'] == 4
+    assert stats['in_use'] == 0
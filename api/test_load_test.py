@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Tests for the load-testing harness
+Uses a fake target, no server or database needed: python -m pytest test_load_test.py
+"""
+
+import threading
+
+import load_test
+
+
+class FakeTarget:
+    name = 'fake'
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.paths = []
+
+    def get(self, path):
+        with self.lock:
+            self.paths.append(path)
+        if path == '/boom':
+            raise OSError('connection reset')
+        return 404 if path == '/missing' else 200
+
+
+def test_requests_are_spread_over_every_endpoint():
+    target = FakeTarget()
+    samples, elapsed = load_test.run_load(target, ['/a', '/b', '/missing'], concurrency=4, requests=30)
+    report = load_test.summarize(samples, elapsed)
+
+    assert len(target.paths) == 30
+    assert {endpoint: stats['requests'] for endpoint, stats in report['endpoints'].items()} == {
+        '/a': 10, '/b': 10, '/missing': 10
+    }
+    assert report['endpoints']['/missing']['errors'] == 10
+    assert report['overall']['requests'] == 30 and report['overall']['errors'] == 10
+    assert report['overall']['p50_ms'] <= report['overall']['p95_ms'] <= report['overall']['p99_ms']
+
+
+def test_failed_requests_count_as_errors():
+    samples, elapsed = load_test.run_load(FakeTarget(), ['/boom'], concurrency=2, requests=4)
+    assert load_test.summarize(samples, elapsed)['overall']['errors'] == 4
+
+
+def test_fixed_rate_paces_requests():
+    samples, elapsed = load_test.run_load(FakeTarget(), ['/a'], concurrency=2, duration=0.2, rps=50)
+
+    assert 8 <= len(samples['/a']) <= 11
+    assert elapsed >= 0.15
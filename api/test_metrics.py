@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tests for request metrics (Server-Timing and Prometheus text format)
+Runs against a throwaway database, no live server needed: python -m pytest test_metrics.py
+"""
+
+import re
+import sqlite3
+
+import pytest
+from flask import Flask, jsonify
+
+import db_pool
+import metrics
+import serialization
+
+
+@pytest.fixture
+def app(tmp_path):
+    path = str(tmp_path / 'metrics_test.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT)')
+    conn.executemany('INSERT INTO products (id, name) VALUES (?, ?)', [(1, 'Cap'), (2, 'Jeans')])
+    conn.commit()
+    conn.close()
+
+    flask_app = Flask(__name__)
+    metrics.init_app(flask_app)
+    serialization.init_app(flask_app)
+    db_pool.init_app(flask_app, path)
+
+    @flask_app.route('/api/products/<int:product_id>')
+    def product(product_id):
+        conn = db_pool.get_connection()
+        row = serialization.fetch_dict(conn, 'SELECT id, name FROM products WHERE id = ?', (product_id,))
+        conn.close()
+        if row is None:
+            return jsonify({'error': 'Product not found'}), 404
+        return jsonify(row), 200
+
+    return flask_app
+
+
+def test_server_timing_splits_request_phases(app):
+    response = app.test_client().get('/api/products/1')
+
+    assert response.get_json() == {'id': 1, 'name': 'Cap'}
+    timings = dict(re.findall(r'(\w+);dur=([\d.]+)', response.headers['Server-Timing']))
+    assert list(timings) == ['conn', 'sql', 'fetch', 'json', 'total']
+    assert float(timings['sql']) > 0 and float(timings['json']) > 0
+    assert sum(float(timings[phase]) for phase in metrics.PHASES) <= float(timings['total'])
+
+
+def test_requests_are_counted_by_route_and_status(app):
+    client = app.test_client()
+    client.get('/api/products/1')
+    client.get('/api/products/1')
+    client.get('/api/products/9')
+    client.get('/api/nope')
+
+    text = metrics.get_metrics(app).render()
+    assert 'api_requests_total{route="/api/products/<int:product_id>",method="GET",status="200"} 2' in text
+    assert 'api_requests_total{route="/api/products/<int:product_id>",method="GET",status="404"} 1' in text
+    assert 'api_requests_total{route="unmatched",method="GET",status="404"} 1' in text
+    assert 'api_request_duration_seconds_count{route="/api/products/<int:product_id>"} 3' in text
+    assert re.search(r'api_request_phase_seconds_total\{route="/api/products/<int:product_id>",phase="sql"\} \S+',
+                     text)
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = metrics.RequestMetrics(buckets=(0.01, 0.1))
+    for seconds in (0.005, 0.01, 0.05, 3.0):
+        registry.observe('/api/"x"', 'GET', 200, seconds)
+
+    text = registry.render()
+    assert 'api_request_duration_seconds_bucket{route="/api/\\"x\\"",le="0.01"} 2' in text
+    assert 'api_request_duration_seconds_bucket{route="/api/\\"x\\"",le="0.1"} 3' in text
+    assert 'api_request_duration_seconds_bucket{route="/api/\\"x\\"",le="+Inf"} 4' in text
+    assert 'api_request_duration_seconds_sum{route="/api/\\"x\\""} 3.065' in text
+
+
+def test_disabled_metrics_leave_responses_alone(app):
+    app.config['METRICS_ENABLED'] = False
+    response = app.test_client().get('/api/products/2')
+
+    assert response.status_code == 200
+    assert 'Server-Timing' not in response.headers
+    assert 'api_requests_total{' not in metrics.get_metrics(app).render()
+
+    # Cursors used outside any request simply run untimed
+    pool = db_pool.get_pool(app)
+    conn = pool.acquire()
+    assert conn.execute('SELECT COUNT(*) FROM products').fetchone()[0] == 2
+    conn.close()
@@ -206,6 +206,101 @@ def test_product_details():
         print("❌ Cannot connect to server. Make sure to run: python app_milestone5.py")
         return False
 
+def test_products_batch():
+    """Test batch product lookup (GET and POST) keeps request order and marks missing ids"""
+    print("📦 Testing Batch Product Lookup...")
+    try:
+        response = requests.get(f"{BASE_URL}/products/batch?ids=2,99999,1")
+        print(f"Status Code: {response.status_code}")
+        
+        ok = response.status_code == 200
+        if ok:
+            data = response.json()
+            returned = [product and product.get('id') for product in data.get('products', [])]
+            print(f"Requested: [2, 99999, 1] -> Returned: {returned}")
+            print(f"Found: {data.get('found')}, Missing: {data.get('missing')}")
+            ok = returned[1] is None and 99999 in data.get('missing', [])
+        else:
+            print(f"Error Response: {response.text}")
+        
+        response_post = requests.post(f"{BASE_URL}/products/batch", json={'ids': [1, 2]})
+        print(f"POST Status Code: {response_post.status_code}")
+        
+        response_invalid = requests.get(f"{BASE_URL}/products/batch?ids=abc")
+        print(f"Invalid ids Status Code: {response_invalid.status_code}")
+        if response_invalid.status_code == 400:
+            print("✅ Correctly rejected invalid ids")
+        
+        print("-" * 50)
+        return ok and response_post.status_code == 200 and response_invalid.status_code == 400
+    except requests.exceptions.ConnectionError:
+        print("❌ Cannot connect to server. Make sure to run: python app_milestone5.py")
+        return False
+
+def test_search_pagination():
+    """Test search results are paged and totals are bounded unless count=exact"""
+    print("🔎 Testing Search Pagination...")
+    try:
+        response = requests.get(f"{BASE_URL}/products/search?q=a&per_page=5")
+        print(f"Status Code: {response.status_code}")
+        
+        ok = response.status_code == 200
+        if ok:
+            data = response.json()
+            info = data.get('pagination', {})
+            print(f"Results on page: {data.get('count')}, Total: {info.get('total_results')} "
+                  f"(exact: {info.get('total_exact')}), Has next: {info.get('has_next')}")
+            ok = data.get('count', 0) <= 5
+        else:
+            print(f"Error Response: {response.text}")
+        
+        response_exact = requests.get(f"{BASE_URL}/products/search?q=a&per_page=5&count=exact")
+        print(f"count=exact Status Code: {response_exact.status_code}")
+        if response_exact.status_code == 200:
+            print(f"Exact total: {response_exact.json()['pagination']['total_results']}")
+        
+        response_cursor = requests.get(f"{BASE_URL}/products/search?q=a&per_page=5&cursor=")
+        print(f"Cursor Status Code: {response_cursor.status_code}")
+        if response_cursor.status_code == 200:
+            print(f"Next cursor: {response_cursor.json()['pagination']['next_cursor']}")
+        
+        print("-" * 50)
+        return ok and response_exact.status_code == 200 and response_cursor.status_code == 200
+    except requests.exceptions.ConnectionError:
+        print("❌ Cannot connect to server. Make sure to run: python app_milestone5.py")
+        return False
+
+def test_products_export():
+    """Test streaming catalog export in NDJSON and CSV formats"""
+    print("📤 Testing Catalog Export...")
+    try:
+        response = requests.get(f"{BASE_URL}/products/export?format=ndjson&department=1", stream=True)
+        print(f"Status Code: {response.status_code}")
+        
+        ok = response.status_code == 200
+        if ok:
+            lines = 0
+            for line in response.iter_lines():
+                if line:
+                    lines += 1
+            print(f"NDJSON lines (department 1): {lines}")
+        else:
+            print(f"Error Response: {response.text}")
+        
+        response_csv = requests.get(f"{BASE_URL}/products/export?format=csv", stream=True)
+        header = next(response_csv.iter_lines()).decode('utf-8')
+        response_csv.close()
+        print(f"CSV Status Code: {response_csv.status_code}, Header: {header}")
+        
+        response_invalid = requests.get(f"{BASE_URL}/products/export?format=xml")
+        print(f"Invalid format Status Code: {response_invalid.status_code}")
+        
+        print("-" * 50)
+        return ok and header.startswith('id,') and response_invalid.status_code == 400
+    except requests.exceptions.ConnectionError:
+        print("❌ Cannot connect to server. Make sure to run: python app_milestone5.py")
+        return False
+
 def test_stats_with_departments():
     """Test statistics endpoint with department breakdown"""
     print("📊 Testing Statistics with Department Breakdown...")
@@ -276,6 +371,9 @@ def main():
         test_department_products_by_name,
         test_products_endpoint,
         test_product_details,
+        test_products_batch,
+        test_search_pagination,
+        test_products_export,
         test_stats_with_departments,
         test_error_handling
     ]
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Tests for keyset (cursor) pagination helpers
+Runs against an in-memory database, no live server needed: python -m pytest test_pagination.py
+"""
+
+import sqlite3
+
+import pytest
+
+import pagination
+
+
+def test_cursor_round_trip():
+    token = pagination.encode_cursor(('Classic Jeans', 42))
+
+    assert '=' not in token
+    assert pagination.decode_cursor(token, 2) == ['Classic Jeans', 42]
+    assert pagination.decode_cursor('', 2) is None
+
+
+@pytest.mark.parametrize('token, size', [
+    ('not base64!', 1),
+    (pagination.encode_cursor([1, 2]), 1),
+    (pagination.encode_cursor(['a', 'b']), 2),
+    (pagination.encode_cursor([True]), 1),
+    ('e30', 1),  # {}
+])
+def test_invalid_cursor_is_rejected(token, size):
+    with pytest.raises(ValueError):
+        pagination.decode_cursor(token, size)
+
+
+def walk(conn, columns, per_page):
+    """Fetch every page of products ordered by ``columns`` using cursors"""
+    seen, token = [], ''
+    while True:
+        after = pagination.decode_cursor(token, len(columns))
+        where, params = '', []
+        if after:
+            where, params = pagination.keyset_condition(columns, after)
+            where = f'WHERE {where}'
+        rows = conn.execute(
+            f'SELECT name, id FROM products p {where} ORDER BY {", ".join(columns)} LIMIT ?',
+            (*params, per_page + 1)
+        ).fetchall()
+        seen.extend(row['id'] for row in rows[:per_page])
+
+        page = pagination.cursor_pagination(
+            per_page, rows, lambda row: tuple(row[c.split('.')[1]] for c in columns), token)
+        if not page['has_next']:
+            return seen
+        token = page['next_cursor']
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    conn.execute('CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT)')
+    names = [None, 'Cap', 'Cap', None, 'Belt', 'Jeans', 'Cap', None, 'Belt']
+    conn.executemany('INSERT INTO products (id, name) VALUES (?, ?)', enumerate(names, start=1))
+    return conn
+
+
+@pytest.mark.parametrize('per_page', [1, 2, 3, 20])
+def test_keyset_walk_matches_full_ordering(conn, per_page):
+    by_name = [row['id'] for row in conn.execute('SELECT id FROM products ORDER BY name, id')]
+    by_id = [row['id'] for row in conn.execute('SELECT id FROM products ORDER BY id')]
+
+    assert walk(conn, ('p.name', 'p.id'), per_page) == by_name
+    assert walk(conn, ('p.id',), per_page) == by_id
+
+
+@pytest.fixture
+def milestone5(tmp_path, monkeypatch):
+    database = str(tmp_path / 'pagination_test.db')
+    conn = sqlite3.connect(database)
+    conn.executescript('''
+        CREATE TABLE departments (id INTEGER PRIMARY KEY, name TEXT, created_at TEXT, updated_at TEXT);
+        CREATE TABLE products (id INTEGER PRIMARY KEY, cost REAL, category TEXT, name TEXT, brand TEXT,
+                               retail_price REAL, department_id INTEGER, sku TEXT, distribution_center_id INTEGER);
+        INSERT INTO departments VALUES (1, 'Men', NULL, NULL), (2, 'Women', NULL, NULL);
+    ''')
+    conn.executemany('INSERT INTO products VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                     [(i, 1.5, 'Jeans', f'Jeans {i:02d}', 'MG', 9.99, i % 2 + 1, f'SKU{i}', 1) for i in range(1, 21)])
+    conn.commit()
+    conn.close()
+
+    import app_milestone5
+    import db_pool
+    monkeypatch.setitem(app_milestone5.app.config, 'RESPONSE_CACHE_ENABLED', False)
+    pool = db_pool.ConnectionPool(database)
+    monkeypatch.setitem(app_milestone5.app.extensions, 'db_pool', pool)
+    yield app_milestone5.app.test_client()
+    pool.close_all()
+
+
+@pytest.mark.parametrize('url', [
+    '/api/products?cursor=&per_page={}',
+    '/api/departments/1/products?cursor=&per_page={}',
+    '/api/departments/Men/products?cursor=&per_page={}',
+])
+@pytest.mark.parametrize('per_page', [-2, 0])
+def test_cursor_pages_hold_at_least_one_row(milestone5, url, per_page):
+    body = milestone5.get(url.format(per_page)).get_json()
+
+    assert len(body['products']) == 1
+    assert body['pagination']['per_page'] == 1 and body['pagination']['has_next']
+
+    following = milestone5.get(url.format(per_page).replace('cursor=', f"cursor={body['pagination']['next_cursor']}"))
+    assert following.get_json()['products'][0]['id'] != body['products'][0]['id']
+
+
+def test_offset_pages_hold_at_least_one_row(milestone5):
+    body = milestone5.get('/api/products?page=1&per_page=0').get_json()
+
+    assert len(body['products']) == 1 and body['products'][0]['id'] == 1
+    assert body['pagination']['per_page'] == 1 and body['pagination']['total_pages'] == 20
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('format=csv&fields=name,sku', ['name,sku'] + [f'Jeans {i:02d},SKU{i}' for i in range(1, 21)]),
+    ('format=csv&department=Women&fields=id', ['id'] + [str(i) for i in range(1, 21, 2)]),
+])
+def test_export_reads_keyset_batches_without_holding_a_connection(milestone5, monkeypatch, query, expected):
+    import app_milestone5
+    monkeypatch.setattr(app_milestone5, 'EXPORT_CHUNK_SIZE', 3)
+    pool = milestone5.application.extensions['db_pool']
+
+    response = milestone5.get(f'/api/products/export?{query}', buffered=False)
+    chunks = iter(response.response)
+    first = next(chunks)
+    assert pool.stats()['in_use'] == 0  # Returned before the batch was sent
+
+    body = b''.join([first, *chunks]).decode()
+    response.close()
+    assert body.splitlines() == expected
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Query plan regression suite for the SQL behind every API route
+Builds a fresh database with the setup and migration scripts, replays each
+route of app.py, app_milestone4.py and app_milestone5.py while recording the
+statements they run, and checks EXPLAIN QUERY PLAN for each one: a full table
+SCAN or a USE TEMP B-TREE sort fails unless the statement is listed in
+EXPECTED_SCANS / EXPECTED_SORTS with the reason it is acceptable.
+
+Run: python -m pytest test_query_plans.py
+"""
+
+import contextlib
+import csv
+import hashlib
+import importlib
+import io
+import os
+import re
+import sqlite3
+import sys
+
+import pytest
+
+import db_pool
+
+pytest.importorskip('pandas')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'database_setup'))
+import improved_database_setup  # noqa: E402
+from milestone4_department_refactor import DepartmentRefactor  # noqa: E402
+
+CATEGORIES = ['Accessories', 'Jeans', 'Sweaters', 'Socks', 'Swim']
+BRANDS = ['MG', "Levi's", 'Hanes', 'Columbia', 'Carhartt']
+
+ROUTES = {
+    'app': [
+        '/api/health',
+        '/api/products?page=3&per_page=10',
+        '/api/products/7',
+        '/api/products/search?q=jeans',
+        '/api/products/category/Jeans',
+        '/api/products/department/Men',
+        '/api/stats'
+    ],
+    'app_milestone4': [
+        '/api/health',
+        '/api/products?page=3&per_page=10',
+        '/api/products/7',
+        '/api/products/search?q=jeans',
+        '/api/products/department/Women',
+        '/api/departments',
+        '/api/stats'
+    ],
+    'app_milestone5': [
+        '/api/health',
+        '/api/products?page=3&per_page=10',
+        '/api/products?cursor=',
+        '/api/products?cursor=WzEwXQ',
+        '/api/products?page=2&fields=id,name,retail_price',
+        '/api/products/7',
+        '/api/products/batch?ids=1,2,3',
+        '/api/products/search?q=jeans',
+        '/api/products/search?q=jeans&cursor=',
+        '/api/products/search?q=%25&per_page=5',
+        '/api/products/export?format=csv',
+        '/api/products/export?format=ndjson&department=Men',
+        '/api/departments',
+        '/api/departments/1',
+        '/api/departments/1/products?page=2',
+        '/api/departments/1/products?cursor=',
+        '/api/departments/Women/products?page=2',
+        '/api/departments/Women/products?cursor=',
+        '/api/departments/1/products?cursor=WyJKZWFucyIsMV0&fields=retail_price',
+        '/api/departments/Women/products?page=2&fields=id,name',
+        '/api/stats'
+    ]
+}
+
+# (statement pattern, plan pattern, reason) for full scans that are intended
+EXPECTED_SCANS = [
+    (r'ORDER BY (p\.)?id\s+LIMIT', r'SCAN (p|products)\b',
+     'pages in primary-key order walk the table in rowid order and stop at LIMIT'),
+    (r'LIKE', r'SCAN (p|products)\b', 'substring search (no words for the FTS index) cannot use an index'),
+    (r'products_fts MATCH', r'SCAN products_fts VIRTUAL TABLE', 'FTS5 lookups report as a virtual table scan'),
+    (r'FROM departments\b', r'SCAN (d|departments)\b', 'the departments table holds a handful of rows'),
+    (r'FROM sqlite_master', r'SCAN sqlite_master', 'schema lookups'),
+    (r'FROM pragma_table_info', r'SCAN pragma_table_info', 'schema lookups'),
+    (r"FROM 'main'\.'products_fts_", r'SCAN main\.products_fts_', 'FTS5 reads its own small config tables'),
+    (r'FROM department_stats', r'SCAN department_stats', 'one summary row per department'),
+    (r'.', r'SCAN \(subquery-\d+\)', 'reading back a bounded subquery, not a table'),
+    (r'COUNT\(\*\) FROM products\s*$', r'SCAN products USING COVERING INDEX', 'health check counts the whole table'),
+    (r'FROM products(\s+WHERE department = \S+)?\s*$', r'SCAN products USING COVERING INDEX',
+     'original schema statistics aggregate over the whole table or department'),
+    (r'GROUP BY (category|brand|department)', r'SCAN products', 'original schema statistics group every product'),
+]
+
+# (statement pattern, reason) for sorts in a temp B-tree that are intended
+EXPECTED_SORTS = [
+    (r'products_fts MATCH|LIKE', 'search results are ordered by name after matching'),
+    (r'GROUP BY|ORDER BY (count|total|product_count)', 'statistics are sorted by computed counts'),
+]
+
+
+def write_catalog(path, count=600):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'cost', 'category', 'name', 'brand', 'retail_price',
+                         'department', 'sku', 'distribution_center_id'])
+        for i in range(1, count + 1):
+            category = CATEGORIES[i % len(CATEGORIES)]
+            writer.writerow([i, round(i % 97 + 1.5, 2), category, f'{category} item {i}', BRANDS[i % len(BRANDS)],
+                             round(i % 89 + 3.25, 2), 'Men' if i % 2 else 'Women',
+                             hashlib.md5(str(i).encode()).hexdigest().upper(), i % 10 + 1])
+
+
+@pytest.fixture(scope='module')
+def databases(tmp_path_factory):
+    """(original schema db, departments schema db) built by the project's own scripts"""
+    root = tmp_path_factory.mktemp('plans')
+    (root / 'archive').mkdir()
+    write_catalog(root / 'archive' / 'products.csv')
+    work = root / 'db'
+    work.mkdir()
+
+    cwd = os.getcwd()
+    os.chdir(work)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            improved_database_setup.main()
+            original = work / 'original.db'
+            with contextlib.closing(sqlite3.connect('ecommerce_improved.db')) as source, \
+                    contextlib.closing(sqlite3.connect(original)) as copy:
+                source.backup(copy)
+            assert DepartmentRefactor('ecommerce_improved.db').run_migration()
+    finally:
+        os.chdir(cwd)
+    return str(original), str(work / 'ecommerce_improved.db')
+
+
+def record_statements(module_name, database, monkeypatch):
+    """Run every route of an app against ``database`` and return the SQL it executed"""
+    module = importlib.import_module(module_name)
+    statements = []
+    open_connection = db_pool.ConnectionPool._open
+
+    def traced_open(pool):
+        conn = open_connection(pool)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    monkeypatch.setattr(db_pool.ConnectionPool, '_open', traced_open)
+    monkeypatch.setitem(module.app.config, 'RESPONSE_CACHE_ENABLED', False)
+    pool = db_pool.ConnectionPool(database)
+    monkeypatch.setitem(module.app.extensions, 'db_pool', pool)
+
+    client = module.app.test_client()
+    try:
+        for url in ROUTES[module_name]:
+            response = client.get(url)
+            assert response.status_code == 200, f'{url}: {response.status_code} {response.get_data(as_text=True)[:200]}'
+            response.get_data()
+    finally:
+        pool.close_all()
+    return [sql for sql in statements if re.match(r'\s*(SELECT|WITH)\b', sql, re.I)]
+
+
+def normalize(sql):
+    return re.sub(r'\s+', ' ', sql).strip()
+
+
+def plan_problems(conn, sql):
+    """Plan steps of ``sql`` that scan or sort without being expected to"""
+    details = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql)]
+    flat = normalize(sql)
+    problems = []
+    for detail in details:
+        if detail.startswith('SCAN') and not any(
+                re.search(statement, flat) and re.search(plan, detail) for statement, plan, _ in EXPECTED_SCANS):
+            problems.append(detail)
+        if 'TEMP B-TREE' in detail and not any(re.search(statement, flat) for statement, _ in EXPECTED_SORTS):
+            problems.append(detail)
+    return problems, details
+
+
+@pytest.mark.parametrize('module_name', ['app', 'app_milestone4', 'app_milestone5'])
+def test_api_queries_use_indexes(module_name, databases, monkeypatch):
+    database = databases[0] if module_name == 'app' else databases[1]
+    statements = record_statements(module_name, database, monkeypatch)
+    assert statements
+
+    conn = sqlite3.connect(database)
+    failures = []
+    for sql in dict.fromkeys(statements):
+        problems, details = plan_problems(conn, sql)
+        if problems:
+            failures.append(f'{normalize(sql)}\n    plan: {details}')
+    conn.close()
+
+    assert not failures, 'Unexpected scans / sorts:\n' + '\n'.join(failures)
+
+
+def test_sparse_department_pages_read_only_the_covering_index(databases, monkeypatch):
+    statements = record_statements('app_milestone5', databases[1], monkeypatch)
+    sparse = [sql for sql in statements
+              if re.match(r'\s*SELECT (p\.\w+, )*p\.\w+\s+FROM products p\s+WHERE p\.department_id', sql)]
+    assert len(sparse) == 2
+
+    conn = sqlite3.connect(databases[1])
+    for sql in sparse:
+        details = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql)]
+        assert details[0].startswith('SEARCH p USING COVERING INDEX idx_products_department_name (department_id=?')
+    conn.close()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared data-access layer (named queries, row mapping, per-query metrics)
+Runs against a throwaway database, no live server needed: python -m pytest test_repository.py
+"""
+
+import sqlite3
+
+import pytest
+from flask import Flask, jsonify
+
+import db_pool
+import metrics
+import repository
+import slow_queries
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / 'repository_test.db')
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE departments (id INTEGER PRIMARY KEY, name TEXT, created_at TEXT, updated_at TEXT);
+        CREATE TABLE products (id INTEGER PRIMARY KEY, cost REAL, category TEXT, name TEXT, brand TEXT,
+                               retail_price REAL, department_id INTEGER, sku TEXT, distribution_center_id INTEGER);
+        INSERT INTO departments VALUES (1, 'Men', NULL, NULL), (2, 'Women', NULL, NULL);
+    ''')
+    conn.executemany('INSERT INTO products VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                     [(i, 1.5, 'Jeans', f'Jeans {i:02d}', 'MG', 9.99, i % 2 + 1, f'SKU{i}', 1) for i in range(1, 21)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_each_shape_is_built_once():
+    fields = ('id', 'name')
+    first = repository.PRODUCTS_AFTER.sql(fields=fields, required=('id',), where='WHERE p.id > ?')
+    again = repository.PRODUCTS_AFTER.sql(fields=fields, required=('id',), where='WHERE p.id > ?')
+
+    assert first is again
+    assert first == 'SELECT p.id, p.name FROM products p WHERE p.id > ? ORDER BY p.id LIMIT ?'
+    assert 'JOIN departments d' in repository.PRODUCTS_AFTER.sql(where='')
+    assert repository.query_name(first) == 'products.after'
+    assert repository.query_name('SELECT 1') is None
+
+
+def test_in_lists_are_padded_to_shared_shapes():
+    assert repository.in_list([7]) == ('?', [7])
+    assert repository.in_list([1, 2, 3]) == ('?, ?, ?, ?', [1, 2, 3, None])
+    assert repository.in_list(list(range(5)))[0] == repository.in_list(list(range(8)))[0]
+
+
+def test_rows_map_columns_and_book_time_by_query_name(database):
+    app = Flask(__name__)
+    metrics.init_app(app)
+    db_pool.init_app(app, database)
+
+    @app.route('/api/products')
+    def products():
+        conn = db_pool.get_connection()
+        placeholders, params = repository.in_list([3, 1, 99])
+        rows = repository.rows(conn, repository.PRODUCTS_BY_IDS, params, ids=placeholders)
+        missing = repository.row(conn, repository.PRODUCT_BY_ID, (99,), fields=('id',))
+        total = repository.value(conn, repository.COUNT_PRODUCTS)
+        conn.close()
+        return jsonify({'products': rows, 'missing': missing, 'total': total}), 200
+
+    body = app.test_client().get('/api/products').get_json()
+    assert sorted(product['id'] for product in body['products']) == [1, 3]
+    assert body['products'][0]['department'] in ('Men', 'Women')
+    assert body['missing'] is None and body['total'] == 20
+
+    text = metrics.get_metrics(app).render()
+    assert 'api_query_runs_total{query="products.by_ids"} 1' in text
+    assert 'api_query_rows_total{query="products.by_ids"} 2' in text
+    assert 'api_query_rows_total{query="products.by_id"} 0' in text
+    assert 'api_query_seconds_total{query="stats.products"}' in text
+
+
+def test_chunks_and_slow_query_entries_carry_the_query_name(database):
+    app = Flask(__name__)
+    app.config.update(SLOW_QUERY_LOG_ENABLED=True, SLOW_QUERY_THRESHOLD_MS=0)
+    db_pool.init_app(app, database)
+    slow_queries.init_app(app)
+
+    conn = db_pool.get_pool(app).acquire()
+    batches = list(repository.chunks(conn, repository.PRODUCTS_EXPORT, (2, 100), 4,
+                                     fields=('id', 'sku'), where='WHERE p.department_id = ?'))
+    conn.close()
+
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    assert batches[0][0] == (1, 'SKU1')
+    entry, = slow_queries.get_log(app).entries()
+    assert entry['query'] == 'products.export' and entry['rows'] == 10
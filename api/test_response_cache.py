@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tests for the version-aware response cache
+Runs against a throwaway database, no live server needed: python -m pytest test_response_cache.py
+"""
+
+import sqlite3
+
+import pytest
+from flask import Flask, jsonify
+
+import db_pool
+import response_cache
+from response_cache import CachedResponse, ResponseCache
+
+
+def entry(body):
+    return CachedResponse(body, 200, 'application/json')
+
+
+def test_lru_eviction_by_entry_count():
+    cache = ResponseCache(max_entries=2)
+    cache.put('/a', 1, entry(b'a'))
+    cache.put('/b', 1, entry(b'b'))
+    assert cache.get('/a', 1).body == b'a'  # /a is now most recently used
+    cache.put('/c', 1, entry(b'c'))
+
+    assert cache.get('/b', 1) is None
+    assert cache.get('/a', 1) and cache.get('/c', 1)
+    assert cache.stats()['evictions'] == 1
+
+
+def test_eviction_by_bytes_and_oversized_entries():
+    cache = ResponseCache(max_bytes=30)
+    cache.put('/a', 1, entry(b'x' * 10))
+    cache.put('/b', 1, entry(b'x' * 10))
+    assert cache.stats()['bytes'] == 24
+    cache.put('/c', 1, entry(b'x' * 10))
+    cache.put('/huge', 1, entry(b'x' * 100))
+
+    stats = cache.stats()
+    assert stats['entries'] == 2 and stats['bytes'] <= 30
+    assert stats['oversized'] == 1
+    assert cache.get('/a', 1) is None
+
+
+def test_version_change_drops_everything():
+    cache = ResponseCache()
+    cache.put('/a', 1, entry(b'a'))
+    assert cache.get('/a', 1) is not None
+    assert cache.get('/a', 2) is None
+    cache.put('/a', 1, entry(b'stale'))  # Built against the old version: not stored
+
+    assert cache.get('/a', 2) is None
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_cache_key_normalizes_query_order():
+    app = Flask(__name__)
+    with app.test_request_context('/api/products?per_page=5&page=2'):
+        first = response_cache.cache_key()
+    with app.test_request_context('/api/products?page=2&per_page=5'):
+        second = response_cache.cache_key()
+    assert first == second == '/api/products?page=2&per_page=5'
+
+
+@pytest.fixture
+def app(tmp_path):
+    database = str(tmp_path / 'cache_test.db')
+    conn = sqlite3.connect(database)
+    conn.execute('CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT)')
+    conn.execute("INSERT INTO products VALUES (1, 'Cap')")
+    conn.commit()
+    conn.close()
+
+    app = Flask(__name__)
+    db_pool.init_app(app, database)
+    response_cache.init_app(app)
+    app.calls = 0
+
+    @app.route('/products/<int:product_id>')
+    @response_cache.cached
+    def product(product_id):
+        app.calls += 1
+        conn = db_pool.get_connection()
+        row = conn.execute('SELECT id, name FROM products WHERE id = ?', (product_id,)).fetchone()
+        conn.close()
+        if row is None:
+            return jsonify({'error': 'Product not found'}), 404
+        return jsonify(dict(row)), 200
+
+    return app
+
+
+def test_cached_view_is_invalidated_by_writes(app):
+    client = app.test_client()
+    assert client.get('/products/1').get_json()['name'] == 'Cap'
+    assert client.get('/products/1').get_json()['name'] == 'Cap'
+    assert app.calls == 1
+
+    writer = sqlite3.connect(app.config['DATABASE'])
+    writer.execute("UPDATE products SET name = 'Beanie' WHERE id = 1")
+    writer.commit()
+    writer.close()
+
+    assert client.get('/products/1').get_json()['name'] == 'Beanie'
+    assert app.calls == 2
+
+
+def test_errors_are_not_cached(app):
+    client = app.test_client()
+    assert client.get('/products/2').status_code == 404
+    assert client.get('/products/2').status_code == 404
+    assert app.calls == 2
+    assert response_cache.get_cache(app).stats()['stores'] == 0
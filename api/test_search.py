@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests for the full-text search helpers
+Runs against an in-memory database, no live server needed: python -m pytest test_search.py
+"""
+
+import sqlite3
+
+import search
+
+
+def test_match_query_prefixes_every_word():
+    assert search.build_match_query('lev jea') == '"lev"* "jea"*'
+    assert search.build_match_query('  Levi\'s  ') == '"Levi"* "s"*'
+
+
+def test_match_query_without_words():
+    assert search.build_match_query('%%') is None
+    assert search.build_match_query('') is None
+
+
+def test_match_query_finds_products_by_prefix():
+    conn = sqlite3.connect(':memory:')
+    assert not search.has_search_index(conn)
+
+    conn.execute("CREATE VIRTUAL TABLE products_fts USING fts5(name, brand, category, prefix='2 3')")
+    conn.executemany('INSERT INTO products_fts (rowid, name, brand, category) VALUES (?, ?, ?, ?)', [
+        (1, 'Slim Fit Jeans', "Levi's", 'Jeans'),
+        (2, 'Cotton Twill Cap', 'MG', 'Accessories'),
+        (3, 'Wool Sweater', "Levi's", 'Sweaters'),
+    ])
+    assert search.has_search_index(conn)
+
+    def ids(text):
+        rows = conn.execute('SELECT rowid FROM products_fts WHERE products_fts MATCH ? ORDER BY rowid',
+                            (search.build_match_query(text),))
+        return [row[0] for row in rows]
+
+    assert ids('lev') == [1, 3]
+    assert ids('levi jea') == [1]
+    assert ids('ACCESS') == [2]
+    assert ids('nothing') == []
+
+
+def test_match_filter_counts_with_a_bound():
+    conn = sqlite3.connect(':memory:')
+    conn.executescript('''
+        CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT, brand TEXT, category TEXT);
+        INSERT INTO products VALUES (1, 'Slim Jeans', 'Levi''s', 'Jeans'),
+                                    (2, 'Wide Jeans', 'MG', 'Jeans'),
+                                    (3, 'Wool Cap', 'MG', 'Accessories');
+    ''')
+
+    # Without the FTS index the filter falls back to substring matching
+    source, condition, params = search.match_filter(conn, 'jea')
+    assert source == 'products p'
+    assert search.count_matches(conn, source, condition, params) == (2, True)
+    assert search.count_matches(conn, source, condition, params, limit=2) == (2, True)
+    assert search.count_matches(conn, source, condition, params, limit=1) == (1, False)
+
+    conn.executescript('''
+        CREATE VIRTUAL TABLE products_fts USING fts5(name, brand, category, content='products', content_rowid='id');
+        INSERT INTO products_fts (products_fts) VALUES ('rebuild');
+    ''')
+    source, condition, params = search.match_filter(conn, 'mg')
+    assert 'MATCH' in condition
+    assert search.count_matches(conn, source, condition, params) == (2, True)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tests for the row serialization helpers and the fast JSON provider
+Runs in-process, no live server needed: python -m pytest test_serialization.py
+"""
+
+import json
+import sqlite3
+
+import pytest
+from flask import Flask, jsonify
+
+import serialization
+
+
+def make_connection():
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    conn.executescript('''
+        CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT, retail_price REAL);
+        INSERT INTO products VALUES (1, 'Cap', 19.99), (2, 'Beanie', NULL);
+    ''')
+    return conn
+
+
+def test_fetch_dicts_uses_selected_column_names():
+    conn = make_connection()
+    rows = serialization.fetch_dicts(conn, 'SELECT id, name AS title, retail_price FROM products ORDER BY id')
+
+    assert rows == [
+        {'id': 1, 'title': 'Cap', 'retail_price': 19.99},
+        {'id': 2, 'title': 'Beanie', 'retail_price': None}
+    ]
+    assert serialization.fetch_dict(conn, 'SELECT id FROM products WHERE id = ?', (2,)) == {'id': 2}
+    assert serialization.fetch_dict(conn, 'SELECT id FROM products WHERE id = ?', (3,)) is None
+    # The connection's own row factory is left alone
+    assert isinstance(conn.execute('SELECT 1').fetchone(), sqlite3.Row)
+
+
+def test_sparse_fieldsets_narrow_the_projection():
+    assert serialization.parse_fields('') is None
+    assert serialization.parse_fields(' retail_price, id,name ') == ('id', 'name', 'retail_price')
+    with pytest.raises(ValueError, match='sku2'):
+        serialization.parse_fields('id,sku2')
+
+    select, join = serialization.product_select(('retail_price',), required=('name', 'id'))
+    assert (select, join) == ('p.id, p.name, p.retail_price', '')
+    select, join = serialization.product_select(('department',))
+    assert select == 'd.name as department' and join == serialization.DEPARTMENT_JOIN
+    assert serialization.product_select()[0].count(',') == len(serialization.PRODUCT_COLUMNS) - 1
+
+    rows = [{'id': 1, 'name': 'Cap', 'retail_price': 19.99}]
+    assert serialization.only_fields(rows, ('retail_price',)) == [{'retail_price': 19.99}]
+    assert serialization.only_fields(rows, None) is rows
+
+
+def test_dumps_line_is_one_ndjson_record():
+    line = serialization.dumps_line({'id': 1, 'name': 'Café'})
+
+    assert line.endswith(b'\n') and line.count(b'\n') == 1
+    assert json.loads(line) == {'id': 1, 'name': 'Café'}
+
+
+def test_provider_output_matches_default_provider():
+    payload = {'products': [{'name': 'Cap', 'id': 1, 'cost': 2.5}], 'count': 1}
+
+    default_app = Flask('default')
+    fast_app = Flask('fast')
+    serialization.init_app(fast_app)
+
+    with default_app.app_context():
+        expected = jsonify(payload)
+    with fast_app.app_context():
+        response = jsonify(payload)
+        assert fast_app.json.dumps({'b': 1, 'a': 2}) == '{"a":2,"b":1}'
+        # Values orjson cannot encode still go through the default provider
+        assert json.loads(fast_app.json.dumps({'big': 2 ** 70})) == {'big': 2 ** 70}
+
+    assert response.mimetype == 'application/json'
+    assert response.get_data() == expected.get_data()
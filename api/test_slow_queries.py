@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests for the slow-query log
+Runs against a throwaway database, no live server needed: python -m pytest test_slow_queries.py
+"""
+
+import json
+import sqlite3
+
+import pytest
+from flask import Flask, jsonify
+
+import db_pool
+import metrics
+import slow_queries
+from slow_queries import SlowQueryLog
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / 'slow_test.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT, department TEXT)')
+    conn.executemany('INSERT INTO products (id, name, department) VALUES (?, ?, ?)',
+                     [(i, f'Item {i}', 'Men' if i % 2 else 'Women') for i in range(1, 21)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def make_app(database, **config):
+    app = Flask(__name__)
+    app.config.update(config)
+    db_pool.init_app(app, database)
+    slow_queries.init_app(app)
+
+    @app.route('/api/departments/<name>/products')
+    def department_products(name):
+        conn = db_pool.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT id, name FROM products WHERE department = ? AND id > ?', (name, 0))
+        rows = cursor.fetchall()
+        total = conn.execute('SELECT COUNT(*) FROM products').fetchone()[0]
+        conn.close()
+        return jsonify({'count': len(rows), 'total': total}), 200
+
+    return app
+
+
+def test_parameter_shapes_hide_values():
+    assert slow_queries.parameter_shape((1, 2, 3, 'Men', b'xy', None)) == ['int x3', 'str[3]', 'bytes[2]', 'NoneType']
+    assert slow_queries.parameter_shape({'q': 'cap', 'limit': 5}) == {'q': 'str[3]', 'limit': 'int'}
+    assert slow_queries.parameter_shape(()) == []
+
+
+def test_statements_are_logged_with_route_rows_and_shape(database):
+    app = make_app(database, SLOW_QUERY_LOG_ENABLED=True, SLOW_QUERY_THRESHOLD_MS=0)
+    response = app.test_client().get('/api/departments/Men/products')
+    assert response.get_json() == {'count': 10, 'total': 20}
+
+    listing, count = reversed(slow_queries.get_log(app).entries())
+    assert listing['sql'] == 'SELECT id, name FROM products WHERE department = ? AND id > ?'
+    assert listing['parameters'] == ['str[3]', 'int']
+    assert listing['rows'] == 10
+    assert listing['route'] == 'GET /api/departments/<name>/products'
+    assert listing['duration_ms'] >= 0
+    assert count['rows'] == 1 and count['parameters'] == []
+
+    with app.test_request_context():
+        report = slow_queries.report(route='departments')
+    assert report['enabled'] and len(report['queries']) == 2
+    assert report['stats']['slow'] == 2
+
+
+def test_threshold_ring_buffer_and_log_file(tmp_path):
+    path = tmp_path / 'slow.log'
+    log = SlowQueryLog(threshold_ms=50, capacity=2, path=str(path))
+    assert log.record('SELECT 1', (), 0.01, 1) is None
+    for n in range(3):
+        log.record(f'SELECT {n}', (n,), 0.2, 1, route='GET /api/stats')
+
+    assert [entry['sql'] for entry in log.entries()] == ['SELECT 2', 'SELECT 1']
+    assert log.stats()['statements'] == 4 and log.stats()['slow'] == 3
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line['sql'] for line in lines] == ['SELECT 0', 'SELECT 1', 'SELECT 2']
+    assert lines[0]['duration_ms'] == 200.0 and lines[0]['parameters'] == ['int']
+
+
+def test_disabled_log_uses_plain_timed_cursors(database):
+    app = make_app(database)
+    assert slow_queries.get_log(app) is None
+
+    conn = db_pool.get_pool(app).acquire()
+    assert type(conn.cursor()) is metrics.TimedCursor
+    conn.close()
+    with app.test_request_context():
+        assert slow_queries.report() == {'enabled': False, 'queries': []}
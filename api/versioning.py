@@ -0,0 +1,57 @@
+"""
+Catalog version tracking for the E-commerce Products API
+Combines the persistent catalog generation counter (database_setup/catalog_version.py)
+with SQLite's PRAGMA data_version to tell whether anything may have changed.
+"""
+
+import threading
+
+_lock = threading.Lock()
+_epoch = 0
+
+
+def version_columns(conn):
+    """Column names of the catalog_version counter (empty if the database has none)"""
+    return {row[0] for row in conn.execute("SELECT name FROM pragma_table_info('catalog_version')")}
+
+
+def catalog_generation(conn):
+    """(generation, updated_at, instance) of the catalog, or None without the counter table.
+
+    ``instance`` is the token of this particular database (None for a counter
+    created before it existed), so a rebuilt database at the same generation
+    still reads differently.
+    """
+    columns = version_columns(conn)
+    if not columns:
+        return None
+    instance = 'instance' if 'instance' in columns else 'NULL'
+    row = conn.execute(f'SELECT generation, updated_at, {instance} FROM catalog_version WHERE id = 1').fetchone()
+    return tuple(row) if row else None
+
+
+def _observe_data_version(conn):
+    """Bump the in-process epoch when ``conn`` sees a commit from another connection.
+
+    PRAGMA data_version values are only comparable on the same connection, so
+    the last value is remembered per connection. A connection seen for the
+    first time (or one that cannot remember) also bumps the epoch, since it
+    cannot prove that nothing changed before it was opened.
+    """
+    global _epoch
+    data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+    with _lock:
+        last = getattr(conn, 'data_version', None)
+        if last != data_version:
+            try:
+                conn.data_version = data_version
+            except AttributeError:
+                pass
+            _epoch += 1
+        return _epoch
+
+
+def catalog_version(conn):
+    """Token that changes whenever the catalog may have changed (compare with ==)"""
+    epoch = _observe_data_version(conn)
+    return (catalog_generation(conn), epoch)
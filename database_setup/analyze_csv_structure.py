@@ -2,14 +2,16 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 
+from csv_cache import read_products
+
 def analyze_csv_structure():
     """Analyze the CSV structure to determine optimal data types"""
     csv_path = Path('../archive/products.csv')
     
     print("=== CSV Structure Analysis ===")
     
-    # Read the CSV file
-    df = pd.read_csv(csv_path)
+    # Read the CSV file (from its columnar cache when pyarrow is installed)
+    df = read_products(csv_path)
     
     print(f"Total rows: {len(df)}")
     print(f"Total columns: {len(df.columns)}")
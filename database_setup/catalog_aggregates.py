@@ -0,0 +1,177 @@
+import sqlite3
+
+# Summary tables behind /api/stats and /api/departments. Triggers on products
+# keep them current, so the API reads a handful of rows instead of scanning
+# and grouping the whole catalog on every call.
+#
+#   department_stats  one row per department: product count, price sum/min/max
+#   brand_counts      reference count of products per brand (row removed at 0)
+#   category_counts   reference count of products per category (row removed at 0)
+#   catalog_stats     single row holding the number of distinct brands/categories
+AGGREGATE_TABLES_SQL = [
+    '''
+    CREATE TABLE IF NOT EXISTS department_stats (
+        department_id INTEGER PRIMARY KEY REFERENCES departments(id),
+        product_count INTEGER NOT NULL DEFAULT 0,
+        price_sum REAL NOT NULL DEFAULT 0,
+        price_min REAL,
+        price_max REAL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS brand_counts (
+        brand TEXT PRIMARY KEY NOT NULL,
+        product_count INTEGER NOT NULL
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS category_counts (
+        category TEXT PRIMARY KEY NOT NULL,
+        product_count INTEGER NOT NULL
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS catalog_stats (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        brand_count INTEGER NOT NULL DEFAULT 0,
+        category_count INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    # Lets the delete/update triggers recompute a department's min/max price with one index seek
+    'CREATE INDEX IF NOT EXISTS idx_products_department_price ON products(department_id, retail_price)'
+]
+
+
+def _add_product_sql(row):
+    """Trigger body statements counting ``row`` (new) into the aggregates"""
+    return f'''
+        INSERT INTO department_stats (department_id, product_count, price_sum, price_min, price_max)
+        VALUES ({row}.department_id, 1, {row}.retail_price, {row}.retail_price, {row}.retail_price)
+        ON CONFLICT (department_id) DO UPDATE SET
+            product_count = product_count + 1,
+            price_sum = price_sum + excluded.price_sum,
+            price_min = MIN(COALESCE(price_min, excluded.price_min), excluded.price_min),
+            price_max = MAX(COALESCE(price_max, excluded.price_max), excluded.price_max);
+        INSERT INTO brand_counts (brand, product_count)
+        SELECT {row}.brand, 1 WHERE {row}.brand IS NOT NULL
+        ON CONFLICT (brand) DO UPDATE SET product_count = product_count + 1;
+        INSERT INTO category_counts (category, product_count)
+        SELECT {row}.category, 1 WHERE {row}.category IS NOT NULL
+        ON CONFLICT (category) DO UPDATE SET product_count = product_count + 1;
+    '''
+
+
+def _remove_product_sql(row):
+    """Trigger body statements taking ``row`` (old) out of the aggregates"""
+    return f'''
+        UPDATE department_stats SET
+            product_count = product_count - 1,
+            price_sum = price_sum - {row}.retail_price,
+            price_min = CASE WHEN {row}.retail_price <= price_min
+                THEN (SELECT MIN(retail_price) FROM products WHERE department_id = {row}.department_id)
+                ELSE price_min END,
+            price_max = CASE WHEN {row}.retail_price >= price_max
+                THEN (SELECT MAX(retail_price) FROM products WHERE department_id = {row}.department_id)
+                ELSE price_max END
+        WHERE department_id = {row}.department_id;
+        UPDATE brand_counts SET product_count = product_count - 1 WHERE brand = {row}.brand;
+        DELETE FROM brand_counts WHERE brand = {row}.brand AND product_count <= 0;
+        UPDATE category_counts SET product_count = product_count - 1 WHERE category = {row}.category;
+        DELETE FROM category_counts WHERE category = {row}.category AND product_count <= 0;
+    '''
+
+
+AGGREGATE_TRIGGERS_SQL = [
+    f'''
+    CREATE TRIGGER IF NOT EXISTS products_aggregates_ai AFTER INSERT ON products BEGIN
+        {_add_product_sql('new')}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS products_aggregates_ad AFTER DELETE ON products BEGIN
+        {_remove_product_sql('old')}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS products_aggregates_au
+    AFTER UPDATE OF department_id, retail_price, brand, category ON products BEGIN
+        {_remove_product_sql('old')}
+        {_add_product_sql('new')}
+    END
+    ''',
+    # Distinct brand/category counts follow the reference-counted dimension rows
+    '''
+    CREATE TRIGGER IF NOT EXISTS brand_counts_ai AFTER INSERT ON brand_counts BEGIN
+        UPDATE catalog_stats SET brand_count = brand_count + 1 WHERE id = 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS brand_counts_ad AFTER DELETE ON brand_counts BEGIN
+        UPDATE catalog_stats SET brand_count = brand_count - 1 WHERE id = 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS category_counts_ai AFTER INSERT ON category_counts BEGIN
+        UPDATE catalog_stats SET category_count = category_count + 1 WHERE id = 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS category_counts_ad AFTER DELETE ON category_counts BEGIN
+        UPDATE catalog_stats SET category_count = category_count - 1 WHERE id = 1;
+    END
+    '''
+]
+
+REBUILD_AGGREGATES_SQL = [
+    'DELETE FROM department_stats',
+    'DELETE FROM brand_counts',
+    'DELETE FROM category_counts',
+    'INSERT OR REPLACE INTO catalog_stats (id, brand_count, category_count) VALUES (1, 0, 0)',
+    '''
+    INSERT INTO department_stats (department_id, product_count, price_sum, price_min, price_max)
+    SELECT department_id, COUNT(*), SUM(retail_price), MIN(retail_price), MAX(retail_price)
+    FROM products
+    GROUP BY department_id
+    ''',
+    '''
+    INSERT INTO brand_counts (brand, product_count)
+    SELECT brand, COUNT(*) FROM products WHERE brand IS NOT NULL GROUP BY brand
+    ''',
+    '''
+    INSERT INTO category_counts (category, product_count)
+    SELECT category, COUNT(*) FROM products WHERE category IS NOT NULL GROUP BY category
+    '''
+]
+
+
+def create_catalog_aggregates(conn):
+    """Create the aggregate tables and triggers, then recompute them from products.
+
+    Requires the Milestone 4 schema (products.department_id). Safe to run
+    repeatedly; must be re-run whenever the products table is recreated,
+    because dropping a table also drops its triggers.
+    """
+    cursor = conn.cursor()
+    for statement in AGGREGATE_TABLES_SQL + AGGREGATE_TRIGGERS_SQL + REBUILD_AGGREGATES_SQL:
+        cursor.execute(statement)
+    conn.commit()
+
+    cursor.execute('SELECT COALESCE(SUM(product_count), 0) FROM department_stats')
+    products = cursor.fetchone()[0]
+    cursor.execute('SELECT brand_count, category_count FROM catalog_stats WHERE id = 1')
+    brands, categories = cursor.fetchone()
+    return products, brands, categories
+
+
+def main(db_path='ecommerce_improved.db'):
+    print("=== Building catalog aggregate tables ===")
+    conn = sqlite3.connect(db_path)
+    try:
+        products, brands, categories = create_catalog_aggregates(conn)
+        print(f"✅ Aggregates cover {products} products, {brands} brands, {categories} categories")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
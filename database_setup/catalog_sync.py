@@ -0,0 +1,256 @@
+import sqlite3
+import sys
+import time
+
+import pandas as pd
+
+from covering_indexes import department_column
+from csv_ingest import PhaseTimer, format_timings
+from csv_validation import DEFAULT_CHUNK_SIZE, DEFAULT_WORKERS, PRODUCT_COLUMNS, validated_chunks
+
+# Incremental catalog sync: brings the products table in line with a new
+# products.csv by writing only the rows that differ, instead of reloading the
+# whole catalog. Every validated CSV row is hashed (a 64-bit hash of its values,
+# computed per chunk by pandas) and compared with the hash stored for its id in
+# product_row_hashes. New ids are inserted and changed rows rewritten through
+# INSERT ... ON CONFLICT (id) DO UPDATE; products missing from the CSV are
+# deleted. Changed rows are staged in a temporary table and only written once
+# the whole CSV has been read: missing products are deleted first, then
+# changed products updated, then new ones inserted, so a row can take the SKU
+# of a product that was removed or changed in the same sync. (Two products
+# swapping SKUs still fails: the rows are written one at a time.) Department
+# names are mapped to department_id through the departments table. The usual
+# row triggers keep the search index, catalog aggregates and catalog version
+# up to date, so a sync touching 1% of the catalog does about 1% of a full
+# load's writes.
+#
+# Rows updated or deleted outside a sync lose their stored hash through the
+# triggers below; those rows, and any product without a hash (the first sync of
+# an existing database), are hashed from the table at the start of a sync.
+
+# Phases of a sync, in the order they run (see sync_products_csv())
+SYNC_PHASES = ('prepare', 'validate', 'hash', 'diff', 'stage', 'delete', 'upsert', 'commit')
+
+# Values are hashed with these dtypes, whether they come from the CSV or the table
+ROW_HASH_DTYPES = {
+    'id': 'int64', 'cost': 'float64', 'category': object, 'name': object, 'brand': object,
+    'retail_price': 'float64', 'department': object, 'sku': object, 'distribution_center_id': 'int64'
+}
+
+ROW_HASHES_SQL = [
+    '''
+    CREATE TABLE IF NOT EXISTS product_row_hashes (
+        id INTEGER PRIMARY KEY,
+        row_hash INTEGER NOT NULL
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS product_row_hashes_au AFTER UPDATE ON products BEGIN
+        DELETE FROM product_row_hashes WHERE id = old.id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS product_row_hashes_ad AFTER DELETE ON products BEGIN
+        DELETE FROM product_row_hashes WHERE id = old.id;
+    END
+    '''
+]
+
+# Per-sync scratch tables: the hashes of the current chunk and every id seen so
+# far (the changed rows go to sync_rows, see staging_table_sql())
+SYNC_TEMP_TABLES_SQL = [
+    'CREATE TEMP TABLE sync_chunk (id INTEGER PRIMARY KEY, row_hash INTEGER NOT NULL)',
+    'CREATE TEMP TABLE sync_seen (id INTEGER PRIMARY KEY)'
+]
+SYNC_TEMP_TABLES = ('sync_chunk', 'sync_seen', 'sync_rows')
+
+STORE_HASHES_SQL = '''
+    INSERT INTO product_row_hashes (id, row_hash) VALUES (?, ?)
+    ON CONFLICT (id) DO UPDATE SET row_hash = excluded.row_hash
+'''
+
+# CSV rows whose hash differs from the stored one, and whether the id is new
+CHANGED_ROWS_SQL = '''
+    SELECT c.id, p.id IS NULL
+    FROM temp.sync_chunk c
+    LEFT JOIN product_row_hashes h ON h.id = c.id
+    LEFT JOIN products p ON p.id = c.id
+    WHERE h.row_hash IS NOT c.row_hash
+'''
+
+
+def row_hashes(frame):
+    """64-bit hash of each row of ``frame`` (PRODUCT_COLUMNS), as signed integers for SQLite"""
+    values = frame[PRODUCT_COLUMNS].astype(ROW_HASH_DTYPES)
+    return pd.util.hash_pandas_object(values, index=False).to_numpy().view('int64')
+
+
+def stored_rows_sql(column):
+    """SELECT of the products without a stored hash, with the CSV's columns"""
+    select = ', '.join(f'p.{name}' for name in PRODUCT_COLUMNS if name != 'department')
+    if column == 'department_id':
+        source = 'products p JOIN departments d ON d.id = p.department_id'
+        select += ', d.name AS department'
+    else:
+        source = 'products p'
+        select += ', p.department'
+    return f'''
+        SELECT {select} FROM {source}
+        WHERE p.id NOT IN (SELECT id FROM product_row_hashes)
+    '''
+
+
+def product_columns(column):
+    """PRODUCT_COLUMNS as named in the products table of this schema"""
+    return [column if name == 'department' else name for name in PRODUCT_COLUMNS]
+
+
+def staging_table_sql(column):
+    """CREATE of temp.sync_rows: changed rows as they will be written, their hash and whether they are new"""
+    columns = ', '.join(name for name in product_columns(column) if name != 'id')
+    return f'''
+        CREATE TEMP TABLE sync_rows (
+            id INTEGER PRIMARY KEY, {columns}, row_hash INTEGER NOT NULL, is_new INTEGER NOT NULL
+        )
+    '''
+
+
+def stage_sql(column):
+    """INSERT of one changed row into temp.sync_rows"""
+    columns = product_columns(column) + ['row_hash', 'is_new']
+    return f"INSERT INTO temp.sync_rows ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+
+def upsert_sql(column):
+    """INSERT ... ON CONFLICT (id) DO UPDATE of the staged rows with is_new = ?, in id order"""
+    columns = ', '.join(product_columns(column))
+    updates = ', '.join(f'{name} = excluded.{name}' for name in product_columns(column) if name != 'id')
+    # WHERE is required: without it SQLite would read ON CONFLICT as part of a join
+    return f'''
+        INSERT INTO products ({columns})
+        SELECT {columns} FROM temp.sync_rows WHERE is_new = ? ORDER BY id
+        ON CONFLICT (id) DO UPDATE SET {updates}
+    '''
+
+
+def department_ids(conn, names):
+    """{department name: id} for ``names``, adding any department not in the table yet"""
+    conn.executemany('INSERT OR IGNORE INTO departments (name) VALUES (?)', [(name,) for name in names])
+    return dict(conn.execute('SELECT name, id FROM departments'))
+
+
+def hash_stored_rows(conn, column, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Store the hash of every product that has none. Returns the number of rows hashed."""
+    hashed = 0
+    for frame in pd.read_sql_query(stored_rows_sql(column), conn, chunksize=chunk_size):
+        conn.executemany(STORE_HASHES_SQL, zip(frame['id'].tolist(), row_hashes(frame).tolist()))
+        hashed += len(frame)
+    return hashed
+
+
+def sync_products_csv(conn, csv_path, chunk_size=DEFAULT_CHUNK_SIZE, progress=None, workers=DEFAULT_WORKERS):
+    """Apply the differences between ``csv_path`` and the products table.
+
+    Returns {'read': CSV rows, 'valid': rows passing validation, 'inserted',
+    'updated', 'deleted', 'unchanged': product counts, 'rehashed': stored rows
+    hashed before the sync, 'timings': {phase: seconds}} with a timing for each
+    of SYNC_PHASES. ``progress``, when given, is called with the running totals
+    after each chunk. Chunks are validated by ``workers`` processes (see
+    csv_validation.py). The sync is one transaction: on error nothing changes.
+    """
+    stats = {'read': 0, 'valid': 0, 'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0,
+             'rehashed': 0, 'timings': dict.fromkeys(SYNC_PHASES, 0.0)}
+    timer = PhaseTimer(stats['timings'])
+    column = department_column(conn)
+    stage = stage_sql(column)
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None  # Explicit BEGIN/COMMIT around the whole sync
+    cursor = conn.cursor()
+    try:
+        with timer('prepare'):
+            cursor.execute('BEGIN')
+            for statement in ROW_HASHES_SQL + SYNC_TEMP_TABLES_SQL + [staging_table_sql(column)]:
+                cursor.execute(statement)
+            stats['rehashed'] = hash_stored_rows(conn, column, chunk_size)
+
+        chunks = validated_chunks(csv_path, chunk_size, workers)
+        while True:
+            with timer('validate'):
+                result = next(chunks, None)
+            if result is None:
+                break
+            frame = result.rows
+            with timer('hash'):
+                hashes = row_hashes(frame)
+            with timer('diff'):
+                cursor.execute('DELETE FROM temp.sync_chunk')
+                cursor.executemany('INSERT INTO temp.sync_chunk (id, row_hash) VALUES (?, ?)',
+                                   zip(frame['id'].tolist(), hashes.tolist()))
+                cursor.execute('INSERT INTO temp.sync_seen (id) SELECT id FROM temp.sync_chunk')
+                changed = dict(cursor.execute(CHANGED_ROWS_SQL).fetchall())
+            with timer('stage'):
+                if changed:
+                    keep = frame['id'].isin(list(changed)).to_numpy()
+                    rows = frame.loc[keep, PRODUCT_COLUMNS].copy()
+                    if column == 'department_id':
+                        ids = department_ids(conn, rows['department'].unique().tolist())
+                        rows['department'] = rows['department'].map(ids)
+                    rows['row_hash'] = hashes[keep]
+                    rows['is_new'] = rows['id'].map(changed).astype('int64')
+                    cursor.executemany(stage, rows.to_numpy(dtype=object).tolist())
+            inserted = sum(changed.values())
+            stats['inserted'] += inserted
+            stats['updated'] += len(changed) - inserted
+            stats['unchanged'] += len(frame) - len(changed)
+            stats['read'] += result.read
+            stats['valid'] += len(frame)
+            if progress is not None:
+                progress(stats)
+
+        with timer('delete'):
+            cursor.execute('DELETE FROM products WHERE id NOT IN (SELECT id FROM temp.sync_seen)')
+            stats['deleted'] = cursor.rowcount
+        with timer('upsert'):
+            upsert = upsert_sql(column)
+            cursor.execute(upsert, (0,))  # Changed products first: they may free SKUs new rows take
+            cursor.execute(upsert, (1,))
+            cursor.execute('''
+                INSERT INTO product_row_hashes (id, row_hash) SELECT id, row_hash FROM temp.sync_rows WHERE true
+                ON CONFLICT (id) DO UPDATE SET row_hash = excluded.row_hash
+            ''')
+        with timer('commit'):
+            cursor.execute('COMMIT')
+    except BaseException:
+        if conn.in_transaction:
+            cursor.execute('ROLLBACK')
+        raise
+    finally:
+        for table in SYNC_TEMP_TABLES:
+            cursor.execute(f'DROP TABLE IF EXISTS temp.{table}')
+        cursor.close()
+        conn.isolation_level = isolation_level
+    return stats
+
+
+def main(csv_path='../archive/products.csv', db_path='ecommerce_improved.db', chunk_size=DEFAULT_CHUNK_SIZE):
+    print(f"=== Syncing {db_path} with {csv_path} ===")
+    conn = sqlite3.connect(db_path)
+    try:
+        start = time.perf_counter()
+        stats = sync_products_csv(
+            conn, csv_path, chunk_size,
+            progress=lambda s: print(f"  {s['read']:,} rows compared", end='\r')
+        )
+        elapsed = time.perf_counter() - start
+        print(f"\n✅ Synced {stats['valid']:,} products in {elapsed:.2f}s: {stats['inserted']:,} inserted, "
+              f"{stats['updated']:,} updated, {stats['deleted']:,} deleted, {stats['unchanged']:,} unchanged")
+        if stats['rehashed']:
+            print(f"  Hashed {stats['rehashed']:,} stored products first")
+        for line in format_timings(stats['timings']):
+            print(f"  {line}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:3], *(int(arg) for arg in sys.argv[3:4]))
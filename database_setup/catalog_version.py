@@ -0,0 +1,78 @@
+import sqlite3
+
+# Single-row catalog generation counter. Every change to products or
+# departments bumps it (and its timestamp), so readers such as the API's
+# response cache can tell with one lookup whether the catalog has changed.
+# The row also holds a random instance token, set when the row is created:
+# a rebuilt database starts counting again and can reach the same generation
+# as the one it replaced, but not with the same token.
+CATALOG_VERSION_SQL = [
+    '''
+    CREATE TABLE IF NOT EXISTS catalog_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        generation INTEGER NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        instance TEXT NOT NULL DEFAULT (lower(hex(randomblob(16))))
+    )
+    ''',
+    'INSERT OR IGNORE INTO catalog_version (id, generation) VALUES (1, 0)'
+]
+
+# Gives a counter created before the instance token existed one
+# (ALTER TABLE cannot add a column with a non-constant default)
+ADD_INSTANCE_SQL = [
+    'ALTER TABLE catalog_version ADD COLUMN instance TEXT',
+    'UPDATE catalog_version SET instance = lower(hex(randomblob(16))) WHERE instance IS NULL'
+]
+
+BUMP_SQL = '''
+    UPDATE catalog_version
+    SET generation = generation + 1, updated_at = CURRENT_TIMESTAMP
+    WHERE id = 1;
+'''
+
+CATALOG_VERSION_TRIGGERS_SQL = [
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {table}_version_{suffix} AFTER {event} ON {table} BEGIN
+        {BUMP_SQL}
+    END
+    '''
+    for table in ('products', 'departments')
+    for suffix, event in (('ai', 'INSERT'), ('ad', 'DELETE'), ('au', 'UPDATE'))
+]
+
+
+def create_catalog_version(conn):
+    """Create the catalog_version counter and its triggers, and bump the generation.
+
+    Safe to run repeatedly; must be re-run whenever products or departments is
+    recreated, because dropping a table also drops its triggers. The bump marks
+    the rebuild itself as a catalog change.
+    """
+    cursor = conn.cursor()
+    for statement in CATALOG_VERSION_SQL:
+        cursor.execute(statement)
+    columns = [row[1] for row in cursor.execute('PRAGMA table_info(catalog_version)')]
+    if 'instance' not in columns:
+        for statement in ADD_INSTANCE_SQL:
+            cursor.execute(statement)
+    for statement in CATALOG_VERSION_TRIGGERS_SQL + [BUMP_SQL]:
+        cursor.execute(statement)
+    conn.commit()
+
+    cursor.execute('SELECT generation FROM catalog_version WHERE id = 1')
+    return cursor.fetchone()[0]
+
+
+def main(db_path='ecommerce_improved.db'):
+    print("=== Installing catalog version counter ===")
+    conn = sqlite3.connect(db_path)
+    try:
+        generation = create_catalog_version(conn)
+        print(f"✅ Catalog generation is now {generation}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import sqlite3
+
+# Covering indexes for department product pages. Each one starts with the
+# department filter, continues with the page's sort order and then carries
+# every listed column, so a page is read straight out of the index: no sort
+# in a temp B-tree and no lookups into the products table.
+
+# Departments schema (Milestone 4+): pages are ordered by name, then id. The
+# plain idx_products_department_id stays: it serves department rows in id
+# order (the catalog export) without a sort.
+DEPARTMENT_NAME_INDEX_SQL = '''
+    CREATE INDEX IF NOT EXISTS idx_products_department_name ON products(
+        department_id, name, id,
+        cost, category, brand, retail_price, sku, distribution_center_id
+    )
+'''
+
+# Original schema (department text column): pages are ordered by id, which
+# makes the single-column idx_products_department redundant
+DEPARTMENT_LISTING_INDEX_SQL = '''
+    CREATE INDEX IF NOT EXISTS idx_products_department_listing ON products(
+        department, id,
+        name, brand, retail_price, cost, category, sku, distribution_center_id
+    )
+'''
+
+# The department page queries of both schemas, used to check their query plans
+DEPARTMENT_PAGE_QUERIES = {
+    'department_id': '''
+        SELECT p.id, p.cost, p.category, p.name, p.brand, p.retail_price,
+               p.sku, p.distribution_center_id, d.name as department
+        FROM products p
+        JOIN departments d ON p.department_id = d.id
+        WHERE p.department_id = ?
+        ORDER BY p.name, p.id
+        LIMIT 10 OFFSET 0
+    ''',
+    'department': '''
+        SELECT id, name, brand, retail_price, cost, category, department, sku, distribution_center_id
+        FROM products
+        WHERE department = ?
+        ORDER BY id
+        LIMIT 50
+    '''
+}
+
+
+def department_column(conn):
+    """'department_id' or 'department', whichever the products table has"""
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(products)')}
+    return 'department_id' if 'department_id' in columns else 'department'
+
+
+def create_covering_indexes(conn):
+    """Create the covering department index for the database's schema.
+
+    Returns the name of the index. Safe to run repeatedly.
+    """
+    cursor = conn.cursor()
+    if department_column(conn) == 'department_id':
+        cursor.execute(DEPARTMENT_NAME_INDEX_SQL)
+        name = 'idx_products_department_name'
+    else:
+        cursor.execute(DEPARTMENT_LISTING_INDEX_SQL)
+        cursor.execute('DROP INDEX IF EXISTS idx_products_department')
+        name = 'idx_products_department_listing'
+    conn.commit()
+    return name
+
+
+def department_page_plan(conn):
+    """EXPLAIN QUERY PLAN details of the department page query for this schema"""
+    column = department_column(conn)
+    value = 1 if column == 'department_id' else 'Men'
+    rows = conn.execute('EXPLAIN QUERY PLAN ' + DEPARTMENT_PAGE_QUERIES[column], (value,)).fetchall()
+    return [row[3] for row in rows]
+
+
+def main(db_path='ecommerce_improved.db'):
+    print("=== Creating covering indexes for department pages ===")
+    conn = sqlite3.connect(db_path)
+    try:
+        name = create_covering_indexes(conn)
+        print(f"✅ {name} ready")
+        print("Department page query plan:")
+        for detail in department_page_plan(conn):
+            print(f"  {detail}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Optional: without it every reader parses the CSV text
+    pa = pq = None
+
+# Typed columnar cache of products.csv. The first reader converts the CSV into
+# a Parquet file next to it (products.csv -> products.parquet) with fixed
+# column types; later readers load that instead of parsing text, and can read
+# just the columns they need. The cache records the size, mtime and SHA-256
+# of the CSV it was built from: it is used while size and mtime match, or
+# while the content hash still matches after the file was touched, and is
+# rebuilt otherwise. Needs pyarrow (pip install pyarrow); without it
+# read_products() and csv_validation parse the CSV as before.
+#
+# Each numeric column has a text column next to it (id -> id__text) holding
+# the field as written in the CSV, but only where the typed value does not
+# give it back: values that are not numbers (or, for the integer columns, not
+# whole numbers) and numbers written differently, such as 2.50. Everywhere
+# else it is empty, so it takes almost no space, and field_numbers() and
+# field_text() see the same values in the cache as in the CSV text.
+
+CACHE_FORMAT_VERSION = 3
+METADATA_KEY = b'products_csv_cache'
+DEFAULT_ROW_GROUP_SIZE = 50_000
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# Cache column types, in CSV column order
+COLUMN_TYPES = {
+    'id': 'int64', 'cost': 'float64', 'category': 'string', 'name': 'string', 'brand': 'string',
+    'retail_price': 'float64', 'department': 'string', 'sku': 'string', 'distribution_center_id': 'int64'
+}
+NUMERIC_COLUMNS = [name for name, kind in COLUMN_TYPES.items() if kind != 'string']
+TEXT_SUFFIX = '__text'
+
+
+def available():
+    """Whether pyarrow is installed, i.e. whether caches can be written and read"""
+    return pq is not None
+
+
+def cache_path(csv_path):
+    """Path of the cache of ``csv_path``"""
+    return Path(csv_path).with_suffix('.parquet')
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_fingerprint(csv_path):
+    """{'size', 'mtime_ns', 'sha256'} of ``csv_path``, as recorded in a cache"""
+    stat = os.stat(csv_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': file_sha256(csv_path)}
+
+
+def cache_metadata(path):
+    """Metadata recorded in the cache at ``path``, or None if there is no readable cache"""
+    try:
+        metadata = pq.read_schema(path).metadata or {}
+    except (OSError, pa.ArrowException):
+        return None
+    if METADATA_KEY not in metadata:
+        return None
+    return json.loads(metadata[METADATA_KEY])
+
+
+def is_fresh(csv_path, path=None):
+    """Whether the cache of ``csv_path`` exists and was built from its current content"""
+    metadata = cache_metadata(path or cache_path(csv_path))
+    if metadata is None or metadata.get('version') != CACHE_FORMAT_VERSION:
+        return False
+    stat = os.stat(csv_path)
+    if stat.st_size != metadata['size']:
+        return False
+    # Same size and mtime: unchanged. Same size, new mtime: compare the content.
+    return stat.st_mtime_ns == metadata['mtime_ns'] or file_sha256(csv_path) == metadata['sha256']
+
+
+def cache_schema(fingerprint):
+    fields = [(name, pa.string() if kind == 'string' else pa.from_numpy_dtype(kind))
+              for name, kind in COLUMN_TYPES.items()]
+    fields += [(name + TEXT_SUFFIX, pa.string()) for name in NUMERIC_COLUMNS]
+    metadata = dict(fingerprint, version=CACHE_FORMAT_VERSION)
+    return pa.schema(fields, metadata={METADATA_KEY: json.dumps(metadata)})
+
+
+def to_numbers(values, errors='raise'):
+    """Text column ``values`` as numbers, like pd.to_numeric(values, errors=errors).
+
+    Text columns of plain integers or decimals are cast in one step, which is
+    several times faster; anything else goes through pd.to_numeric().
+    """
+    if pd.api.types.is_string_dtype(values):
+        for dtype in ('int64', 'float64'):
+            try:
+                return values.astype(dtype)
+            except (ValueError, TypeError, OverflowError):
+                pass
+    return pd.to_numeric(values, errors=errors)
+
+
+def number_text(values, name):
+    """Text of the numbers ``values`` of cache column ``name``, as the cache stores it"""
+    text = pa.array(values, type=pa.from_numpy_dtype(COLUMN_TYPES[name]), from_pandas=True)
+    return text.cast(pa.string()).to_pandas().set_axis(values.index)
+
+
+def typed_chunk(df):
+    """One chunk of CSV text as COLUMN_TYPES, with the text the numeric columns do not give back"""
+    columns = {}
+    for name, kind in COLUMN_TYPES.items():
+        text = df[name]
+        if kind == 'string':
+            columns[name] = text
+            continue
+        numbers = to_numbers(text, errors='coerce')
+        if kind == 'int64':
+            # Larger whole numbers than 2**53 are not exact as float64; their text keeps them
+            numbers = numbers.where((numbers % 1 == 0) & (abs(numbers) <= 2**53))
+        columns[name] = numbers.astype('Int64' if kind == 'int64' else 'float64')
+        stored = number_text(numbers, name)
+        columns[name + TEXT_SUFFIX] = text.where(text.notna() & (stored.isna() | (stored != text)))
+    return pd.DataFrame(columns)
+
+
+def field_numbers(df, name):
+    """Numeric column ``name`` of a chunk of CSV text or of the cache, as float64.
+
+    Fields that are not numbers are missing; fields that are numbers but do
+    not fit the cache type (3.5 as an id) keep their value.
+    """
+    text = df.get(name + TEXT_SUFFIX)
+    if text is None:
+        return to_numbers(df[name], errors='coerce').astype('float64')
+    numbers = df[name].astype('float64')
+    untyped = numbers.isna() & text.notna()
+    if untyped.any():
+        numbers[untyped] = pd.to_numeric(text[untyped], errors='coerce')
+    return numbers
+
+
+def field_text(df, name):
+    """Numeric column ``name`` of a chunk of CSV text or of the cache, as the text in the CSV"""
+    text = df.get(name + TEXT_SUFFIX)
+    if text is None:
+        return df[name]
+    return text.fillna(number_text(df[name], name))
+
+
+def build_cache(csv_path, path=None, row_group_size=DEFAULT_ROW_GROUP_SIZE):
+    """Convert ``csv_path`` into its cache. Returns the cache path."""
+    path = Path(path or cache_path(csv_path))
+    schema = cache_schema(source_fingerprint(csv_path))
+    partial = path.with_name(path.name + '.tmp')
+    try:
+        with pq.ParquetWriter(partial, schema) as writer:
+            for chunk in pd.read_csv(csv_path, dtype=str, chunksize=row_group_size):
+                table = pa.Table.from_pandas(typed_chunk(chunk), schema=schema, preserve_index=False)
+                writer.write_table(table, row_group_size=row_group_size)
+        os.replace(partial, path)  # Readers never see a half-written cache
+    finally:
+        if partial.exists():
+            partial.unlink()
+    return path
+
+
+def ensure_cache(csv_path, row_group_size=DEFAULT_ROW_GROUP_SIZE):
+    """Path of an up-to-date cache of ``csv_path``, built if needed.
+
+    None when pyarrow is not installed or the cache cannot be written.
+    """
+    if not available():
+        return None
+    path = cache_path(csv_path)
+    if is_fresh(csv_path, path):
+        return path
+    try:
+        return build_cache(csv_path, path, row_group_size)
+    except OSError:
+        return None
+
+
+def cache_chunks(path, chunk_size):
+    """DataFrames of up to ``chunk_size`` cached rows (every column), read lazily"""
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+        yield batch.to_pandas()
+
+
+def read_products(csv_path, columns=None):
+    """DataFrame of ``csv_path`` (optionally only ``columns``), from its cache when possible.
+
+    Columns come back with their cache types, integer columns with missing
+    values as float64 like pd.read_csv(). Only a numeric column holding a
+    field that is not a number comes back as text, as pd.read_csv() reads it.
+    """
+    path = ensure_cache(csv_path)
+    if path is None:
+        return pd.read_csv(csv_path, usecols=columns)
+    columns = list(columns or COLUMN_TYPES)
+    numeric = [name for name in columns if name in NUMERIC_COLUMNS]
+    table = pq.read_table(path, columns=columns + [name + TEXT_SUFFIX for name in numeric])
+    df = table.select(columns).to_pandas()
+    for name in numeric:
+        text = table[name + TEXT_SUFFIX]
+        if text.null_count == len(text):
+            continue
+        cached = pd.DataFrame({name: df[name], name + TEXT_SUFFIX: text.to_pandas()})
+        numbers = field_numbers(cached, name)
+        # Like pd.read_csv(), a column holding a field that is not a number is read as text
+        untyped = cached[name + TEXT_SUFFIX].notna()
+        df[name] = field_text(cached, name) if numbers[untyped].isna().any() else numbers
+    return df
+
+
+def main(csv_path='../archive/products.csv'):
+    print(f"=== Columnar cache of {csv_path} ===")
+    if not available():
+        print("❌ pyarrow is not installed (pip install pyarrow); readers parse the CSV")
+        return
+    path = cache_path(csv_path)
+    if is_fresh(csv_path, path):
+        print(f"✅ {path} is up to date")
+    else:
+        start = time.perf_counter()
+        build_cache(csv_path, path)
+        print(f"✅ Wrote {path} in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    pd.read_csv(csv_path)
+    csv_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    rows = len(read_products(csv_path))
+    cache_seconds = time.perf_counter() - start
+    print(f"  {rows:,} rows: CSV {csv_seconds:.2f}s, cache {cache_seconds:.2f}s "
+          f"({os.path.getsize(csv_path) / 2**20:.1f} MB -> {os.path.getsize(path) / 2**20:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
@@ -0,0 +1,200 @@
+import contextlib
+import sqlite3
+import sys
+import time
+
+from csv_validation import (DEFAULT_CHUNK_SIZE, DEFAULT_WORKERS, PRODUCT_COLUMNS, Quarantine, ValidationReport,
+                            validated_chunks)
+
+# Streaming load of products.csv into the products table created by
+# improved_database_setup.create_improved_database(). The CSV is read and
+# validated in chunks of DEFAULT_CHUNK_SIZE rows (csv_validation.py, in a
+# process pool on multi-core machines), so memory stays flat however large the
+# catalog, and each chunk goes in with one executemany(). The whole load is one
+# transaction: a failure leaves the previous catalog in place.
+# Secondary indexes are dropped for the load and rebuilt once at the end,
+# which sorts each index in a single pass instead of updating it row by row,
+# and the table is ANALYZEd afterwards so the planner sees the new data.
+#
+# Bulk mode (bulk_load_mode()) additionally turns off the rollback journal
+# and fsync and gives the inserts a large page cache. It is meant for setup
+# scripts that build a database from scratch: without a journal a load that
+# fails halfway cannot be rolled back and the file must be rebuilt.
+
+DEFAULT_BULK_CACHE_SIZE_KIB = 256 * 1024
+
+# Phases of a load, in the order they run (see ingest_products_csv()).
+# 'validate' is the time spent waiting for validated chunks: with a process
+# pool most of the parsing and checking overlaps the inserts.
+PHASES = ('prepare', 'validate', 'insert', 'indexes', 'analyze', 'commit')
+
+INSERT_SQL = f'''
+    INSERT INTO products ({', '.join(PRODUCT_COLUMNS)})
+    VALUES ({', '.join('?' * len(PRODUCT_COLUMNS))})
+'''
+
+
+def secondary_indexes(conn, table='products'):
+    """(name, CREATE INDEX statement) of the explicitly created indexes on ``table``.
+
+    Indexes behind PRIMARY KEY/UNIQUE constraints have no statement and are
+    not included: they cannot be dropped.
+    """
+    return conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+        (table,)
+    ).fetchall()
+
+
+def bulk_load_pragmas(cache_size_kib=DEFAULT_BULK_CACHE_SIZE_KIB):
+    """(pragma, value) pairs that bulk_load_mode() applies"""
+    return [
+        ('journal_mode', 'OFF'),
+        ('synchronous', 'OFF'),
+        ('cache_size', -int(cache_size_kib))  # Negative: size in KiB rather than pages
+    ]
+
+
+@contextlib.contextmanager
+def bulk_load_mode(conn, cache_size_kib=DEFAULT_BULK_CACHE_SIZE_KIB):
+    """Apply the bulk-load pragmas to ``conn`` and restore its previous settings on exit.
+
+    Yields the previous settings as {pragma: value}.
+    """
+    pragmas = bulk_load_pragmas(cache_size_kib)
+    previous = {name: conn.execute(f'PRAGMA {name}').fetchone()[0] for name, _ in pragmas}
+    for name, value in pragmas:
+        conn.execute(f'PRAGMA {name} = {value}')
+    try:
+        yield previous
+    finally:
+        for name, value in reversed(previous.items()):
+            conn.execute(f'PRAGMA {name} = {value}')
+
+
+class PhaseTimer:
+    """Adds the time spent in ``with timer(phase):`` blocks to a {phase: seconds} dict"""
+
+    def __init__(self, timings):
+        self.timings = timings
+        self.phase = None
+
+    def __call__(self, phase):
+        self.phase = phase
+        return self
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.timings[self.phase] += time.perf_counter() - self.start
+
+
+def ingest_products_csv(conn, csv_path, chunk_size=DEFAULT_CHUNK_SIZE, progress=None, bulk=False,
+                        workers=DEFAULT_WORKERS, quarantine_path=None):
+    """Replace the contents of products with the validated rows of ``csv_path``.
+
+    Returns {'read': CSV rows, 'loaded': rows inserted, 'rejected': rows
+    rejected, 'chunks': chunk count, 'rejections': {rule: rows},
+    'repairs': {column: rows}, 'timings': {phase: seconds}} with a timing for
+    each of PHASES. ``progress``, when given, is called with the running totals
+    after each chunk. ``bulk`` runs the load in bulk_load_mode(). Chunks are
+    validated by ``workers`` processes; rejected rows are written to
+    ``quarantine_path`` when given.
+    """
+    if not bulk:
+        return _ingest(conn, csv_path, chunk_size, progress, workers, quarantine_path)
+    with bulk_load_mode(conn) as previous:
+        # The large cache speeds up the inserts but slows the sort behind
+        # CREATE INDEX, so the indexes are built with the usual cache size
+        return _ingest(conn, csv_path, chunk_size, progress, workers, quarantine_path,
+                       index_cache_size=previous['cache_size'])
+
+
+def _ingest(conn, csv_path, chunk_size, progress, workers, quarantine_path, index_cache_size=None):
+    stats = {'read': 0, 'loaded': 0, 'rejected': 0, 'chunks': 0, 'timings': dict.fromkeys(PHASES, 0.0)}
+    timer = PhaseTimer(stats['timings'])
+    report = ValidationReport()
+    quarantine = Quarantine(quarantine_path) if quarantine_path else None
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None  # Explicit BEGIN/COMMIT: the index DDL belongs to the transaction too
+    cursor = conn.cursor()
+    try:
+        with timer('prepare'):
+            cursor.execute('BEGIN')
+            indexes = secondary_indexes(conn)
+            for name, _ in indexes:
+                cursor.execute(f'DROP INDEX "{name}"')
+            cursor.execute('DELETE FROM products')
+
+        chunks = validated_chunks(csv_path, chunk_size, workers)
+        while True:
+            with timer('validate'):
+                result = next(chunks, None)
+            if result is None:
+                break
+            report.add(result)
+            if quarantine is not None:
+                quarantine.write(result.rejected)
+            with timer('insert'):
+                # One object array per chunk converts numpy scalars to Python values in C
+                cursor.executemany(INSERT_SQL, result.rows.to_numpy(dtype=object).tolist())
+            stats.update(read=report.read, loaded=report.valid, rejected=report.rejected)
+            stats['chunks'] += 1
+            if progress is not None:
+                progress(stats)
+
+        with timer('indexes'):
+            if index_cache_size is not None:
+                cursor.execute(f'PRAGMA cache_size = {index_cache_size}')
+            for _, sql in indexes:
+                cursor.execute(sql)
+        with timer('analyze'):
+            cursor.execute('ANALYZE products')
+        with timer('commit'):
+            cursor.execute('COMMIT')
+    except BaseException:
+        if conn.in_transaction:
+            cursor.execute('ROLLBACK')
+        raise
+    finally:
+        cursor.close()
+        conn.isolation_level = isolation_level
+    stats.update(rejections=report.rejections, repairs=report.repairs)
+    return stats
+
+
+def format_timings(timings):
+    """One line per load phase: seconds and share of the total"""
+    total = sum(timings.values()) or 1e-9
+    return [f"{phase:<8} {seconds:8.2f}s {seconds / total:6.1%}" for phase, seconds in timings.items()]
+
+
+def main(csv_path='../archive/products.csv', db_path='ecommerce_improved.db', chunk_size=DEFAULT_CHUNK_SIZE,
+         bulk=False, quarantine_path='products_rejected.csv'):
+    mode = 'bulk mode' if bulk else 'transactional mode'
+    print(f"=== Loading {csv_path} into {db_path} in chunks of {chunk_size} rows ({mode}) ===")
+    conn = sqlite3.connect(db_path)
+    try:
+        start = time.perf_counter()
+        stats = ingest_products_csv(
+            conn, csv_path, chunk_size,
+            progress=lambda s: print(f"  {s['loaded']:,} of {s['read']:,} rows loaded", end='\r'),
+            bulk=bulk, quarantine_path=quarantine_path
+        )
+        elapsed = time.perf_counter() - start
+        print(f"\n✅ Loaded {stats['loaded']:,} of {stats['read']:,} products "
+              f"in {elapsed:.2f}s ({stats['loaded'] / max(elapsed, 1e-9):,.0f} rows/s)")
+        for line in format_timings(stats['timings']):
+            print(f"  {line}")
+        if stats['rejected']:
+            print(f"{stats['rejected']:,} rejected rows written to {quarantine_path}:")
+            for rule, count in stats['rejections'].items():
+                print(f"  {rule:<24} {count:>9,}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if arg != '--bulk']
+    main(*args[:2], *(int(arg) for arg in args[2:3]), bulk='--bulk' in sys.argv[1:])
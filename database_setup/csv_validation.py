@@ -0,0 +1,311 @@
+import collections
+import concurrent.futures
+import csv
+import io
+import itertools
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import csv_cache
+
+# Validation stage for products.csv. The file is cut into blocks of
+# DEFAULT_CHUNK_SIZE lines (or read in blocks from its columnar cache, see
+# csv_cache.py); each block is parsed and checked with vectorized
+# pandas/NumPy expressions, in a pool of worker processes when more than one
+# core is available (the parent only splits the raw bytes, so parsing scales
+# with the workers too). Rows breaking a rejection rule are dropped from the
+# load and can be written to a quarantine CSV together with the rules they
+# broke; other rows get the usual repairs (missing name/brand, SKU length).
+# Duplicate ids and SKUs are caught in the parent, which sees every block (it
+# remembers each key, roughly 100 bytes per row). ValidationReport keeps the
+# per-rule totals.
+
+PRODUCT_COLUMNS = ['id', 'cost', 'category', 'name', 'brand', 'retail_price',
+                   'department', 'sku', 'distribution_center_id']
+DEFAULT_CHUNK_SIZE = 50_000
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+# Converted to numbers by validate_chunk(); values that are not become missing
+# and fail their rule. Blocks of the CSV are read as text and blocks of its
+# cache keep the text of these fields where the types lose it (see
+# csv_cache.field_text()), so rejected rows are quarantined as they appear in
+# the file either way.
+NUMERIC_COLUMNS = csv_cache.NUMERIC_COLUMNS
+
+DEPARTMENTS = ['Men', 'Women']
+SKU_LENGTH = 32
+
+# Rows breaking any of these are rejected, {rule: description}. Together they
+# cover the constraints of the products table, so accepted rows always insert.
+REJECTION_RULES = {
+    'id': 'id missing or not a whole number',
+    'duplicate_id': 'id already used by an earlier row',
+    'cost': 'cost missing or negative',
+    'category': 'category missing or longer than 50 characters',
+    'name': 'name longer than 500 characters',
+    'brand': 'brand longer than 100 characters',
+    'retail_price': 'retail price missing or negative',
+    'department': "department other than 'Men' or 'Women'",
+    'sku': 'SKU missing',
+    'duplicate_sku': f'SKU (as cut to {SKU_LENGTH} characters) already used by an earlier row',
+    'distribution_center_id': 'distribution center missing, not a whole number or outside 1-10',
+}
+
+# Rules checked across the whole file by DuplicateKeys, {rule: column}
+KEY_RULES = {'duplicate_id': 'id', 'duplicate_sku': 'sku'}
+
+# Fixed in place on accepted rows, {column: description}
+REPAIRS = {
+    'name': "missing name set to 'Unknown Product'",
+    'brand': "missing brand set to 'Unknown Brand'",
+    'sku': f'SKU padded or truncated to {SKU_LENGTH} characters',
+}
+
+# Extra quarantine file column listing the rules a row broke, separated by ';'
+QUARANTINE_COLUMN = 'rejected_by'
+
+# Validated blocks per worker that may be waiting to be consumed
+READ_AHEAD = 2
+
+# One validated block: CSV row count, accepted rows (cleaned, PRODUCT_COLUMNS),
+# rejected rows (as read, plus QUARANTINE_COLUMN) and {rule or repair: row count}
+ChunkResult = collections.namedtuple('ChunkResult', ['read', 'rows', 'rejected', 'rejections', 'repairs'])
+
+
+def rejection_masks(df):
+    """{rule: boolean array of the rows of ``df`` that break it}, for all but KEY_RULES.
+
+    Numeric columns must be numeric. Comparisons with a missing value are
+    false, so "not (value <= limit)" also catches missing values.
+    """
+    distribution_center = df['distribution_center_id']
+    return {
+        'id': ~(df['id'] % 1 == 0).to_numpy(),
+        'cost': ~(df['cost'] >= 0).to_numpy(),
+        'category': ~(df['category'].str.len() <= 50).to_numpy(),
+        'name': (df['name'].str.len() > 500).to_numpy(),
+        'brand': (df['brand'].str.len() > 100).to_numpy(),
+        'retail_price': ~(df['retail_price'] >= 0).to_numpy(),
+        'department': ~df['department'].isin(DEPARTMENTS).to_numpy(),
+        'sku': df['sku'].isna().to_numpy(),
+        'distribution_center_id': ~(distribution_center.between(1, 10) & (distribution_center % 1 == 0)).to_numpy(),
+    }
+
+
+def broken_rules(masks, bad):
+    """QUARANTINE_COLUMN values of the rows selected by ``bad``: the rules each one broke"""
+    return np.array([';'.join(rule for rule, mask in masks.items() if mask[i]) for i in np.flatnonzero(bad)])
+
+
+def validate_chunk(df):
+    """Check one chunk of CSV rows (text, or a block of the cache) against REJECTION_RULES
+    and repair the rows that pass.
+
+    KEY_RULES are left to DuplicateKeys, which sees every chunk.
+    """
+    checked = df.assign(**{column: csv_cache.field_numbers(df, column) for column in NUMERIC_COLUMNS})
+    masks = rejection_masks(checked)
+    bad = np.logical_or.reduce(list(masks.values()))
+
+    rejected = df.loc[bad]
+    rejected = rejected[PRODUCT_COLUMNS].assign(**{column: csv_cache.field_text(rejected, column)
+                                                   for column in NUMERIC_COLUMNS})
+    if bad.any():
+        rejected = rejected.assign(**{QUARANTINE_COLUMN: broken_rules(masks, bad)})
+
+    rows = checked.loc[~bad, PRODUCT_COLUMNS]
+    sku = rows['sku'].astype(str)
+    repairs = {
+        'name': int(rows['name'].isna().sum()),
+        'brand': int(rows['brand'].isna().sum()),
+        'sku': int((sku.str.len() != SKU_LENGTH).sum()),
+    }
+    rows = rows.assign(
+        id=rows['id'].astype('int64'),
+        name=rows['name'].fillna('Unknown Product'),
+        brand=rows['brand'].fillna('Unknown Brand'),
+        sku=sku.str[:SKU_LENGTH].str.pad(SKU_LENGTH, side='right', fillchar='0'),
+        distribution_center_id=rows['distribution_center_id'].astype('int64'),
+    )
+    rejections = {rule: int(mask.sum()) for rule, mask in masks.items()}
+    return ChunkResult(len(df), rows, rejected, rejections, repairs)
+
+
+class DuplicateKeys:
+    """Rejects rows repeating the id or SKU of an earlier row, across all chunks.
+
+    Chunks are validated independently (in other processes, too), so the keys
+    are checked afterwards, in file order, against every key of the rows that
+    passed the other rules so far. SKUs are compared as repaired, which is how
+    the UNIQUE constraint sees them.
+    """
+
+    def __init__(self):
+        self.seen = {rule: set() for rule in KEY_RULES}
+
+    def check(self, result):
+        """``result`` with its rows repeating a key moved to its rejected rows (as repaired)"""
+        rows = result.rows
+        masks = {}
+        for rule, column in KEY_RULES.items():
+            values = rows[column].tolist()
+            seen = self.seen[rule]
+            earlier = np.fromiter(map(seen.__contains__, values), dtype=bool, count=len(values))
+            masks[rule] = earlier | rows[column].duplicated().to_numpy()
+            seen.update(values)
+        rejections = dict(result.rejections, **{rule: int(mask.sum()) for rule, mask in masks.items()})
+        bad = np.logical_or.reduce(list(masks.values()))
+        if not bad.any():
+            return result._replace(rejections=rejections)
+
+        duplicates = rows.loc[bad].assign(**{QUARANTINE_COLUMN: broken_rules(masks, bad)})
+        rejected = pd.concat([result.rejected, duplicates]).sort_index() if len(result.rejected) else duplicates
+        return result._replace(rows=rows.loc[~bad], rejected=rejected, rejections=rejections)
+
+
+def read_blocks(csv_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """(header, raw bytes of about ``chunk_size`` CSV rows) pairs, read lazily.
+
+    Blocks end on a record boundary even when a quoted field spans lines.
+    """
+    with open(csv_path, 'rb') as f:
+        header = next(csv.reader([f.readline().decode('utf-8-sig')]))
+        while True:
+            block = b''.join(itertools.islice(f, chunk_size))
+            if not block:
+                return
+            # An odd number of quotes means the block stops inside a quoted field
+            while block.count(b'"') % 2:
+                line = f.readline()
+                if not line:
+                    break
+                block += line
+            yield header, block
+
+
+def parse_block(header, block):
+    """DataFrame of the text of one block from read_blocks()"""
+    return pd.read_csv(io.BytesIO(block), header=None, names=header, dtype=str)
+
+
+def validate_block(header, block):
+    """Parse and validate one block; runs in the worker processes"""
+    return validate_chunk(parse_block(header, block))
+
+
+def validated_chunks(csv_path, chunk_size=DEFAULT_CHUNK_SIZE, workers=DEFAULT_WORKERS, use_cache=True):
+    """ChunkResult of each block of ``csv_path``, in file order, checked for duplicate keys.
+
+    See chunk_results() for the arguments.
+    """
+    duplicates = DuplicateKeys()
+    for result in chunk_results(csv_path, chunk_size, workers, use_cache):
+        yield duplicates.check(result)
+
+
+def chunk_results(csv_path, chunk_size=DEFAULT_CHUNK_SIZE, workers=DEFAULT_WORKERS, use_cache=True):
+    """validate_chunk() result of each block of ``csv_path``, in file order.
+
+    Blocks are read from the columnar cache of the CSV (csv_cache.py) when
+    ``use_cache`` is set and pyarrow is installed, and parsed from the CSV
+    text otherwise. With more than one worker the blocks are validated in a
+    process pool, at most READ_AHEAD blocks per worker ahead of the consumer.
+    """
+    cache = csv_cache.ensure_cache(csv_path) if use_cache else None
+    if cache is not None:
+        tasks = ((validate_chunk, chunk) for chunk in csv_cache.cache_chunks(cache, chunk_size))
+    else:
+        tasks = ((validate_block, header, block) for header, block in read_blocks(csv_path, chunk_size))
+    if workers <= 1:
+        for function, *args in tasks:
+            yield function(*args)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        pending = collections.deque()
+        try:
+            for function, *args in tasks:
+                pending.append(pool.submit(function, *args))
+                if len(pending) >= READ_AHEAD * workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+class ValidationReport:
+    """Running totals of a validation run: rows read, accepted and rejected, per rule and repair"""
+
+    def __init__(self):
+        self.read = 0
+        self.valid = 0
+        self.rejected = 0
+        self.rejections = dict.fromkeys(REJECTION_RULES, 0)
+        self.repairs = dict.fromkeys(REPAIRS, 0)
+
+    def add(self, result):
+        self.read += result.read
+        self.valid += len(result.rows)
+        self.rejected += len(result.rejected)
+        for rule, count in result.rejections.items():
+            self.rejections[rule] += count
+        for column, count in result.repairs.items():
+            self.repairs[column] += count
+
+    def as_dict(self):
+        return {'read': self.read, 'valid': self.valid, 'rejected': self.rejected,
+                'rejections': dict(self.rejections), 'repairs': dict(self.repairs)}
+
+    def lines(self):
+        """One line per rule and repair; a rejected row counts once for every rule it breaks"""
+        return ([f"rejected {count:>9,}  {REJECTION_RULES[rule]}" for rule, count in self.rejections.items()]
+                + [f"repaired {count:>9,}  {REPAIRS[column]}" for column, count in self.repairs.items()])
+
+
+class Quarantine:
+    """CSV file collecting rejected rows with the rules they broke; replaced when opened"""
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        pd.DataFrame(columns=PRODUCT_COLUMNS + [QUARANTINE_COLUMN]).to_csv(path, index=False)
+
+    def write(self, rejected):
+        if len(rejected):
+            rejected.to_csv(self.path, mode='a', header=False, index=False)
+            self.rows += len(rejected)
+
+
+def validate_csv(csv_path, chunk_size=DEFAULT_CHUNK_SIZE, workers=DEFAULT_WORKERS, quarantine_path=None,
+                 use_cache=True):
+    """Validate ``csv_path`` without loading it. Returns its ValidationReport."""
+    report = ValidationReport()
+    quarantine = Quarantine(quarantine_path) if quarantine_path else None
+    for result in validated_chunks(csv_path, chunk_size, workers, use_cache):
+        report.add(result)
+        if quarantine is not None:
+            quarantine.write(result.rejected)
+    return report
+
+
+def main(csv_path='../archive/products.csv', quarantine_path='products_rejected.csv', workers=DEFAULT_WORKERS):
+    print(f"=== Validating {csv_path} with {workers} worker(s) ===")
+    start = time.perf_counter()
+    report = validate_csv(csv_path, workers=workers, quarantine_path=quarantine_path)
+    elapsed = time.perf_counter() - start
+    print(f"✅ {report.valid:,} of {report.read:,} rows valid, {report.rejected:,} rejected "
+          f"in {elapsed:.2f}s ({report.read / max(elapsed, 1e-9):,.0f} rows/s)")
+    for line in report.lines():
+        print(f"  {line}")
+    if report.rejected:
+        print(f"Rejected rows written to {quarantine_path}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:3], *(int(arg) for arg in sys.argv[3:4]))
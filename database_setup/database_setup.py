@@ -1,8 +1,9 @@
 import sqlite3
-import pandas as pd
 import os
 from pathlib import Path
 
+from csv_cache import read_products
+
 def create_database():
     """Create the database and products table"""
     conn = sqlite3.connect('ecommerce.db')
@@ -36,9 +37,9 @@ def load_products_data():
         return False
     
     try:
-        # Read CSV file
+        # Read CSV file (from its columnar cache when pyarrow is installed)
         print("Reading products.csv...")
-        df = pd.read_csv(csv_path)
+        df = read_products(csv_path)
         print(f"Found {len(df)} products in the CSV file")
         
         # Connect to database
@@ -1,8 +1,16 @@
 import sqlite3
-import pandas as pd
 import os
+import time
 from pathlib import Path
 
+from covering_indexes import DEPARTMENT_LISTING_INDEX_SQL, create_covering_indexes, department_page_plan
+from csv_ingest import format_timings, ingest_products_csv
+from csv_validation import REJECTION_RULES
+from search_index import create_search_index
+
+# Rows of products.csv that fail validation, with the rules they broke
+QUARANTINE_PATH = 'products_rejected.csv'
+
 def create_improved_database():
     """Create the database with improved schema based on CSV analysis"""
     conn = sqlite3.connect('ecommerce_improved.db')
@@ -26,7 +34,7 @@ def create_improved_database():
     # Create indexes for better query performance
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_brand ON products(brand)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_category ON products(category)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_department ON products(department)')
+    cursor.execute(DEPARTMENT_LISTING_INDEX_SQL)
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_price ON products(retail_price)')
     
     conn.commit()
@@ -42,41 +50,28 @@ def load_products_data_improved():
         return False
     
     try:
-        # Read CSV file
-        print("Reading products.csv...")
-        df = pd.read_csv(csv_path)
-        print(f"Found {len(df)} products in the CSV file")
-        
-        # Data cleaning
-        print("Cleaning data...")
-        
-        # Handle null values
-        df['name'] = df['name'].fillna('Unknown Product')
-        df['brand'] = df['brand'].fillna('Unknown Brand')
-        
-        # Ensure SKU is exactly 32 characters (pad or truncate if needed)
-        df['sku'] = df['sku'].astype(str).str[:32].str.pad(32, side='right', fillchar='0')
-        
-        # Validate price constraints
-        df = df[df['cost'] >= 0]
-        df = df[df['retail_price'] >= 0]
-        
-        # Validate department values
-        df = df[df['department'].isin(['Men', 'Women'])]
-        
-        # Validate distribution center IDs
-        df = df[df['distribution_center_id'].between(1, 10)]
-        
-        print(f"After cleaning: {len(df)} products")
-        
-        # Connect to database
+        # Stream the CSV into the table created above in chunks, inside one
+        # transaction; replacing the table would throw away its primary key,
+        # CHECK constraints and indexes. The database is being built from
+        # scratch, so the load runs in bulk mode (no journal, no fsync).
+        # Rows failing validation are set aside in a quarantine file.
+        print("Reading products.csv and loading it into the improved database in chunks (bulk mode)...")
         conn = sqlite3.connect('ecommerce_improved.db')
+        try:
+            stats = ingest_products_csv(conn, csv_path, bulk=True, quarantine_path=QUARANTINE_PATH)
+        finally:
+            conn.close()
         
-        # Load data into database
-        print("Loading data into improved database...")
-        df.to_sql('products', conn, if_exists='replace', index=False)
-        
-        conn.close()
+        print(f"Found {stats['read']} products in the CSV file")
+        print(f"After cleaning: {stats['loaded']} products")
+        if stats['rejected']:
+            print(f"Rejected {stats['rejected']} products (written to {QUARANTINE_PATH}):")
+            for rule, count in stats['rejections'].items():
+                if count:
+                    print(f"  {REJECTION_RULES[rule]}: {count}")
+        print("Load time by phase:")
+        for line in format_timings(stats['timings']):
+            print(f"  {line}")
         print("Data loaded successfully into improved database!")
         return True
         
@@ -84,6 +79,27 @@ def load_products_data_improved():
         print(f"Error loading data: {e}")
         return False
 
+def build_search_index():
+    """Build the FTS5 search index over the loaded products"""
+    conn = sqlite3.connect('ecommerce_improved.db')
+    try:
+        indexed = create_search_index(conn)
+        print(f"Search index built for {indexed} products")
+    finally:
+        conn.close()
+
+def build_covering_indexes():
+    """Create the covering department index (and report the plan it gives department pages)"""
+    conn = sqlite3.connect('ecommerce_improved.db')
+    try:
+        name = create_covering_indexes(conn)
+        conn.execute(f'ANALYZE {name}')  # The load analyzed the table before this index existed
+        print(f"Covering index {name} built; department page plan:")
+        for detail in department_page_plan(conn):
+            print(f"  {detail}")
+    finally:
+        conn.close()
+
 def verify_improved_data():
     """Verify the data with improved validation"""
     conn = sqlite3.connect('ecommerce_improved.db')
@@ -142,14 +158,27 @@ def verify_improved_data():
     
     conn.close()
 
+def timed(step):
+    """Run one setup step and print how long it took"""
+    start = time.perf_counter()
+    result = step()
+    print(f"  ({step.__name__}: {time.perf_counter() - start:.2f}s)")
+    return result
+
 def main():
     print("=== Improved E-commerce Database Setup ===")
     print("Step 1: Creating improved database and table...")
-    create_improved_database()
+    timed(create_improved_database)
     
     print("\nStep 2: Loading products data with validation...")
-    if load_products_data_improved():
-        print("\nStep 3: Verifying improved data...")
+    if timed(load_products_data_improved):
+        print("\nStep 3: Building full-text search index...")
+        timed(build_search_index)
+        
+        print("\nStep 4: Building covering indexes...")
+        timed(build_covering_indexes)
+        
+        print("\nStep 5: Verifying improved data...")
         verify_improved_data()
         print("\n=== Improved Setup Complete! ===")
     else:
@@ -10,6 +10,11 @@ import os
 from pathlib import Path
 from datetime import datetime
 
+from catalog_aggregates import create_catalog_aggregates
+from catalog_version import create_catalog_version
+from covering_indexes import DEPARTMENT_NAME_INDEX_SQL, department_page_plan
+from search_index import create_search_index
+
 class DepartmentRefactor:
     def __init__(self, db_path='ecommerce_improved.db'):
         self.db_path = db_path
@@ -196,10 +201,19 @@ class DepartmentRefactor:
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_brand ON products(brand)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_category ON products(category)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_department_id ON products(department_id)')
+            cursor.execute(DEPARTMENT_NAME_INDEX_SQL)
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_price ON products(retail_price)')
             
+            # Dropping the old table dropped its triggers, so rebuild the FTS index and aggregates
+            indexed = create_search_index(conn)
+            aggregated, brands, categories = create_catalog_aggregates(conn)
+            generation = create_catalog_version(conn)
+            
             conn.commit()
             print("✅ Products table updated with foreign key relationship!")
+            print(f"✅ Full-text search index rebuilt ({indexed} products)")
+            print(f"✅ Catalog aggregates rebuilt ({aggregated} products, {brands} brands, {categories} categories)")
+            print(f"✅ Catalog version counter installed (generation {generation})")
             return True
             
         except Exception as e:
@@ -235,6 +249,11 @@ class DepartmentRefactor:
             valid_relationships = cursor.fetchone()[0]
             print(f"✅ Valid foreign key relationships: {valid_relationships}")
             
+            # Department pages should be read straight from the covering index
+            print("\n📈 Department page query plan:")
+            for detail in department_page_plan(conn):
+                print(f"  {detail}")
+            
             # Show sample data
             print("\n📊 Sample Data:")
             cursor.execute('''
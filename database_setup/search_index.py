@@ -0,0 +1,72 @@
+import sqlite3
+
+# FTS5 index over the searchable product columns. It is an external-content
+# table: the text lives in products only once and the triggers below keep the
+# index in step with every INSERT/UPDATE/DELETE on products. Updates that
+# assign the indexed columns their current values (as an upsert of a whole row
+# does) leave the index alone.
+SEARCH_INDEX_SQL = [
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, brand, category,
+        content='products',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts (rowid, name, brand, category)
+        VALUES (new.id, new.name, new.brand, new.category);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts (products_fts, rowid, name, brand, category)
+        VALUES ('delete', old.id, old.name, old.brand, old.category);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF id, name, brand, category ON products
+    WHEN old.id IS NOT new.id OR old.name IS NOT new.name
+        OR old.brand IS NOT new.brand OR old.category IS NOT new.category
+    BEGIN
+        INSERT INTO products_fts (products_fts, rowid, name, brand, category)
+        VALUES ('delete', old.id, old.name, old.brand, old.category);
+        INSERT INTO products_fts (rowid, name, brand, category)
+        VALUES (new.id, new.name, new.brand, new.category);
+    END
+    '''
+]
+
+
+def create_search_index(conn):
+    """Create the products_fts index and its sync triggers, then (re)build it from products.
+
+    Safe to run repeatedly. Must be re-run whenever the products table is
+    dropped and recreated, because dropping a table also drops its triggers.
+    """
+    cursor = conn.cursor()
+    cursor.execute('DROP TRIGGER IF EXISTS products_fts_au')  # Picks up changes to its definition
+    for statement in SEARCH_INDEX_SQL:
+        cursor.execute(statement)
+    cursor.execute("INSERT INTO products_fts (products_fts) VALUES ('rebuild')")
+    conn.commit()
+
+    cursor.execute('SELECT COUNT(*) FROM products_fts')
+    return cursor.fetchone()[0]
+
+
+def main(db_path='ecommerce_improved.db'):
+    print("=== Building products full-text search index ===")
+    conn = sqlite3.connect(db_path)
+    try:
+        indexed = create_search_index(conn)
+        print(f"✅ Indexed {indexed} products in products_fts")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()